@@ -1,77 +1,3578 @@
+import time
+STARTUP_T0 = time.perf_counter()  # --profile-startup measures from here
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pyautogui
 import threading
-import time
+import contextlib
 import json
-import keyboard
-import pygame
-
-# Initialize pygame mixer safely
-try:
-    pygame.mixer.init()
-    SOUND_AVAILABLE = True
-except Exception as e:
-    print("pygame mixer init failed:", e)
-    SOUND_AVAILABLE = False
-
-# Preload sounds (if present)
-CLICK_SOUND = None
-DOUBLE_CLICK_SOUND = None
-if SOUND_AVAILABLE:
+import math
+import os
+import sys
+import heapq
+import itertools
+import queue
+import random
+import bisect
+import csv
+import base64
+import zlib
+import functools
+import socket
+import socketserver
+import subprocess
+import signal
+import stat
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from array import array
+from collections import OrderedDict, deque, namedtuple
+
+# --- Audio ---
+SOUND_DIR = os.path.dirname(os.path.abspath(__file__))
+SOUND_FILES = {
+    "click": os.path.join(SOUND_DIR, "click2.wav"),
+}
+
+
+class AudioEngine:
+    # Each sound is decoded once into memory and played on a small, fixed set
+    # of mixer channels by a dedicated thread. play() never blocks the caller:
+    # requests go into a bounded queue, and repeats of the same sound closer
+    # together than min_interval collapse into one. pygame is only imported
+    # here, so runs without sound never load it.
+    def __init__(self, sounds=SOUND_FILES, channels=4, min_interval=0.03, queue_size=64):
+        self.min_interval = min_interval
+        self.available = False
+        self.sounds = {}
+        self.channels = []
+        self.played = self.collapsed = self.dropped = 0
+        self.queue = queue.Queue(maxsize=queue_size)
+        try:
+            import pygame
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_num_channels(channels)
+            self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+            for name, path in sounds.items():
+                self.sounds[name] = pygame.mixer.Sound(path)
+            self.available = True
+        except Exception as e:
+            print("Audio disabled:", e)
+            return
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def play(self, name="click", delay=0.0):
+        if not self.available:
+            return
+        try:
+            self.queue.put_nowait((time.perf_counter() + delay, name))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.available:
+            self.available = False
+            self.queue.put(None)
+
+    def _worker(self):
+        pending = []  # heap of (due, seq, name)
+        last_played = {}
+        seq = 0
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, pending[0][0] - time.perf_counter())
+            try:
+                request = self.queue.get(timeout=timeout)
+                if request is None:
+                    return
+                seq += 1
+                heapq.heappush(pending, (request[0], seq, request[1]))
+            except queue.Empty:
+                pass
+            now = time.perf_counter()
+            while pending and pending[0][0] <= now:
+                _, _, name = heapq.heappop(pending)
+                if now - last_played.get(name, -1.0) < self.min_interval:
+                    self.collapsed += 1
+                    continue
+                channel = next((c for c in self.channels if not c.get_busy()), None)
+                if channel is None:
+                    self.dropped += 1
+                    continue
+                last_played[name] = now
+                try:
+                    channel.play(self.sounds[name])
+                    self.played += 1
+                except Exception as e:
+                    print("Sound play error:", e)
+
+
+# --- Startup ---
+class StartupProfile:
+    # Wall-clock breakdown of startup for --profile-startup. Phases may run
+    # on the background warm-up thread, so appends take a lock.
+    def __init__(self, t0=STARTUP_T0):
+        self.t0 = t0
+        self.phases = []  # (label, offset from t0, duration, thread name)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.phases.append((label, start - self.t0, end - start, threading.current_thread().name))
+
+    def report(self):
+        lines = [f"{'phase':<22}{'start ms':>10}{'took ms':>10}  thread"]
+        for label, offset, took, thread in sorted(self.phases, key=lambda p: p[1]):
+            lines.append(f"{label:<22}{offset * 1000:>10.1f}{took * 1000:>10.1f}  {thread}")
+        return "\n".join(lines)
+
+
+def startup_phase(profile, label):
+    return profile.phase(label) if profile is not None else contextlib.nullcontext()
+
+
+# --- Click Plan ---
+# Small int enums so a compiled plan packs into typed arrays
+BUTTON_LEFT, BUTTON_RIGHT, BUTTON_MIDDLE = 0, 1, 2
+BUTTON_NAMES = ("left", "right", "middle")
+# Single/Double are plain clicks; the rest are step rows (see Step Program)
+MODE_SINGLE, MODE_DOUBLE, MODE_MOVE, MODE_DRAG, MODE_SCROLL, MODE_KEY, MODE_WAIT, MODE_LOOP = range(8)
+MODE_NAMES = ("Single", "Double", "Move", "Drag", "Scroll", "Key", "Wait", "Loop")
+
+
+def button_code(name):
+    try:
+        return BUTTON_NAMES.index(str(name).lower())
+    except ValueError:
+        return BUTTON_LEFT
+
+
+def mode_code(name):
+    try:
+        return MODE_NAMES.index(name)
+    except ValueError:
+        return MODE_SINGLE
+
+
+def window_code(value):
+    # Treeview "Win" cell -> X11 window id, 0 = not bound (global pointer)
+    try:
+        return int(str(value), 0) if value not in ("", None) else 0
+    except ValueError:
+        return 0
+
+
+def window_label(window):
+    return f"0x{window:x}" if window else ""
+
+
+class ClickPlan:
+    # Immutable, array-backed snapshot of the position list.
+    # The clicker thread only reads from this, it never touches the Treeview.
+    # Positions bound to a window have window-relative x/y; `windows` is None
+    # when nothing is bound so plain plans don't pay 8 bytes per position.
+    # `conditions` is None, or a tuple with a ScreenCondition (or None) each;
+    # `steps` likewise holds the parsed arguments of step rows.
+    __slots__ = ("xs", "ys", "modes", "buttons", "windows", "conditions", "steps")
+
+    def __init__(self, xs, ys, modes, buttons, windows=None, conditions=None, steps=None):
+        # read-only views so nobody can edit a plan that a worker is iterating
+        self.xs = memoryview(xs).toreadonly()
+        self.ys = memoryview(ys).toreadonly()
+        self.modes = memoryview(modes).toreadonly()
+        self.buttons = memoryview(buttons).toreadonly()
+        self.windows = memoryview(windows).toreadonly() if windows is not None and any(windows) else None
+        self.conditions = tuple(conditions) if conditions is not None and any(conditions) else None
+        self.steps = (tuple(steps) if steps is not None and any(step is not None for step in steps)
+                      else None)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, i):
+        return self.xs[i], self.ys[i], self.modes[i], self.buttons[i]
+
+    def __iter__(self):
+        return zip(self.xs, self.ys, self.modes, self.buttons)
+
+    def bound(self):
+        return self.windows is not None
+
+    def programmed(self):
+        # has step rows, so it runs as a StepProgram
+        return self.steps is not None
+
+    def window(self, i):
+        return 0 if self.windows is None else self.windows[i]
+
+    def subset(self, indices):
+        # plan of just these positions, in this order
+        arrays = [None if view is None else array(view.format, (view[i] for i in indices))
+                  for view in (self.xs, self.ys, self.modes, self.buttons, self.windows)]
+        conditions = None if self.conditions is None else [self.conditions[i] for i in indices]
+        steps = None if self.steps is None else [self.steps[i] for i in indices]
+        return ClickPlan(*arrays, conditions=conditions, steps=steps)
+
+    @classmethod
+    def compile(cls, rows, button=None):
+        # rows are Treeview value tuples:
+        # (pos, x, y, click type, mode[, window[, condition label, condition json[, step]]])
+        # button overrides the per-row click type (the run uses the global one).
+        # Raises ValueError for a step row with a bad argument.
+        xs, ys = array("i"), array("i")
+        modes, buttons = array("B"), array("B")
+        windows = array("Q")
+        conditions = []
+        steps = []
+        forced = None if button is None else button_code(button)
+        row_code = cls.compile_row
+        for index, row in enumerate(rows):
+            x, y, mode, btn, window, condition, step = row_code(row, index, forced)
+            xs.append(x)
+            ys.append(y)
+            modes.append(mode)
+            buttons.append(btn)
+            windows.append(window)
+            conditions.append(condition)
+            steps.append(step)
+        return cls(xs, ys, modes, buttons, windows, conditions, steps)
+
+    @staticmethod
+    def compile_row(row, index, forced=None):
+        # one row -> (x, y, mode, button, window, condition, step); `forced`
+        # is the button code that overrides the row's click type
+        _, x, y, click_type, mode = row[:5]
+        mode = mode_code(mode)
+        spec = row[7] if len(row) > 7 else None
+        return (int(float(x)), int(float(y)), mode,
+                button_code(click_type) if forced is None else forced,
+                window_code(row[5]) if len(row) > 5 else 0,
+                ScreenCondition.from_spec(spec) if spec else None,
+                parse_step(mode, row[8] if len(row) > 8 else "", index) if mode >= MODE_MOVE else None)
+
+    def patched(self, rows, n, button=None):
+        # copy cut to `n` positions with `rows` ({index: row values})
+        # compiled in; the other positions are copied, not parsed again
+        columns = []
+        for view, code in ((self.xs, "i"), (self.ys, "i"), (self.modes, "B"), (self.buttons, "B"),
+                           (self.windows, "Q")):
+            column = array(code)
+            if view is not None:
+                column.frombytes(view[:n].cast("B"))
+            else:
+                column.frombytes(bytes(column.itemsize * min(n, len(self))))
+            columns.append(column)
+        conditions = list(self.conditions or (None,) * len(self))[:n]
+        steps = list(self.steps or (None,) * len(self))[:n]
+        forced = None if button is None else button_code(button)
+        for index, row in sorted(rows.items()):
+            compiled = self.compile_row(row, index, forced)
+            for column, value in zip(columns + [conditions, steps], compiled):
+                if index < len(column):
+                    column[index] = value
+                else:
+                    column.append(value)
+        return ClickPlan(*columns, conditions=conditions, steps=steps)
+
+
+# Settings snapshot taken on the main thread when a run starts
+# Humanization (see Humanizer) is off unless delay_jitter or offset_sigma
+# is set; a negative seed draws a fresh one per run. `adaptive` lets
+# AdaptiveRate move the delay within [adapt_min, adapt_max].
+RunSettings = namedtuple("RunSettings", [
+    "delay", "repeats", "cycles", "cycle_delay",
+    "double_mode", "double_freq", "double_target", "schedule_policy",
+    "delay_jitter", "offset_sigma", "offset_radius", "seed",
+    "adaptive", "adapt_min", "adapt_max",
+], defaults=(0.0, 0.0, 0.0, -1, False, 0.01, 1.0))
+
+
+def parse_double_target(target):
+    # "All Positions" -> -1, "Position N" -> N-1
+    try:
+        return int(str(target).split()[1]) - 1
+    except (IndexError, ValueError):
+        return -1
+
+
+# --- Travel Order ---
+OPTIMIZE_BUDGET = 0.5   # seconds of 2-opt before settling for the tour so far
+CURSOR_SPEED = 3000.0   # px/s of a tweened move, for the time saved estimate
+
+
+def loop_length(xs, ys, order):
+    # closed loop: the next cycle starts back at the first position
+    if len(order) < 2:
+        return 0.0
+    hypot = math.hypot
+    total = 0.0
+    prev = order[-1]
+    for i in order:
+        total += hypot(xs[i] - xs[prev], ys[i] - ys[prev])
+        prev = i
+    return total
+
+
+def nearest_neighbour_tour(xs, ys):
+    # Greedy tour from point 0. Points live in a grid of roughly one point
+    # per cell and the search widens ring by ring, so it stays fast on
+    # large lists where the plain O(n^2) scan would not.
+    n = len(xs)
+    left, top = min(xs), min(ys)
+    area = (max(xs) - left + 1) * (max(ys) - top + 1)
+    cell = max(1.0, math.sqrt(area / n))
+    grid = {}
+    for i in range(1, n):
+        grid.setdefault((int((xs[i] - left) // cell), int((ys[i] - top) // cell)), []).append(i)
+    hypot = math.hypot
+    tour = [0]
+    current = 0
+    for _ in range(n - 1):
+        cx, cy = int((xs[current] - left) // cell), int((ys[current] - top) // cell)
+        best, best_d, r = -1, 0.0, 0
+        while True:
+            for gx in range(cx - r, cx + r + 1):
+                edge = gx in (cx - r, cx + r)
+                for gy in (range(cy - r, cy + r + 1) if edge else (cy - r, cy + r)):
+                    for j in grid.get((gx, gy), ()):
+                        d = hypot(xs[j] - xs[current], ys[j] - ys[current])
+                        if best < 0 or d < best_d:
+                            best, best_d = j, d
+            # anything further out is at least r cells away
+            if best >= 0 and best_d <= r * cell:
+                break
+            r += 1
+        key = (int((xs[best] - left) // cell), int((ys[best] - top) // cell))
+        bucket = grid[key]
+        bucket.remove(best)
+        if not bucket:
+            del grid[key]
+        tour.append(best)
+        current = best
+    return tour
+
+
+def two_opt(xs, ys, tour, budget=OPTIMIZE_BUDGET):
+    # Reverses tour segments while that shortens the loop, until a full
+    # pass finds nothing or the time budget is spent. tour[0] stays first.
+    n = len(tour)
+    hypot = math.hypot
+    deadline = time.perf_counter() + budget
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            ax, ay, bx, by = xs[a], ys[a], xs[b], ys[b]
+            ab = hypot(bx - ax, by - ay)
+            for j in range(i + 2, n if i else n - 1):
+                c, d = tour[j], tour[(j + 1) % n]
+                cx, cy, dx, dy = xs[c], ys[c], xs[d], ys[d]
+                delta = hypot(cx - ax, cy - ay) + hypot(dx - bx, dy - by) - ab - hypot(dx - cx, dy - cy)
+                if delta < -1e-9:
+                    tour[i + 1:j + 1] = tour[j:i:-1]
+                    b = tour[i + 1]
+                    bx, by = xs[b], ys[b]
+                    ab = hypot(bx - ax, by - ay)
+                    improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return tour
+
+
+def travel_order(plan, movable=None, budget=OPTIMIZE_BUDGET):
+    # New position order (old indices) that shortens the cursor's loop over
+    # the positions in `movable` (default: all). Window-bound positions
+    # never move the pointer and keep their slot, like everything outside
+    # `movable`. Returns (order, loop length before, after) in px.
+    n = len(plan)
+    if movable is None:
+        movable = range(n)
+    slots = [i for i in movable if not plan.window(i)]
+    order = list(range(n))
+    xs, ys = plan.xs, plan.ys
+    pointer = [i for i in range(n) if not plan.window(i)]
+    before = loop_length(xs, ys, pointer)
+    if len(slots) > 3:
+        sx, sy = [xs[i] for i in slots], [ys[i] for i in slots]
+        tour = two_opt(sx, sy, nearest_neighbour_tour(sx, sy), budget)
+        for slot, k in zip(slots, tour):
+            order[slot] = slots[k]
+    after = loop_length(xs, ys, [order[i] for i in pointer])
+    if after >= before:
+        # a partial selection can lose to the hand-made order, keep that
+        return list(range(n)), before, before
+    return order, before, after
+
+
+# --- Screen Conditions ---
+COND_PIXEL = "pixel"  # click only if the pixel matches, otherwise skip
+COND_WAIT = "wait"    # wait until the region matches (or time out), then click
+CONDITION_KINDS = (COND_PIXEL, COND_WAIT)
+CONDITION_POLL = 0.005  # 200 Hz while waiting on a region
+CONDITION_REGION = 16   # side of the region captured for "wait" templates
+
+
+class ScreenCapture:
+    # Small-region screen grabs for conditions. mss reads through XShm
+    # shared memory on X11 (and the native APIs elsewhere); Pillow's
+    # ImageGrab is the fallback. mss handles are not thread safe, so each
+    # thread gets its own.
+    def __init__(self):
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Screen conditions need numpy") from None
+        self.np = numpy
+        try:
+            import mss
+            self._mss = mss.mss
+            self.layout = "BGRA"
+        except ImportError:
+            try:
+                from PIL import ImageGrab
+            except ImportError:
+                raise RuntimeError("Screen conditions need mss or Pillow") from None
+            self._mss = None
+            self.image_grab = ImageGrab
+            self.layout = "RGB"
+        self.local = threading.local()
+
+    def grab(self, left, top, width, height):
+        # raw pixel bytes in self.layout order
+        if self._mss is None:
+            box = (left, top, left + width, top + height)
+            return self.image_grab.grab(bbox=box).convert("RGB").tobytes()
+        sct = getattr(self.local, "sct", None)
+        if sct is None:
+            sct = self.local.sct = self._mss()
+        return sct.grab({"left": left, "top": top, "width": width, "height": height}).raw
+
+    def frame(self, raw, width, height):
+        # (height, width, 3) RGB view over grabbed bytes, no copy
+        np = self.np
+        frame = np.frombuffer(raw, np.uint8).reshape(height, width, len(self.layout))
+        return frame[:, :, 2::-1] if self.layout == "BGRA" else frame
+
+    def grab_rgb(self, left, top, width, height):
+        frame = self.frame(self.grab(left, top, width, height), width, height)
+        return self.np.ascontiguousarray(frame).tobytes()
+
+
+@functools.lru_cache(maxsize=256)
+def load_template(rgb, width, height):
+    # decoded once per template, shared by every run that uses it
+    import numpy as np
+    return np.frombuffer(rgb, np.uint8).reshape(height, width, 3).astype(np.int16)
+
+
+class ScreenCondition:
+    # A region of the screen (absolute coordinates, captured when the
+    # condition was set) and the RGB template it has to match within
+    # `tolerance` per channel. Polls whose raw bytes equal the previous
+    # grab reuse the previous verdict without touching NumPy.
+    __slots__ = ("kind", "left", "top", "width", "height", "rgb", "tolerance", "timeout",
+                 "_last_raw", "_last_result")
+
+    def __init__(self, kind, left, top, width, height, rgb, tolerance=16, timeout=5.0):
+        if kind not in CONDITION_KINDS:
+            raise ValueError(f"Unknown condition {kind!r}")
+        self.kind = kind
+        self.left, self.top = int(left), int(top)
+        self.width, self.height = int(width), int(height)
+        self.rgb = rgb
+        self.tolerance = int(tolerance)
+        self.timeout = float(timeout)
+        self._last_raw = None
+        self._last_result = False
+
+    @classmethod
+    def from_spec(cls, spec):
+        # spec is the profile/Treeview form, a dict or its JSON text
+        if isinstance(spec, str):
+            spec = json.loads(spec)
+        try:
+            return cls(spec["kind"], spec["x"], spec["y"], spec["w"], spec["h"], base64.b64decode(spec["rgb"]),
+                       spec.get("tol", 16), spec.get("timeout", 5.0))
+        except KeyError as e:
+            raise ValueError(f"condition has no {e.args[0]!r}") from None
+
+    @classmethod
+    def capture(cls, capture, kind, x, y, tolerance=16, timeout=5.0):
+        # template of what is on screen around (x, y) right now
+        size = 1 if kind == COND_PIXEL else CONDITION_REGION
+        left, top = x - size // 2, y - size // 2
+        return cls(kind, left, top, size, size, capture.grab_rgb(left, top, size, size), tolerance, timeout)
+
+    def to_spec(self):
+        return {"kind": self.kind, "x": self.left, "y": self.top, "w": self.width, "h": self.height,
+                "rgb": base64.b64encode(self.rgb).decode("ascii"), "tol": self.tolerance, "timeout": self.timeout}
+
+    def matches(self, capture):
+        raw = capture.grab(self.left, self.top, self.width, self.height)
+        if raw == self._last_raw:
+            return self._last_result
+        frame = capture.frame(raw, self.width, self.height)
+        template = load_template(self.rgb, self.width, self.height)
+        result = bool((capture.np.abs(frame - template) <= self.tolerance).all())
+        self._last_raw, self._last_result = bytes(raw), result
+        return result
+
+
+def condition_label(spec):
+    # short text for the Treeview "If" column
+    if not spec:
+        return ""
+    if isinstance(spec, str):
+        spec = json.loads(spec)
+    return "pixel" if spec["kind"] == COND_PIXEL else f"wait {spec.get('timeout', 5.0):g}s"
+
+
+# --- Adaptive Pacing ---
+# Closed-loop delay: after a click the engine watches a small square around
+# the position until its pixels change. That time is the app's response
+# latency there. The click rate then follows AIMD: +ADAPT_INCREASE clicks/s
+# per click that registered, times ADAPT_BACKOFF when a position that
+# responds before didn't, within [adapt_min, adapt_max] and never faster
+# than the clicked position's learned latency.
+ADAPT_REGION = 9         # side of the watched square, px
+ADAPT_POLL = 0.002       # seconds between grabs while waiting
+ADAPT_INCREASE = 1.0     # clicks/s added per registered click
+ADAPT_BACKOFF = 0.5      # rate factor after a lost click
+ADAPT_EWMA = 0.2         # weight of a new latency sample
+ADAPT_MARGIN = 1.2       # delay floor = learned latency x this
+ADAPT_SILENT = 3         # misses before a never-responding position is no longer watched
+
+
+class AdaptiveRate:
+    # One run's controller. Per position (plan order): learned latency
+    # (EWMA, seconds), registered and missed clicks. The watch times out
+    # after adapt_max.
+    def __init__(self, n, settings, capture=None):
+        self.capture = capture or ScreenCapture()
+        self.min_delay = max(0.0, settings.adapt_min)
+        self.max_delay = max(self.min_delay, settings.adapt_max)
+        self.start_delay = self.delay = min(max(settings.delay, self.min_delay), self.max_delay)
+        self.region = None
+        self.baseline = None
+        self.resize(n)
+
+    def resize(self, n):
+        # a swapped plan starts learning over, the delay carries on
+        self.latency = array("d", bytes(8 * n))
+        self.hits = array("I", bytes(4 * n))
+        self.misses = array("I", bytes(4 * n))
+
+    def watching(self, idx):
+        return self.hits[idx] > 0 or self.misses[idx] < ADAPT_SILENT
+
+    def before(self, x, y):
+        half = ADAPT_REGION // 2
+        self.region = (max(0, x - half), max(0, y - half), ADAPT_REGION, ADAPT_REGION)
+        self.baseline = self.capture.grab(*self.region)
+
+    def after(self, idx, injected, wake):
+        # waits for the watched square to change; a pause/stop (`wake` set)
+        # ends the wait without a sample
+        grab, region, baseline = self.capture.grab, self.region, self.baseline
+        deadline = injected + self.max_delay
+        while True:
+            now = time.perf_counter()
+            if grab(*region) != baseline:
+                self.registered(idx, now - injected)
+                return
+            if now >= deadline:
+                self.missed(idx)
+                return
+            if wake.wait(ADAPT_POLL):
+                return
+
+    def registered(self, idx, latency):
+        learned = self.latency[idx]
+        if self.hits[idx]:
+            learned += ADAPT_EWMA * (latency - learned)
+        else:
+            learned = latency
+        self.latency[idx] = learned
+        self.hits[idx] += 1
+        rate = 1.0 / self.delay + ADAPT_INCREASE if self.delay > 0 else float("inf")
+        self.delay = min(self.max_delay, max(1.0 / rate, learned * ADAPT_MARGIN, self.min_delay))
+
+    def missed(self, idx):
+        self.misses[idx] += 1
+        if self.hits[idx]:
+            # it answered before, so this click was lost
+            self.delay = min(self.max_delay, max(self.delay, self.min_delay, 1e-3) / ADAPT_BACKOFF)
+
+    def latencies_ms(self):
+        # learned latency per position, None where nothing registered
+        return [round(latency * 1000, 1) if hits else None for latency, hits in zip(self.latency, self.hits)]
+
+    def summary(self):
+        learned = sorted((latency, idx) for idx, (latency, hits) in enumerate(zip(self.latency, self.hits)) if hits)
+        silent = sum(1 for hits, misses in zip(self.hits, self.misses) if not hits and misses)
+        text = f"adaptive delay {self.start_delay:.3f} -> {self.delay:.3f} s"
+        if learned:
+            latency, idx = learned[-1]
+            text += (f", response median {learned[len(learned) // 2][0] * 1000:.0f} ms,"
+                     f" slowest #{idx + 1} {latency * 1000:.0f} ms")
+        if silent:
+            text += f", {silent} positions without response"
+        return text
+
+
+# --- Run Timeline ---
+class RunTimeline:
+    # The whole run as a lazy stream of plan indices, one per click slot:
+    # per cycle the double-click rule pass (when due) and then the normal
+    # sequence. Counts come from closed formulas, so totals and ETA are O(1)
+    # however many cycles a run has.
+    def __init__(self, plan, settings):
+        self.settings = settings
+        self.set_plan(plan)
+
+    def set_plan(self, plan):
+        s = self.settings
+        n = len(plan)
+        doubles = plan.modes.tobytes().count(MODE_DOUBLE)
+        self.plan = plan
+        self.normal_slots = n * s.repeats
+        self.normal_clicks = (n + doubles) * s.repeats
+        target = s.double_target
+        if s.double_mode == "Random" or target < 0:
+            self.rule_indices = range(n)
+            self.rule_clicks = n + doubles
+        elif target < n:
+            self.rule_indices = (target,)
+            self.rule_clicks = 2 if plan.modes[target] == MODE_DOUBLE else 1
+        else:
+            self.rule_indices = ()
+            self.rule_clicks = 0
+
+    def rule_cycles(self, first, last):
+        # cycles in [first, last] where the double-click rule runs
+        freq = self.settings.double_freq
+        if freq <= 0 or last < first:
+            return 0
+        return last // freq - (first - 1) // freq
+
+    def remaining(self, cycle):
+        # (slots, clicks) from the start of `cycle` to the end of the run
+        cycles = self.settings.cycles
+        count = max(0, cycles - cycle + 1)
+        rules = self.rule_cycles(cycle, cycles)
+        return (self.normal_slots * count + len(self.rule_indices) * rules,
+                self.normal_clicks * count + self.rule_clicks * rules)
+
+    def cycle_slots(self, cycle):
+        repeats = self.settings.repeats
+        n = len(self.plan)
+        if repeats == 1:
+            normal = range(n)
+        else:
+            normal = itertools.chain.from_iterable(itertools.repeat(i, repeats) for i in range(n))
+        if self.rule_cycles(cycle, cycle):
+            return itertools.chain(self.rule_indices, normal)
+        return iter(normal)
+
+    def eta(self, slots_left, until_due, gaps, delay=None):
+        # seconds until the last slot fires: the next slot is due in
+        # `until_due`, then one interval per slot (`delay`, the settings'
+        # by default) plus the cycle delays still ahead
+        if slots_left <= 0:
+            return 0.0
+        s = self.settings
+        delay = s.delay if delay is None else delay
+        return max(0.0, until_due) + (slots_left - 1) * delay + gaps * s.cycle_delay
+
+
+# --- Click Scheduler ---
+# What to do when the worker falls more than one interval behind
+POLICY_CATCH_UP = "Catch up"  # fire the missed clicks back to back
+POLICY_SKIP = "Skip"          # drop missed slots, stay on the original grid
+POLICY_RESET = "Reset"        # restart the grid from now
+SCHEDULE_POLICIES = (POLICY_SKIP, POLICY_CATCH_UP, POLICY_RESET)
+
+
+class ClickScheduler:
+    # Deadline based pacing on a monotonic clock. Due times are absolute
+    # (start + n * interval), so time spent on effects/UI between clicks
+    # does not add up into drift. Waits sleep on the `wake` event, so
+    # interrupt() cuts any wait short (stop/pause).
+    def __init__(self, interval, policy=POLICY_SKIP, clock=time.perf_counter,
+                 sleep=None, spin=0.002):
+        self.interval = max(0.0, float(interval))
+        self.policy = policy
+        self.clock = clock
+        self.wake = threading.Event()
+        self.sleep = sleep or self.wake.wait
+        self.spin = spin  # last stretch before a deadline is busy-waited
+        self.next_due = None
+        self.last_due = None
+        # iterator of humanized intervals drawn around `base`, replaces
+        # `interval`; `gap` is the one drawn for the pending slot
+        self.gaps = None
+        self.base = self.interval
+        self.gap = None
+        self.ticks = 0
+        self.skipped = 0
+        self.first_fire = None
+        self.last_fire = None
+        self.late_sum = 0.0
+        self.late_max = 0.0
+
+    def start(self):
+        self.next_due = self.clock()
+        self.last_due = None
+        return self.next_due
+
+    def set_interval(self, interval):
+        # new pace (adaptive delay) from the pending slot on; its deadline is
+        # worked out again from the last one, keeping the drawn jitter and
+        # the lateness policy
+        self.interval = max(0.0, float(interval))
+        if self.last_due is not None:
+            self.next_due = self.follow(self.last_due, self.clock())
+
+    def delay(self, seconds):
+        # push the next deadline out (cycle delay)
+        self.next_due += max(0.0, seconds)
+
+    def time_until_due(self):
+        return self.next_due - self.clock()
+
+    def interrupt(self):
+        self.wake.set()
+
+    def interrupted(self):
+        return self.wake.is_set()
+
+    def wait_until(self, deadline):
+        # hybrid wait: coarse sleep, then spin for sub-millisecond accuracy;
+        # False when interrupted before the deadline
+        wake = self.wake
+        remaining = deadline - self.clock()
+        if remaining > self.spin:
+            self.sleep(remaining - self.spin)
+        while not wake.is_set() and self.clock() < deadline:
+            pass
+        return not wake.is_set()
+
+    def wait_next(self):
+        # due time of the slot that fired, or None when interrupted (the
+        # slot stays pending)
+        due = self.next_due
+        if not self.wait_until(due):
+            return None
+        now = self.clock()
+        late = now - due
+        self.ticks += 1
+        self.late_sum += late
+        if late > self.late_max:
+            self.late_max = late
+        if self.first_fire is None:
+            self.first_fire = now
+        self.last_fire = now
+        self.last_due = due
+        if self.gaps is not None:
+            self.gap = next(self.gaps)
+        self.next_due = self.follow(due, now)
+        return due
+
+    def follow(self, due, now):
+        # deadline of the slot after `due`, which fired at `now`
+        interval = self.interval
+        if self.gap is None or self.gaps is None:
+            nxt = due + interval
+        elif interval == self.base or self.base <= 0:
+            nxt = due + self.gap
+        else:
+            # jitter drawn around the old pace, scaled to the new one
+            nxt = due + self.gap * interval / self.base
+        if now > nxt and interval > 0:
+            if self.policy == POLICY_SKIP:
+                missed = int((now - due) // interval)
+                self.skipped += missed
+                nxt = due + (missed + 1) * interval
+            elif self.policy == POLICY_RESET:
+                nxt = now + interval
+        return nxt
+
+    def achieved_rate(self):
+        if self.ticks < 2 or self.last_fire <= self.first_fire:
+            return 0.0
+        return (self.ticks - 1) / (self.last_fire - self.first_fire)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "rate": self.achieved_rate(),
+            "jitter_mean": self.late_sum / self.ticks if self.ticks else 0.0,
+            "jitter_max": self.late_max,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['rate']:.1f} clicks/s, jitter avg {s['jitter_mean'] * 1000:.2f} ms"
+                f" / max {s['jitter_max'] * 1000:.2f} ms")
+
+
+# --- Humanization ---
+# Timing and position jitter, drawn ahead of time in NumPy batches so the
+# clicker only takes the next number off a list.
+HUMANIZE_BATCH = 4096
+HUMANIZE_TRUNCATE = 2.0  # delays outside mean +- this many sigmas are redrawn
+HUMANIZE_RADIUS = 3.0    # default offset radius, in sigmas
+
+
+def truncated_normal(rng, mean, sigma, n):
+    # n draws of normal(mean, sigma) within mean +- HUMANIZE_TRUNCATE sigma,
+    # never below 0, as a list
+    low = max(0.0, mean - HUMANIZE_TRUNCATE * sigma)
+    high = mean + HUMANIZE_TRUNCATE * sigma
+    out = rng.normal(mean, sigma, n)
+    bad = (out < low) | (out > high)
+    while bad.any():
+        out[bad] = rng.normal(mean, sigma, int(bad.sum()))
+        bad = (out < low) | (out > high)
+    return out.tolist()
+
+
+def clamped_offsets(np, rng, sigma, radius, n):
+    # n Gaussian (dx, dy) pixel offsets, the ones beyond `radius` pulled in
+    # onto the circle; truncated to whole pixels, so they stay inside it
+    d = rng.normal(0.0, sigma, (2, n))
+    r = np.hypot(d[0], d[1])
+    d *= np.minimum(1.0, radius / np.maximum(r, 1e-9))
+    return list(zip(*np.trunc(d).astype(int).tolist()))
+
+
+class JitterStream:
+    # Endless samples from draw(n). The first batch is drawn up front, every
+    # next one on a daemon thread while the current one is served, so
+    # taking a sample is one list step. `stalls` counts batches the
+    # consumer had to wait for.
+    def __init__(self, draw, batch=HUMANIZE_BATCH):
+        self.draw = draw
+        self.batch = batch
+        self.ready = queue.Queue(maxsize=1)
+        self.ready.put(draw(batch))
+        self.closed = False
+        self.stalls = 0
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _fill(self):
+        while not self.closed:
+            samples = self.draw(self.batch)
+            while not self.closed:
+                try:
+                    self.ready.put(samples, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def __iter__(self):
+        ready = self.ready
+        while True:
+            if ready.empty():
+                self.stalls += 1
+            yield from ready.get()
+
+    def close(self):
+        self.closed = True
+
+
+def humanized(settings):
+    return settings.delay_jitter > 0 or settings.offset_sigma > 0
+
+
+class Humanizer:
+    # One run's jitter: `gaps` (seconds between slots, truncated normal
+    # around the delay, sigma = delay_jitter * delay) and `offsets` ((dx, dy)
+    # per click, sigma offset_sigma px, clamped to offset_radius). Either is
+    # None when off. The two streams get child seeds of one SeedSequence,
+    # so a seed reproduces both however they interleave; `seed` is the one
+    # used, also when it was drawn fresh.
+    def __init__(self, settings, batch=HUMANIZE_BATCH):
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("Humanization needs numpy") from None
+        sequence = np.random.SeedSequence(settings.seed if settings.seed >= 0 else None)
+        self.seed = sequence.entropy
+        delay_seed, offset_seed = sequence.spawn(2)
+        self.streams = []
+        self.gaps = self.offsets = None
+        if settings.delay_jitter > 0 and settings.delay > 0:
+            self.gaps = iter(self._stream(functools.partial(
+                truncated_normal, np.random.default_rng(delay_seed), settings.delay,
+                settings.delay * settings.delay_jitter), batch))
+        if settings.offset_sigma > 0:
+            radius = settings.offset_radius or HUMANIZE_RADIUS * settings.offset_sigma
+            self.offsets = iter(self._stream(functools.partial(
+                clamped_offsets, np, np.random.default_rng(offset_seed), settings.offset_sigma, radius), batch))
+
+    def _stream(self, draw, batch):
+        stream = JitterStream(draw, batch)
+        self.streams.append(stream)
+        return stream
+
+    def stalls(self):
+        return sum(stream.stalls for stream in self.streams)
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+
+# --- Input Backends ---
+DOUBLE_CLICK_INTERVAL = 0.1
+
+
+class InputBackend:
+    # What the clicker talks to. click() moves and clicks in one call so a
+    # backend can send everything as one batch; flush() pushes it out.
+    name = "base"
+
+    def position(self):
+        raise NotImplementedError
+
+    def pointer(self):
+        # (x, y, held buttons as a 1 << BUTTON_* mask), sampled by the
+        # recorder; backends that cannot see the buttons report none held
+        x, y = self.position()
+        return x, y, 0
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        raise NotImplementedError
+
+    def press(self, x, y, button=BUTTON_LEFT):
+        # separate press/release, for replaying drags
+        raise NotImplementedError(f"the {self.name} backend cannot replay recordings")
+
+    def release(self, x, y, button=BUTTON_LEFT):
+        raise NotImplementedError(f"the {self.name} backend cannot replay recordings")
+
+    def drag(self, x, y, x2, y2, button=BUTTON_LEFT):
+        self.press(x, y, button)
+        self.move(x2, y2)
+        self.release(x2, y2, button)
+
+    def scroll(self, x, y, clicks):
+        # positive clicks scroll up, negative down
+        raise NotImplementedError(f"the {self.name} backend cannot scroll")
+
+    def key_codes(self, keys):
+        # key names -> whatever key() wants; resolved once when a step
+        # program is linked, ValueError for names the backend doesn't know
+        return tuple(keys)
+
+    def key(self, codes):
+        # press the chord in order, release it in reverse
+        raise NotImplementedError(f"the {self.name} backend cannot type keys")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def window_at(self, x, y):
+        # (window id, x, y relative to that window) under a screen point
+        raise NotImplementedError(f"the {self.name} backend cannot bind positions to windows")
+
+
+class PyAutoGuiBackend(InputBackend):
+    # Compatibility backend, works everywhere pyautogui does
+    name = "pyautogui"
+
+    def __init__(self, pause=0.0):
+        import pyautogui
+        self.pyautogui = pyautogui
+        # pacing is the scheduler's job, drop pyautogui's per-call sleep
+        pyautogui.PAUSE = pause
+        # pyautogui can't read the buttons; on Windows ask user32 directly
+        self.key_state = None
+        if sys.platform == "win32":
+            import ctypes
+            self.key_state = ctypes.windll.user32.GetAsyncKeyState
+
+    def position(self):
+        x, y = self.pyautogui.position()
+        return x, y
+
+    def pointer(self):
+        x, y = self.pyautogui.position()
+        held = 0
+        if self.key_state is not None:
+            # VK_LBUTTON, VK_RBUTTON, VK_MBUTTON in BUTTON_* order
+            for button, vk in enumerate((0x01, 0x02, 0x04)):
+                if self.key_state(vk) & 0x8000:
+                    held |= 1 << button
+        return x, y, held
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        self.pyautogui.click(x, y, clicks=count, interval=interval, button=BUTTON_NAMES[button])
+
+    def press(self, x, y, button=BUTTON_LEFT):
+        self.pyautogui.mouseDown(x, y, button=BUTTON_NAMES[button])
+
+    def release(self, x, y, button=BUTTON_LEFT):
+        self.pyautogui.mouseUp(x, y, button=BUTTON_NAMES[button])
+
+    def scroll(self, x, y, clicks):
+        self.pyautogui.scroll(clicks, x=x, y=y)
+
+    def key_codes(self, keys):
+        for name in keys:
+            if name not in self.pyautogui.KEYBOARD_KEYS:
+                raise ValueError(f"Unknown key: {name}")
+        return tuple(keys)
+
+    def key(self, codes):
+        self.pyautogui.hotkey(*codes)
+
+
+class XTestBackend(InputBackend):
+    # Talks XTEST directly through python-xlib (already pulled in by
+    # pyautogui on Linux). Move + press + release are queued and sent in a
+    # single flush; the gap of a double click is a server-side delay.
+    name = "xtest"
+    X_BUTTONS = (1, 3, 2)  # left, right, middle
+    X_SCROLL = (4, 5)  # up, down
+    # key names (pyautogui's spelling) that aren't X keysym names
+    X_KEYSYMS = {
+        "ctrl": "Control_L", "shift": "Shift_L", "alt": "Alt_L", "win": "Super_L", "super": "Super_L",
+        "enter": "Return", "esc": "Escape", "backspace": "BackSpace", "del": "Delete", "delete": "Delete",
+        "pageup": "Prior", "pagedown": "Next", "capslock": "Caps_Lock", "printscreen": "Print",
+    }
+
+    def __init__(self, display_name=None):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.fake_input = xtest.fake_input
+        self.display = display.Display(display_name)
+        if not self.display.has_extension("XTEST"):
+            self.display.close()
+            raise RuntimeError("X server has no XTEST extension")
+        self.root = self.display.screen().root
+
+    def position(self):
+        pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def pointer(self):
+        # one round trip for position and button state
+        pointer = self.root.query_pointer()
+        mask = pointer.mask
+        held = 0
+        for button, code in enumerate(self.X_BUTTONS):
+            if mask & (self.X.Button1Mask << (code - 1)):
+                held |= 1 << button
+        return pointer.root_x, pointer.root_y, held
+
+    def move(self, x, y):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.display.flush()
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        X, d, fake = self.X, self.display, self.fake_input
+        code = self.X_BUTTONS[button]
+        fake(d, X.MotionNotify, x=x, y=y)
+        for i in range(count):
+            fake(d, X.ButtonPress, code, time=int(interval * 1000) if i else X.CurrentTime)
+            fake(d, X.ButtonRelease, code)
+
+    def press(self, x, y, button=BUTTON_LEFT):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.fake_input(self.display, self.X.ButtonPress, self.X_BUTTONS[button])
+
+    def release(self, x, y, button=BUTTON_LEFT):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.fake_input(self.display, self.X.ButtonRelease, self.X_BUTTONS[button])
+
+    def drag(self, x, y, x2, y2, button=BUTTON_LEFT):
+        # queued like click(), goes out with the next flush
+        X, d, fake = self.X, self.display, self.fake_input
+        code = self.X_BUTTONS[button]
+        fake(d, X.MotionNotify, x=x, y=y)
+        fake(d, X.ButtonPress, code)
+        fake(d, X.MotionNotify, x=x2, y=y2)
+        fake(d, X.ButtonRelease, code)
+
+    def scroll(self, x, y, clicks):
+        X, d, fake = self.X, self.display, self.fake_input
+        code = self.X_SCROLL[clicks < 0]
+        fake(d, X.MotionNotify, x=x, y=y)
+        for _ in range(abs(clicks)):
+            fake(d, X.ButtonPress, code)
+            fake(d, X.ButtonRelease, code)
+
+    def key_codes(self, keys):
+        from Xlib import XK
+        codes = []
+        for name in keys:
+            symbol = self.X_KEYSYMS.get(name, name)
+            if symbol[:1] == "f" and symbol[1:].isdigit():
+                symbol = symbol.upper()  # f5 -> F5
+            keysym = XK.string_to_keysym(symbol)
+            code = self.display.keysym_to_keycode(keysym) if keysym else 0
+            if not code:
+                raise ValueError(f"Unknown key: {name}")
+            codes.append(code)
+        return tuple(codes)
+
+    def key(self, codes):
+        X, d, fake = self.X, self.display, self.fake_input
+        for code in codes:
+            fake(d, X.KeyPress, code)
+        for code in reversed(codes):
+            fake(d, X.KeyRelease, code)
+
+    def flush(self):
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+    def window_at(self, x, y):
+        # walk down to the deepest window under the point
+        window = self.root
+        while True:
+            child = window.query_pointer().child
+            if not child:
+                break
+            window = child
+        rel = window.translate_coords(self.root, x, y)
+        return window.id, rel.x, rel.y
+
+
+class XWindowBackend(InputBackend):
+    # Clicks one X11 window with synthetic button events (XSendEvent), so
+    # the real pointer never moves and other windows can be clicked at the
+    # same time. x/y are window-relative. Applications that ignore events
+    # with the send_event flag set will not react.
+    name = "xwindow"
+    X_BUTTONS = XTestBackend.X_BUTTONS
+
+    def __init__(self, window_id, display_name=None):
+        from Xlib import X, display
+        from Xlib.protocol import event
+        self.X = X
+        self.event = event
+        self.display = display.Display(display_name)
+        self.root = self.display.screen().root
+        self.window = self.display.create_resource_object("window", window_id)
+        # the window's origin on the root, for the root_x/root_y fields
+        origin = self.root.translate_coords(self.window, 0, 0)
+        self.origin = (origin.x, origin.y)
+
+    def position(self):
+        pointer = self.window.query_pointer()
+        return pointer.win_x, pointer.win_y
+
+    def _send(self, kind, mask, x, y, state, detail):
+        ev = kind(time=self.X.CurrentTime, root=self.root, window=self.window, child=self.X.NONE,
+                  root_x=self.origin[0] + x, root_y=self.origin[1] + y, event_x=x, event_y=y,
+                  state=state, same_screen=1, detail=detail)
+        self.window.send_event(ev, event_mask=mask, propagate=True)
+
+    def move(self, x, y):
+        self._send(self.event.MotionNotify, self.X.PointerMotionMask, x, y, 0, 0)
+        self.display.flush()
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        self._buttons(x, y, self.X_BUTTONS[button], count)
+
+    def _buttons(self, x, y, code, count):
+        X, ev = self.X, self.event
+        held = X.Button1Mask << (code - 1)
+        for _ in range(count):
+            self._send(ev.ButtonPress, X.ButtonPressMask, x, y, 0, code)
+            self._send(ev.ButtonRelease, X.ButtonReleaseMask, x, y, held, code)
+
+    def press(self, x, y, button=BUTTON_LEFT):
+        self._send(self.event.ButtonPress, self.X.ButtonPressMask, x, y, 0, self.X_BUTTONS[button])
+
+    def release(self, x, y, button=BUTTON_LEFT):
+        code = self.X_BUTTONS[button]
+        self._send(self.event.ButtonRelease, self.X.ButtonReleaseMask, x, y, self.X.Button1Mask << (code - 1), code)
+
+    def scroll(self, x, y, clicks):
+        self._buttons(x, y, XTestBackend.X_SCROLL[clicks < 0], abs(clicks))
+
+    def flush(self):
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+class NullBackend(InputBackend):
+    # Injects nothing; records what would have been sent (tests/benchmarks)
+    name = "null"
+
+    def __init__(self, record=True, clock=time.perf_counter):
+        self.record = record
+        self.clock = clock
+        self.events = []
+        self.clicks = 0
+        self.pos = (0, 0)
+        self.held = 0
+
+    def position(self):
+        return self.pos
+
+    def pointer(self):
+        return (*self.pos, self.held)
+
+    def move(self, x, y):
+        self.pos = (x, y)
+        if self.record:
+            self.events.append(("move", x, y, self.clock()))
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        self.pos = (x, y)
+        self.clicks += count
+        if self.record:
+            self.events.append(("click", x, y, button, count, self.clock()))
+
+    def press(self, x, y, button=BUTTON_LEFT):
+        self.pos = (x, y)
+        self.held |= 1 << button
+        self.clicks += 1
+        if self.record:
+            self.events.append(("press", x, y, button, self.clock()))
+
+    def release(self, x, y, button=BUTTON_LEFT):
+        self.pos = (x, y)
+        self.held &= ~(1 << button)
+        if self.record:
+            self.events.append(("release", x, y, button, self.clock()))
+
+    def scroll(self, x, y, clicks):
+        self.pos = (x, y)
+        if self.record:
+            self.events.append(("scroll", x, y, clicks, self.clock()))
+
+    def key(self, codes):
+        if self.record:
+            self.events.append(("key", codes, self.clock()))
+
+
+BACKENDS = {
+    "xtest": XTestBackend,
+    "pyautogui": PyAutoGuiBackend,
+    # CLI runs and the daemon can go on for hours, keep no event log
+    "null": lambda: NullBackend(record=False),
+}
+# backend for window-bound positions, one instance per target window
+WINDOW_BACKENDS = {
+    "xwindow": XWindowBackend,
+    "null": lambda window_id: NullBackend(record=False),
+}
+BACKEND_CHOICES = ("auto", "xtest", "pyautogui")
+
+
+def create_backend(name="auto"):
+    # "auto" takes the fastest one that works on this machine
+    if name != "auto":
+        return BACKENDS[name]()
+    errors = []
+    for candidate in ("xtest", "pyautogui"):
+        try:
+            return BACKENDS[candidate]()
+        except Exception as e:
+            errors.append(f"{candidate}: {e}")
+    raise RuntimeError("No input backend available (" + "; ".join(errors) + ")")
+
+
+# --- Telemetry ---
+# Latency histogram bucket upper bounds, seconds (Prometheus style, +Inf implied)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+TELEMETRY_CAPACITY = 65536
+
+
+class ClickTelemetry:
+    # Per-click timings in a fixed-size ring of preallocated typed arrays;
+    # record() only overwrites slots, nothing is allocated per click. The
+    # latency histogram is kept incrementally so the UI can draw it for free.
+    FIELDS = ("planned", "injected", "backend", "effects")
+
+    def __init__(self, capacity=TELEMETRY_CAPACITY, buckets=LATENCY_BUCKETS):
+        self.capacity = max(1, int(capacity))
+        self.buckets = tuple(buckets)
+        self.planned = array("d", bytes(8 * self.capacity))
+        self.injected = array("d", bytes(8 * self.capacity))
+        self.backend = array("d", bytes(8 * self.capacity))
+        self.effects = array("d", bytes(8 * self.capacity))
+        self.bins = array("Q", bytes(8 * (len(self.buckets) + 1)))
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.latency_sum = self.backend_sum = self.effects_sum = 0.0
+        for i in range(len(self.bins)):
+            self.bins[i] = 0
+
+    def record(self, planned, injected, backend, effects):
+        i = self.count % self.capacity
+        self.planned[i] = planned
+        self.injected[i] = injected
+        self.backend[i] = backend
+        self.effects[i] = effects
+        self.count += 1
+        late = injected - planned
+        self.latency_sum += late
+        self.backend_sum += backend
+        self.effects_sum += effects
+        self.bins[bisect.bisect_left(self.buckets, late)] += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def snapshot(self):
+        # the counters without the ring, small enough to send once a second
+        return {"count": self.count, "latency_sum": self.latency_sum, "backend_sum": self.backend_sum,
+                "effects_sum": self.effects_sum, "bins": list(self.bins), "rate": self.rate()}
+
+    def absorb(self, snapshot):
+        # add another process's counters (the supervisor's totals)
+        self.count += snapshot["count"]
+        self.latency_sum += snapshot["latency_sum"]
+        self.backend_sum += snapshot["backend_sum"]
+        self.effects_sum += snapshot["effects_sum"]
+        for i, n in enumerate(snapshot["bins"]):
+            self.bins[i] += n
+
+    def rows(self):
+        # oldest to newest of what is still in the ring
+        size = len(self)
+        start = self.count - size
+        for n in range(start, self.count):
+            i = n % self.capacity
+            yield n, self.planned[i], self.injected[i], self.backend[i], self.effects[i]
+
+    def rate(self):
+        size = len(self)
+        if size < 2:
+            return 0.0
+        first = self.injected[(self.count - size) % self.capacity]
+        last = self.injected[(self.count - 1) % self.capacity]
+        return (size - 1) / (last - first) if last > first else 0.0
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("click",) + self.FIELDS + ("latency",))
+            for n, planned, injected, backend, effects in self.rows():
+                writer.writerow((n, f"{planned:.6f}", f"{injected:.6f}", f"{backend:.6f}",
+                                 f"{effects:.6f}", f"{injected - planned:.6f}"))
+
+    def prometheus_text(self, rate=None):
+        # rate overrides the ring's own, for totals built with absorb()
+        rate = self.rate() if rate is None else rate
+        name = "multiclicker_click_latency_seconds"
+        lines = [
+            f"# HELP {name} Time between a click's planned and actual injection.",
+            f"# TYPE {name} histogram",
+        ]
+        total = 0
+        for bound, count in zip(self.buckets, self.bins):
+            total += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {total}')
+        lines += [
+            f'{name}_bucket{{le="+Inf"}} {self.count}',
+            f"{name}_sum {self.latency_sum:.9f}",
+            f"{name}_count {self.count}",
+            "# HELP multiclicker_backend_seconds_total Time spent in input backend calls.",
+            "# TYPE multiclicker_backend_seconds_total counter",
+            f"multiclicker_backend_seconds_total {self.backend_sum:.9f}",
+            "# HELP multiclicker_effects_seconds_total Time spent queueing effects and sound.",
+            "# TYPE multiclicker_effects_seconds_total counter",
+            f"multiclicker_effects_seconds_total {self.effects_sum:.9f}",
+            "# HELP multiclicker_click_rate Achieved clicks per second over the ring.",
+            "# TYPE multiclicker_click_rate gauge",
+            f"multiclicker_click_rate {rate:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, rate=None):
+        # written next to the target and renamed, so a scraper never reads
+        # a half-written file
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text(rate))
+        os.replace(tmp, path)
+
+
+class LatencyHistogram:
+    # Small bar chart of ClickTelemetry.bins for the Status panel. Bars are
+    # created once and only resized on update.
+    def __init__(self, parent, buckets=LATENCY_BUCKETS, width=96, height=44):
+        self.buckets = buckets
+        self.width, self.height = width, height
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg="#2b2b40", highlightthickness=0)
+        self.bar_width = width / (len(buckets) + 1)
+        self.bars = [self.canvas.create_rectangle(0, 0, 0, 0, fill="#00BCD4", width=0)
+                     for _ in range(len(buckets) + 1)]
+        self.caption = self.canvas.create_text(2, 1, anchor="nw", text="latency", fill="lightgray",
+                                               font=("Segoe UI", 7))
+
+    def update(self, bins, total):
+        top = 12  # room for the caption
+        peak = max(bins) or 1
+        for i, (bar, count) in enumerate(zip(self.bars, bins)):
+            h = (self.height - top) * count / peak
+            x = i * self.bar_width
+            self.canvas.coords(bar, x + 1, self.height - h, x + self.bar_width - 1, self.height)
+        self.canvas.itemconfigure(self.caption, text=f"p99 {self.p99_label(bins, total)}")
+
+    def p99_label(self, bins, total):
+        if not total:
+            return "-"
+        seen = 0
+        for bound, count in zip(self.buckets, bins):
+            seen += count
+            if seen >= 0.99 * total:
+                return f"≤{bound * 1000:g}ms"
+        return f">{self.buckets[-1] * 1000:g}ms"
+
+
+# --- Click Engine ---
+UI_FRAME_MS = 33  # ~30 Hz UI refresh while running
+MAX_CIRCLES_PER_FRAME = 4
+
+# Latest progress snapshot published by the engine
+Progress = namedtuple("Progress", [
+    "status", "clicks_done", "total_clicks", "cycle", "cycles",
+    "key", "elapsed", "rate", "delay_left",
+])
+
+
+class ProgressChannel:
+    # Worker -> UI hand-off. The worker overwrites `state` (the UI only ever
+    # wants the newest numbers) and appends one-off events to a deque; both
+    # are safe to use from two threads without a lock.
+    def __init__(self):
+        self.state = None
+        self.seq = 0
+        self.events = deque()
+        self.attached = False  # set once a UI is draining this channel
+
+    def publish(self, state):
+        self.state = state
+        self.seq += 1
+
+    def post(self, kind, *args):
+        # nobody drains the events when headless, don't let them pile up
+        if self.attached:
+            self.events.append((kind, args, None))
+
+    def request(self, kind, *args, timeout=0.5):
+        # post and wait until the consumer handled it (no-op when headless)
+        if not self.attached:
+            return
+        done = threading.Event()
+        self.events.append((kind, args, done))
+        done.wait(timeout)
+
+    def drain(self, limit=None):
+        events = self.events
+        count = len(events) if limit is None else min(limit, len(events))
+        for _ in range(count):
+            yield events.popleft()
+
+
+class ClickEngine:
+    # Runs a compiled plan against an input backend. Knows nothing about Tk:
+    # everything the UI needs goes through the ProgressChannel.
+    def __init__(self, plan, settings, backend, keys=None, channel=None, scheduler=None, audio=None,
+                 telemetry=None):
+        self.plan = plan
+        self.keys = keys  # per-position ids handed back in progress (tree items)
+        self.settings = settings
+        self.backend = backend
+        self.audio = audio
+        self.telemetry = telemetry
+        self.channel = channel if channel is not None else ProgressChannel()
+        self.scheduler = scheduler or ClickScheduler(settings.delay, policy=settings.schedule_policy)
+        self.timeline = RunTimeline(plan, settings)
+        # created up front so a missing numpy/grabber fails the start, not the run
+        self.capture = ScreenCapture() if plan.conditions is not None else None
+        # step programs keep their own pacing
+        self.adaptive = (AdaptiveRate(len(plan), settings, self.capture)
+                         if settings.adaptive and not plan.programmed() else None)
+        self.humanizer = Humanizer(settings) if humanized(settings) else None
+        self.offsets = None
+        if self.humanizer is not None:
+            self.scheduler.gaps = self.humanizer.gaps
+            self.offsets = self.humanizer.offsets
+        self.conditions_skipped = 0
+        self.running = False
+        self.paused = False
+        self._resume = threading.Event()
+        self._resume.set()
+        self.clicks_done = 0
+        self.slots_done = 0
+        self.total_slots, self.total_clicks = self.timeline.remaining(1)
+        self.cycle = 0
+        self.start_time = None
+        self._next_plan = None
+        self._plan_lock = threading.Lock()
+
+    def swap_plan(self, plan, keys=None):
+        # picked up at the next cycle boundary
+        with self._plan_lock:
+            self._next_plan = (plan, keys)
+
+    def can_swap(self, plan):
+        # step rows need a ProgramEngine, they wait for the next start
+        return not plan.programmed()
+
+    def stop(self):
+        self.running = False
+        self._resume.set()
+        self.scheduler.interrupt()
+
+    def pause(self):
+        self.paused = True
+        self._resume.clear()
+        self.scheduler.interrupt()
+
+    def resume(self):
+        self.paused = False
+        self._resume.set()
+
+    def hold(self):
+        # Called when a wait was interrupted. Parks the worker while paused,
+        # keeping the cursor; the paused time is added to the pending
+        # deadline so the remaining delay budget is preserved. Returns False
+        # once the run is stopped.
+        scheduler = self.scheduler
+        paused_at = None
+        while True:
+            # clear before checking, so a pause() racing with us re-arms it
+            scheduler.wake.clear()
+            if not self.running:
+                return False
+            if self._resume.is_set():
+                break
+            if paused_at is None:
+                paused_at = scheduler.clock()
+                self.publish("paused")
+            self._resume.wait()
+        if paused_at is not None:
+            scheduler.delay(scheduler.clock() - paused_at)
+        return self.running
+
+    def publish(self, status, key=None, delay_left=0.0):
+        clock = self.scheduler.clock
+        self.channel.publish(Progress(
+            status, self.clicks_done, self.total_clicks, self.cycle, self.settings.cycles,
+            key, clock() - self.start_time, self.scheduler.achieved_rate(), delay_left,
+        ))
+
+    def eta(self, status="running"):
+        # computed on demand (UI frame rate) rather than on every click;
+        # cycle delays not yet pushed onto the scheduler's deadline count
+        # in full
+        gaps = self.settings.cycles - self.cycle - (status == "cycle_delay")
+        return self.timeline.eta(self.total_slots - self.slots_done, self.scheduler.time_until_due(),
+                                 max(0, gaps), self.adaptive.delay if self.adaptive is not None else None)
+
+    def summary(self):
+        text = self.scheduler.summary()
+        if self.conditions_skipped:
+            text += f", {self.conditions_skipped} skipped by conditions"
+        if self.humanizer is not None:
+            text += f", humanized with seed {self.humanizer.seed}"
+        if self.adaptive is not None:
+            text += ", " + self.adaptive.summary()
+        return text
+
+    def check(self, condition):
+        # True to click, False to skip this slot, None when stopped while
+        # waiting on the screen
+        if self.capture is None:
+            self.capture = ScreenCapture()  # plan with conditions swapped in
+        if condition.kind == COND_PIXEL:
+            return condition.matches(self.capture)
+        scheduler = self.scheduler
+        deadline = time.perf_counter() + condition.timeout
+        while not condition.matches(self.capture):
+            if time.perf_counter() >= deadline:
+                return False
+            if scheduler.wake.wait(CONDITION_POLL):
+                held = time.perf_counter()
+                if not self.hold():
+                    return None
+                # time spent paused doesn't count against the timeout
+                deadline += time.perf_counter() - held
+        return True
+
+    def cycle_delay(self):
+        # counts down the pause between cycles, pause/stop aware
+        scheduler = self.scheduler
+        if self.settings.cycle_delay <= 0:
+            return
+        scheduler.delay(self.settings.cycle_delay)
+        remaining = scheduler.time_until_due()
+        while remaining > 0:
+            self.publish("cycle_delay", delay_left=remaining)
+            scheduler.sleep(min(1.0, remaining))
+            if scheduler.interrupted() and not self.hold():
+                break
+            remaining = scheduler.time_until_due()
+
+    def click(self, idx):
+        x, y, pos_mode, btn = self.plan[idx]
+        if self.offsets is not None:
+            dx, dy = next(self.offsets)
+            x += dx
+            y += dy
+        count = 2 if pos_mode == MODE_DOUBLE else 1
+        scheduler = self.scheduler
+        while True:
+            due = scheduler.wait_next()
+            if due is not None:
+                break
+            if not self.hold():
+                return
+        injected = scheduler.last_fire
+        conditions = self.plan.conditions
+        if conditions is not None and conditions[idx] is not None:
+            ok = self.check(conditions[idx])
+            if ok is None:
+                return
+            if not ok:
+                # skipped slots don't click, keep Clicks Left honest
+                self.conditions_skipped += 1
+                self.total_clicks -= count
+                self.slots_done += 1
+                return
+            injected = scheduler.clock()
+        adaptive = self.adaptive
+        watch = adaptive is not None and adaptive.watching(idx)
+        if watch:
+            adaptive.before(x, y)
+            injected = scheduler.clock()
+        self.backend.click(x, y, btn, count)
+        self.backend.flush()
+        telemetry = self.telemetry
+        if telemetry is not None:
+            injected_done = scheduler.clock()
+        self.clicks_done += count
+        self.slots_done += 1
+        key = self.keys[idx] if self.keys is not None else idx
+        self.channel.post("click", x, y, pos_mode)
+        if self.audio is not None:
+            self.audio.play("click")
+            if count == 2:
+                self.audio.play("click", delay=0.2)
+        if telemetry is not None:
+            # injection started when the wait (or the screen condition) ended
+            telemetry.record(due, injected, injected_done - injected, scheduler.clock() - injected_done)
+        self.publish("running", key)
+        if watch:
+            adaptive.after(idx, injected, scheduler.wake)
+            # the next slot follows the learned delay
+            scheduler.set_interval(adaptive.delay)
+
+    def set_plan(self, plan, keys):
+        self.plan, self.keys = plan, keys
+        self.timeline.set_plan(plan)
+        if self.adaptive is not None:
+            self.adaptive.resize(len(plan))
+
+    def count_remaining(self, cycle):
+        # exact from here on, also after a plan swap
+        slots, clicks = self.timeline.remaining(cycle)
+        self.total_slots = self.slots_done + slots
+        self.total_clicks = self.clicks_done + clicks
+
+    def run_cycle(self, cycle):
+        # Double-click rule pass (when due), then the normal sequence
+        for idx in self.timeline.cycle_slots(cycle):
+            if not self.running:
+                break
+            self.click(idx)
+
+    def run(self):
+        s = self.settings
+        scheduler = self.scheduler
+        self.running = True
+        self.clicks_done = self.slots_done = 0
+        self.start_time = scheduler.start()
+        error = None
+
+        try:
+            for cycle in range(1, s.cycles + 1):
+                if not self.running:
+                    break
+                self.cycle = cycle
+
+                # Apply edits made during the run at the cycle boundary
+                with self._plan_lock:
+                    pending, self._next_plan = self._next_plan, None
+                if pending is not None:
+                    self.set_plan(*pending)
+                self.count_remaining(cycle)
+
+                # Hide overlays before clicking
+                self.channel.request("markers", False)
+                self.run_cycle(cycle)
+
+                # Restore overlays and count down the cycle delay
+                self.channel.post("markers", True)
+                if cycle < s.cycles and self.running:
+                    self.cycle_delay()
+        except Exception as e:
+            # a failing backend or capture still ends the run normally
+            error = f"error: {e}"
+        finally:
+            status = error or ("finished" if self.running else "stopped")
+            self.running = False
+            if self.humanizer is not None:
+                self.humanizer.close()
+            self.channel.post("markers", True)
+            self.publish(status)
+            self.channel.post("done", status, self.summary())
+
+
+def split_by_window(plan, keys, settings):
+    # [(window id, sub plan, sub keys, sub settings)], window 0 = unbound.
+    # The double-click target is re-indexed into the group that holds it;
+    # every other group gets an out-of-range target, i.e. no rule pass.
+    groups = {}
+    for i in range(len(plan)):
+        groups.setdefault(plan.window(i), []).append(i)
+    target = settings.double_target
+    single_target = settings.double_mode != "Random" and target >= 0
+    result = []
+    for group, (window, indices) in enumerate(groups.items()):
+        sub_settings = settings
+        if single_target:
+            local = indices.index(target) if target in indices else len(indices)
+            sub_settings = settings._replace(double_target=local)
+        if settings.seed >= 0:
+            # same seed, different jitter per window
+            sub_settings = sub_settings._replace(seed=settings.seed + group)
+        if window:
+            # window-relative positions can't be watched on the screen
+            sub_settings = sub_settings._replace(adaptive=False)
+        sub_keys = [keys[i] for i in indices] if keys is not None else indices
+        result.append((window, plan.subset(indices), sub_keys, sub_settings))
+    return result
+
+
+class ParallelEngine:
+    # Window-bound runs: one ClickEngine per target window, each on its own
+    # thread with its own backend connection, so independent windows are
+    # clicked concurrently. Unbound positions share the pointer backend in
+    # one more group. The sub-engines report into private channels; this
+    # class publishes their sum to the UI channel once per UI frame.
+    def __init__(self, plan, settings, backend, keys=None, channel=None, audio=None,
+                 window_backend="xwindow"):
+        self.settings = settings
+        self.channel = channel if channel is not None else ProgressChannel()
+        self.running = False
+        self.paused = False
+        self.start_time = None
+        self.windows = []
+        self.engines = []
+        self.backends = []  # opened here, closed when the run ends
+        factory = WINDOW_BACKENDS[window_backend]
+        try:
+            for window, sub_plan, sub_keys, sub_settings in split_by_window(plan, keys, settings):
+                if window:
+                    target = factory(window)
+                    self.backends.append(target)
+                else:
+                    target = backend
+                self.windows.append(window)
+                self.engines.append(ClickEngine(sub_plan, sub_settings, target, keys=sub_keys, audio=audio))
+        except Exception:
+            for engine in self.engines:
+                if engine.humanizer is not None:
+                    engine.humanizer.close()
+            self.close_backends()
+            raise
+
+    @property
+    def total_clicks(self):
+        return sum(e.total_clicks for e in self.engines)
+
+    def can_swap(self, plan):
+        return not plan.programmed()
+
+    def close_backends(self):
+        for backend in self.backends:
+            try:
+                backend.close()
+            except Exception:
+                pass
+        self.backends = []
+
+    def swap_plan(self, plan, keys=None):
+        # windows that lost all their positions get an empty plan; windows
+        # that are new wait for the next run
+        groups = {w: (p, k) for w, p, k, _ in split_by_window(plan, keys, self.settings)}
+        for window, engine in zip(self.windows, self.engines):
+            engine.swap_plan(*groups.get(window, (ClickPlan.compile(()), [])))
+
+    def stop(self):
+        self.running = False
+        for engine in self.engines:
+            engine.stop()
+
+    def pause(self):
+        self.paused = True
+        for engine in self.engines:
+            engine.pause()
+
+    def resume(self):
+        self.paused = False
+        for engine in self.engines:
+            engine.resume()
+
+    def eta(self, status="running"):
+        return max((e.eta(status) for e in self.engines if e.running), default=0.0)
+
+    def summary(self):
+        rate = sum(e.scheduler.achieved_rate() for e in self.engines)
+        return f"{rate:.1f} clicks/s over {len(self.engines)} targets"
+
+    def publish(self, status):
+        engines = self.engines
+        self.channel.publish(Progress(
+            status, sum(e.clicks_done for e in engines), self.total_clicks,
+            min(e.cycle for e in engines), self.settings.cycles, None,
+            time.perf_counter() - self.start_time, sum(e.scheduler.achieved_rate() for e in engines), 0.0,
+        ))
+
+    def run(self):
+        self.running = True
+        self.start_time = time.perf_counter()
+        threads = [threading.Thread(target=e.run, daemon=True) for e in self.engines]
+        for thread in threads:
+            thread.start()
+        self.channel.request("markers", False)
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(UI_FRAME_MS / 1000)
+                self.publish("paused" if self.paused else "running")
+        statuses = [e.channel.state.status for e in self.engines]
+        errors = [status for status in statuses if status.startswith("error")]
+        finished = self.running and all(status == "finished" for status in statuses)
+        status = errors[0] if errors else "finished" if finished else "stopped"
+        self.running = False
+        self.close_backends()
+        self.publish(status)
+        self.channel.post("markers", True)
+        self.channel.post("done", status, self.summary())
+
+
+def create_engine(plan, settings, backend, **kwargs):
+    # step programs run in order on one worker; window-bound plans fan out
+    # over one worker per window
+    if plan.programmed():
+        return ProgramEngine(plan, settings, backend, **kwargs)
+    if plan.bound():
+        kwargs.pop("telemetry", None)  # one ring per run, single writer only
+        return ParallelEngine(plan, settings, backend, **kwargs)
+    kwargs.pop("window_backend", None)
+    return ClickEngine(plan, settings, backend, **kwargs)
+
+
+# --- Step Program ---
+# Plans with step rows (Move, Drag, Scroll, Key, Wait, Loop) compile to a
+# flat instruction array. Each instruction is STEP_WIDTH ints:
+#   op, position, then operands
+#   MOVE/CLICK/DOUBLE  x, y, button
+#   DRAG               x, y, button, x2, y2
+#   SCROLL             x, y, clicks
+#   KEY                const (key names)
+#   WAIT               milliseconds
+#   CHECK              const (condition), guards an action (1/0); skips
+#                      the next instruction unless the condition holds
+#   WAIT_FOR           const (condition)
+#   LOOP               target instruction, passes
+# The first six are actions: each takes one scheduler slot.
+OP_MOVE, OP_CLICK, OP_DOUBLE, OP_DRAG, OP_SCROLL, OP_KEY, OP_WAIT, OP_CHECK, OP_WAIT_FOR, OP_LOOP = range(10)
+OP_CLICKS = (0, 1, 2, 1, 0, 0, 0, 0, 0, 0)  # clicks counted per instruction
+STEP_WIDTH = 7
+# what the "Arg" cell of each step row holds
+STEP_HINTS = {
+    MODE_MOVE: "",
+    MODE_DRAG: "end point x,y",
+    MODE_SCROLL: "clicks (negative scrolls down)",
+    MODE_KEY: "keys like ctrl+shift+s",
+    MODE_WAIT: "milliseconds",
+    MODE_LOOP: "N or NxPASSES (back to position N)",
+}
+
+
+def parse_step(mode, text, index):
+    # "Arg" cell of the row at `index` -> operands, parsed once at compile
+    text = str(text or "").strip().lower()
     try:
-        CLICK_SOUND = pygame.mixer.Sound("click2.wav")
-        DOUBLE_CLICK_SOUND = pygame.mixer.Sound("click2.wav")  # reuse or another file
-    except Exception as e:
-        print("Could not load sound files:", e)
-        CLICK_SOUND = None
-        DOUBLE_CLICK_SOUND = None
+        if mode == MODE_MOVE:
+            return ()
+        if mode == MODE_DRAG:
+            x, y = text.split(",")
+            return int(x), int(y)
+        if mode == MODE_SCROLL:
+            clicks = int(text)
+            if clicks:
+                return (clicks,)
+        elif mode == MODE_KEY:
+            keys = tuple(key.strip() for key in text.split("+"))
+            if all(keys):
+                return keys
+        elif mode == MODE_WAIT:
+            ms = int(text or 0)
+            if ms >= 0:
+                return (ms,)
+        elif mode == MODE_LOOP:
+            target, _, passes = text.partition("x")
+            target, passes = int(target) - 1, int(passes or 2)
+            if 0 <= target <= index and passes >= 1:
+                return target, passes
+    except ValueError:
+        pass
+    raise ValueError(f"Position {index + 1}: {MODE_NAMES[mode]} needs {STEP_HINTS[mode]}, got {text!r}")
+
+
+class StepProgram:
+    # One pass over a stepped plan. Backend independent, so it is built
+    # from the plan once and linked against the backends when a run starts.
+    # Key chords and conditions live in `consts`. Totals are per pass and
+    # assume every check passes.
+    __slots__ = ("code", "consts", "windows", "slots", "clicks", "wait")
+
+    def __init__(self, code, consts, windows=None):
+        self.code = code
+        self.consts = tuple(consts)
+        self.windows = windows
+        # how often each instruction runs per pass: loops multiply their body
+        n = len(self)
+        runs = [1] * n
+        for pc in range(n):
+            op, _, target, passes = code[pc * STEP_WIDTH:pc * STEP_WIDTH + 4]
+            if op == OP_LOOP:
+                for i in range(target, pc + 1):
+                    runs[i] *= passes
+        self.slots = self.clicks = 0
+        self.wait = 0.0
+        for pc in range(n):
+            op, _, ms = code[pc * STEP_WIDTH:pc * STEP_WIDTH + 3]
+            if op <= OP_KEY:
+                self.slots += runs[pc]
+                self.clicks += OP_CLICKS[op] * runs[pc]
+            elif op == OP_WAIT:
+                self.wait += ms / 1000 * runs[pc]
+
+    def __len__(self):
+        return len(self.code) // STEP_WIDTH
+
+    def instruction(self, pc):
+        return self.code[pc * STEP_WIDTH:(pc + 1) * STEP_WIDTH]
+
+    def window(self, pos):
+        return 0 if self.windows is None else self.windows[pos]
+
+    @classmethod
+    def compile(cls, plan):
+        code, consts = array("i"), []
+        starts = []  # position -> its first instruction, for loop targets
+        steps, conditions = plan.steps, plan.conditions
+
+        def emit(op, pos, *operands):
+            code.extend((op, pos, *operands, *(0,) * (STEP_WIDTH - 2 - len(operands))))
+
+        for pos in range(len(plan)):
+            x, y, mode, button = plan[pos]
+            step = steps[pos] if steps is not None else None
+            condition = conditions[pos] if conditions is not None else None
+            starts.append(len(code) // STEP_WIDTH)
+            if condition is not None:
+                consts.append(condition)
+                if mode == MODE_WAIT:
+                    emit(OP_WAIT_FOR, pos, len(consts) - 1)
+                else:
+                    emit(OP_CHECK, pos, len(consts) - 1, int(mode != MODE_LOOP))
+            if mode == MODE_SINGLE:
+                emit(OP_CLICK, pos, x, y, button)
+            elif mode == MODE_DOUBLE:
+                emit(OP_DOUBLE, pos, x, y, button)
+            elif mode == MODE_MOVE:
+                emit(OP_MOVE, pos, x, y)
+            elif mode == MODE_DRAG:
+                emit(OP_DRAG, pos, x, y, button, *step)
+            elif mode == MODE_SCROLL:
+                emit(OP_SCROLL, pos, x, y, step[0])
+            elif mode == MODE_KEY:
+                consts.append(step)
+                emit(OP_KEY, pos, len(consts) - 1)
+            elif mode == MODE_WAIT:
+                if step[0] or condition is None:
+                    emit(OP_WAIT, pos, step[0])
+            else:
+                emit(OP_LOOP, pos, starts[step[0]], step[1])
+        return cls(code, consts, plan.windows)
+
+
+class ProgramEngine(ClickEngine):
+    # Runs a StepProgram. Linking looks up every backend method once and
+    # pre-builds its arguments, so the loop in run_pass() does no parsing
+    # and no attribute lookups per step. Repeats run the whole program
+    # again; the double-click rule doesn't apply (Double and Loop steps say
+    # it explicitly). Window-bound steps go through their window's backend,
+    # in program order on this one worker.
+    def __init__(self, plan, settings, backend, keys=None, channel=None, scheduler=None, audio=None,
+                 telemetry=None, window_backend="xwindow"):
+        super().__init__(plan, settings, backend, keys=keys, channel=channel, scheduler=scheduler,
+                         audio=audio, telemetry=telemetry)
+        self.window_factory = WINDOW_BACKENDS[window_backend]
+        self.window_backends = {}
+        self.waits_left = 0.0
+        try:
+            self.program = StepProgram.compile(plan)
+            self.code = self.link(self.program, keys)
+        except Exception:
+            if self.humanizer is not None:
+                self.humanizer.close()
+            self.close_backends()
+            raise
+        self.count_remaining(1)
+
+    def target(self, window):
+        if not window:
+            return self.backend
+        backend = self.window_backends.get(window)
+        if backend is None:
+            backend = self.window_backends[window] = self.window_factory(window)
+        return backend
+
+    def close_backends(self):
+        for backend in self.window_backends.values():
+            try:
+                backend.close()
+            except Exception:
+                pass
+        self.window_backends = {}
+
+    def link(self, program, keys):
+        # -> [(op, callable, args, flush, a, b, key)]
+        linked = []
+        consts = program.consts
+        for pc in range(len(program)):
+            op, pos, a, b, c, d, e = program.instruction(pc)
+            # keys go to the focused window, never to a bound one
+            backend = self.target(program.window(pos)) if op != OP_KEY else self.backend
+            fn, args = None, None
+            if op == OP_MOVE:
+                fn, args = backend.move, (a, b)
+            elif op == OP_CLICK or op == OP_DOUBLE:
+                fn, args = backend.click, (a, b, c, OP_CLICKS[op])
+            elif op == OP_DRAG:
+                fn, args = backend.drag, (a, b, d, e, c)
+            elif op == OP_SCROLL:
+                fn, args = backend.scroll, (a, b, c)
+            elif op == OP_KEY:
+                fn, args = backend.key, (backend.key_codes(consts[a]),)
+            elif op == OP_CHECK or op == OP_WAIT_FOR:
+                args = consts[a]
+                a = b
+            elif op == OP_WAIT:
+                a /= 1000
+            linked.append((op, fn, args, backend.flush, a, b, keys[pos] if keys is not None else pos))
+        return linked
+
+    def can_swap(self, plan):
+        return True
+
+    def set_plan(self, plan, keys):
+        try:
+            program = StepProgram.compile(plan)
+            code = self.link(program, keys)
+        except Exception as e:
+            # the run goes on with the old program; tell whoever watches it
+            message = f"Step program not swapped: {e}"
+            if self.channel.attached:
+                self.channel.post("log", message)
+            else:
+                print(message, file=sys.stderr)
+            return
+        self.plan, self.keys, self.program, self.code = plan, keys, program, code
+
+    def count_remaining(self, cycle):
+        s = self.settings
+        passes = s.repeats * max(0, s.cycles - cycle + 1)
+        program = self.program
+        self.total_slots = self.slots_done + program.slots * passes
+        self.total_clicks = self.clicks_done + program.clicks * passes
+        self.waits_left = program.wait * passes
+
+    def eta(self, status="running"):
+        slots_left = self.total_slots - self.slots_done
+        if slots_left <= 0 and self.waits_left <= 0:
+            return 0.0
+        s = self.settings
+        gaps = max(0, s.cycles - self.cycle - (status == "cycle_delay"))
+        return (max(0.0, self.scheduler.time_until_due()) + max(0, slots_left - 1) * s.delay
+                + max(0.0, self.waits_left) + gaps * s.cycle_delay)
+
+    def run_cycle(self, cycle):
+        for _ in range(self.settings.repeats):
+            if not self.running or not self.run_pass():
+                break
+        # loops cut short by a check made the estimate high, settle it
+        self.count_remaining(cycle + 1)
+
+    def run_pass(self):
+        # one pass over the linked program; False once stopped
+        code = self.code
+        end = len(code)
+        counters = [0] * end  # loop passes so far, per LOOP instruction
+        scheduler = self.scheduler
+        wait_next = scheduler.wait_next
+        clock = scheduler.clock
+        post = self.channel.post
+        audio = self.audio
+        telemetry = self.telemetry
+        offsets = self.offsets
+        primed = False  # a CHECK already took the slot of the next action
+        due = injected = 0.0
+        pc = 0
+        while pc < end:
+            if not self.running:
+                return False
+            op, fn, args, flush, a, b, key = code[pc]
+            if op <= OP_KEY:
+                if primed:
+                    primed = False
+                else:
+                    due = wait_next()
+                    if due is None:
+                        if not self.hold():
+                            return False
+                        continue
+                    injected = scheduler.last_fire
+                if offsets is not None and op <= OP_SCROLL:
+                    # every action but KEY starts with x, y
+                    dx, dy = next(offsets)
+                    fn(args[0] + dx, args[1] + dy, *args[2:])
+                else:
+                    fn(*args)
+                flush()
+                if telemetry is not None:
+                    injected_done = clock()
+                count = OP_CLICKS[op]
+                self.clicks_done += count
+                self.slots_done += 1
+                if count:
+                    post("click", args[0], args[1], MODE_DOUBLE if count == 2 else MODE_SINGLE)
+                    if audio is not None:
+                        audio.play("click")
+                        if count == 2:
+                            audio.play("click", delay=0.2)
+                if telemetry is not None:
+                    telemetry.record(due, injected, injected_done - injected, clock() - injected_done)
+                self.publish("running", key)
+                pc += 1
+            elif op == OP_WAIT:
+                scheduler.delay(a)
+                self.waits_left -= a
+                pc += 1
+            elif op == OP_LOOP:
+                passes = counters[pc] + 1
+                if passes < b:
+                    counters[pc] = passes
+                    pc = a
+                else:
+                    counters[pc] = 0
+                    pc += 1
+            elif op == OP_CHECK:
+                if a:
+                    # the guarded action's slot comes first, like click()
+                    due = wait_next()
+                    if due is None:
+                        if not self.hold():
+                            return False
+                        continue
+                ok = self.check(args)
+                if ok is None:
+                    return False
+                if ok:
+                    primed = bool(a)
+                    injected = clock()
+                    pc += 1
+                else:
+                    if a:
+                        self.conditions_skipped += 1
+                        self.total_clicks -= OP_CLICKS[code[pc + 1][0]]
+                        self.slots_done += 1
+                    else:
+                        counters[pc + 1] = 0  # a skipped loop starts over next time
+                    pc += 2
+            else:  # OP_WAIT_FOR, carries on after the timeout too
+                if self.check(args) is None:
+                    return False
+                pc += 1
+        return True
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self.close_backends()
+
+
+# --- Recording ---
+RECORD_RATE = 500       # pointer samples per second
+RECORD_EPSILON = 1.0    # px, how far simplification may move the path
+RECORD_DWELL_MS = 50    # the pointer resting longer than this is always kept
+RECORDING_FORMAT = "multiclicker-recording"
+RECORDING_VERSION = 1
+
+
+def simplify_path(xs, ys, first, last, epsilon, keep):
+    # Ramer-Douglas-Peucker over xs/ys[first..last], iterative so long
+    # strokes can't hit the recursion limit; sets keep[i] for the vertices
+    # that have to stay. Distances are to the segment, not the line, so a
+    # stroke that doubles back on itself keeps its turning point.
+    eps2 = epsilon * epsilon
+    stack = [(first, last)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        ax, ay, bx, by = xs[a], ys[a], xs[b], ys[b]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        worst, index = eps2, -1
+        for i in range(a + 1, b):
+            px, py = xs[i] - ax, ys[i] - ay
+            t = px * dx + py * dy
+            if t <= 0:
+                d2 = px * px + py * py
+            elif t >= length2:
+                qx, qy = xs[i] - bx, ys[i] - by
+                d2 = qx * qx + qy * qy
+            else:
+                cross = px * dy - py * dx
+                d2 = cross * cross / length2
+            if d2 > worst:
+                worst, index = d2, i
+        if index >= 0:
+            keep[index] = 1
+            stack.append((a, index))
+            stack.append((index, b))
+
+
+class Trajectory:
+    # A recorded pointer path as parallel typed arrays, 9 bytes a sample:
+    # ms since the recording started, screen x/y and the held buttons as a
+    # 1 << BUTTON_* mask. The recorder only stores samples that changed.
+    __slots__ = ("ts", "xs", "ys", "buttons")
+
+    def __init__(self, ts=None, xs=None, ys=None, buttons=None):
+        self.ts = ts if ts is not None else array("I")
+        self.xs = xs if xs is not None else array("h")
+        self.ys = ys if ys is not None else array("h")
+        self.buttons = buttons if buttons is not None else array("B")
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, t, x, y, buttons):
+        self.ts.append(t)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.buttons.append(buttons)
+
+    def duration(self):
+        return (self.ts[-1] - self.ts[0]) / 1000 if self.ts else 0.0
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.ts, self.xs, self.ys, self.buttons))
+
+    def presses(self):
+        # button-down edges, what replay counts as clicks
+        count, held = 0, 0
+        for buttons in self.buttons:
+            count += bin(buttons & ~held).count("1")
+            held = buttons
+        return count
+
+    def subset(self, indices):
+        return Trajectory(*(array(a.typecode, (a[i] for i in indices))
+                            for a in (self.ts, self.xs, self.ys, self.buttons)))
+
+    def head(self, end):
+        return Trajectory(*(a[:end] for a in (self.ts, self.xs, self.ys, self.buttons)))
+
+    def last_press(self):
+        # index of the last sample where a button went down, else len
+        buttons = self.buttons
+        for i in range(len(buttons) - 1, 0, -1):
+            if buttons[i] & ~buttons[i - 1]:
+                return i
+        return len(buttons) if not buttons or not buttons[0] else 0
+
+    def simplify(self, epsilon=RECORD_EPSILON, dwell_ms=RECORD_DWELL_MS):
+        # Drops samples that lie within `epsilon` px of the simplified path.
+        # Button changes and both ends of a rest are kept, and kept samples
+        # keep their timestamps, so clicks, drags and pauses replay on time.
+        n = len(self)
+        if n < 3:
+            return self.subset(range(n))
+        ts, xs, ys, buttons = self.ts, self.xs, self.ys, self.buttons
+        keep = bytearray(n)
+        keep[0] = keep[-1] = 1
+        for i in range(1, n):
+            if buttons[i] != buttons[i - 1]:
+                keep[i] = 1
+            if ts[i] - ts[i - 1] > dwell_ms:
+                keep[i - 1] = keep[i] = 1
+        anchors = [i for i in range(n) if keep[i]]
+        for a, b in zip(anchors, anchors[1:]):
+            simplify_path(xs, ys, a, b, epsilon, keep)
+        return self.subset([i for i in range(n) if keep[i]])
+
+    def save(self, path):
+        # JSON header line, then the four arrays delta encoded as int32 and
+        # deflated; a resting or slowly moving pointer packs to a few bytes
+        payload = array("i")
+        for a in (self.ts, self.xs, self.ys, self.buttons):
+            previous = 0
+            for value in a:
+                payload.append(value - previous)
+                previous = value
+        if sys.byteorder == "big":
+            payload.byteswap()
+        header = {"format": RECORDING_FORMAT, "version": RECORDING_VERSION, "samples": len(self),
+                  "duration_ms": self.ts[-1] if self.ts else 0}
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(zlib.compress(payload.tobytes(), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                raise ValueError("Not a MultiClicker recording") from None
+            if not isinstance(header, dict) or header.get("format") != RECORDING_FORMAT:
+                raise ValueError("Not a MultiClicker recording")
+            if header.get("version", 0) > RECORDING_VERSION:
+                raise ValueError(f"Recording version {header['version']} is newer than this app")
+            try:
+                raw = zlib.decompress(f.read())
+            except zlib.error as e:
+                raise ValueError(f"Corrupt recording: {e}") from None
+        payload = array("i")
+        payload.frombytes(raw)
+        if sys.byteorder == "big":
+            payload.byteswap()
+        n = header["samples"]
+        if len(payload) != 4 * n:
+            raise ValueError("Corrupt recording: sample count does not match")
+        trajectory = cls()
+        arrays = (trajectory.ts, trajectory.xs, trajectory.ys, trajectory.buttons)
+        for k, a in enumerate(arrays):
+            a.extend(itertools.accumulate(payload[k * n:(k + 1) * n]))
+        return trajectory
+
+
+class PointerRecorder:
+    # Samples the backend's pointer on its own thread, paced by a
+    # ClickScheduler so the rate holds without drift. No spin phase: a
+    # sample a fraction of a ms late doesn't matter, a busy core does.
+    def __init__(self, backend, rate=RECORD_RATE):
+        self.backend = backend
+        self.scheduler = ClickScheduler(1.0 / rate, spin=0.0)
+        self.trajectory = Trajectory()
+        self.sampled = 0
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        scheduler = self.scheduler
+        start = scheduler.start()
+        pointer = self.backend.pointer
+        append = self.trajectory.append
+        last = None
+        try:
+            while scheduler.wait_next() is not None:
+                sample = pointer()
+                self.sampled += 1
+                if sample != last:
+                    last = sample
+                    append(int((scheduler.last_fire - start) * 1000), *sample)
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        # the raw (unsimplified) trajectory
+        self.scheduler.interrupt()
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Recording failed: {self.error}")
+        return self.trajectory
+
+
+class ReplayEngine(ClickEngine):
+    # Plays a Trajectory back with its recorded timing, `speed` times
+    # faster, `cycles` times with the cycle delay in between. Presses are
+    # what it counts as clicks. Pause/resume/stop, progress and the cycle
+    # delay are ClickEngine's; every gap between two samples is pushed onto
+    # the scheduler's deadline, so a pause shifts the rest of the path.
+    def __init__(self, trajectory, settings, backend, speed=1.0, channel=None, scheduler=None, audio=None):
+        if speed <= 0:
+            raise ValueError("Replay speed must be above 0")
+        # no plan; a recording is human already, and its own timing is the
+        # pace, so no jitter or adaptive delay
+        settings = settings._replace(delay_jitter=0.0, offset_sigma=0.0, adaptive=False)
+        super().__init__(ClickPlan.compile(()), settings, backend, channel=channel,
+                         scheduler=scheduler or ClickScheduler(0.0, policy=POLICY_CATCH_UP), audio=audio)
+        self.trajectory = trajectory
+        self.speed = speed
+        self.total_clicks = trajectory.presses() * settings.cycles
+        self.index = 0  # next sample of the current cycle
+        self.held = 0
+
+    def eta(self, status="running"):
+        ts = self.trajectory.ts
+        if not ts:
+            return 0.0
+        scale = 0.001 / self.speed
+        left = max(0.0, self.scheduler.time_until_due())
+        if self.index < len(ts):
+            left += (ts[-1] - ts[self.index]) * scale
+        later = self.settings.cycles - self.cycle
+        gaps = later - (status == "cycle_delay")
+        return left + later * (ts[-1] - ts[0]) * scale + max(0, gaps) * self.settings.cycle_delay
+
+    def summary(self):
+        s = self.scheduler.stats()
+        return (f"{len(self.trajectory)} samples at {self.speed:g}x, jitter avg {s['jitter_mean'] * 1000:.2f} ms"
+                f" / max {s['jitter_max'] * 1000:.2f} ms")
+
+    def set_buttons(self, x, y, buttons):
+        backend = self.backend
+        for button in range(len(BUTTON_NAMES)):
+            bit = 1 << button
+            if self.held & bit and not buttons & bit:
+                backend.release(x, y, button)
+            elif buttons & bit and not self.held & bit:
+                backend.press(x, y, button)
+                self.clicks_done += 1
+                self.channel.post("click", x, y, MODE_SINGLE)
+                if self.audio is not None:
+                    self.audio.play("click")
+        self.held = buttons
+        backend.flush()
+
+    def run(self):
+        s = self.settings
+        scheduler = self.scheduler
+        trajectory = self.trajectory
+        ts, xs, ys, masks = trajectory.ts, trajectory.xs, trajectory.ys, trajectory.buttons
+        scale = 0.001 / self.speed
+        self.running = True
+        self.clicks_done = 0
+        self.start_time = scheduler.start()
+        error = None
+        self.channel.request("markers", False)
+        try:
+            for cycle in range(1, s.cycles + 1):
+                if not self.running:
+                    break
+                self.cycle = cycle
+                previous = ts[0] if ts else 0
+                for i in range(len(ts)):
+                    self.index = i
+                    scheduler.delay((ts[i] - previous) * scale)
+                    previous = ts[i]
+                    while scheduler.wait_next() is None and self.hold():
+                        pass
+                    if not self.running:
+                        break
+                    if masks[i] != self.held:
+                        self.set_buttons(xs[i], ys[i], masks[i])
+                    else:
+                        self.backend.move(xs[i], ys[i])
+                    self.publish("running")
+                else:
+                    self.index = len(ts)
+                # never leave a button down between cycles
+                if self.held and ts:
+                    self.set_buttons(xs[self.index - 1], ys[self.index - 1], 0)
+                if cycle < s.cycles and self.running:
+                    self.cycle_delay()
+        except Exception as e:
+            error = f"error: {e}"
+        finally:
+            if self.held:
+                try:
+                    x, y = self.backend.position()
+                    self.set_buttons(x, y, 0)
+                except Exception as e:
+                    error = error or f"error: {e}"
+        self.channel.post("markers", True)
+        status = error or ("finished" if self.running else "stopped")
+        self.running = False
+        self.publish(status)
+        self.channel.post("done", status, self.summary())
+
+
+# --- Command Bus ---
+# Every control input (hotkeys, buttons, daemon socket) is posted here as a
+# timestamped Command and run by a single consumer, in order: the Tk main
+# loop in the window, one worker thread in the daemon. Handlers are
+# idempotent (start while running does nothing) and repeats from the same
+# source inside its debounce window are dropped.
+COMMAND_DEBOUNCE = {"hotkey": 0.25, "button": 0.15}  # seconds, per source
+COMMAND_POLL_MS = 10  # the window picks up commands from other threads this often
+
+
+class Command:
+    __slots__ = ("name", "args", "kwargs", "source", "issued", "done", "result", "error")
+
+    def __init__(self, name, args, kwargs, source, issued):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.source = source
+        self.issued = issued
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        # the handler's return value; re-raises what the handler raised
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"{self.name} timed out")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class CommandBus:
+    def __init__(self, debounce=COMMAND_DEBOUNCE, clock=time.perf_counter):
+        self.handlers = {}
+        self.debounce = dict(debounce)
+        self.clock = clock
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.last = {}  # (name, source) -> when it was last accepted
+        self.dropped = 0
+        self.handled = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+
+    def post(self, name, args=(), kwargs=None, source="api"):
+        # any thread; the queued Command, or None when debounced
+        now = self.clock()
+        window = self.debounce.get(source, 0.0)
+        with self.lock:
+            key = (name, source)
+            if window and now - self.last.get(key, -window) < window:
+                self.dropped += 1
+                return None
+            self.last[key] = now
+        command = Command(name, tuple(args), kwargs or {}, source, now)
+        self.queue.put(command)
+        return command
+
+    def call(self, name, args=(), kwargs=None, source="api", timeout=None):
+        # post and wait until the consumer ran it
+        command = self.post(name, args, kwargs, source)
+        return None if command is None else command.wait(timeout)
+
+    def execute(self, command):
+        handler = self.handlers.get(command.name)
+        try:
+            if handler is None:
+                raise ValueError(f"unknown command {command.name!r}")
+            command.result = handler(*command.args, **command.kwargs)
+        except Exception as e:
+            command.error = e
+        # issued -> effect done, what a hotkey press actually costs
+        latency = self.clock() - command.issued
+        self.handled += 1
+        self.latency_sum += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+        command.done.set()
+        if command.error is not None and command.source != "socket":
+            print(f"Command {command.name} failed:", command.error)
+
+    def dispatch(self):
+        # non-blocking consumer (Tk): run everything queued so far
+        while True:
+            try:
+                command = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.execute(command)
+
+    def serve(self):
+        # blocking consumer (worker thread) until close()
+        while True:
+            command = self.queue.get()
+            if command is None:
+                return
+            self.execute(command)
+
+    def close(self):
+        self.queue.put(None)
+
+    def stats(self):
+        return {
+            "handled": self.handled,
+            "debounced": self.dropped,
+            "latency_avg_ms": round(self.latency_sum / self.handled * 1000, 3) if self.handled else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 3),
+        }
+
+
+# --- Click Effects ---
+class _CircleSlot:
+    __slots__ = ("win", "canvas", "circle", "x", "y", "started")
+
+
+class OverlayPool:
+    # Fixed set of click-circle windows created up front and animated by a
+    # single after() loop on the main thread. When all of them are busy a new
+    # effect restarts the closest running one ("merge") or is dropped.
+    SIZE = 48
+
+    def __init__(self, root, pool_size=8, fps=60, duration=350, overflow="merge"):
+        self.root = root
+        self.pool_size = max(1, int(pool_size))
+        self.fps = max(1, int(fps))
+        self.duration = duration / 1000.0
+        self.overflow = overflow
+        self.free = [self._make_slot() for _ in range(self.pool_size)]
+        self.active = []
+        self.dropped = 0
+        self._after_id = None
+
+    def _make_slot(self):
+        size = self.SIZE
+        slot = _CircleSlot()
+        slot.win = tk.Toplevel(self.root)
+        slot.win.overrideredirect(True)
+        slot.win.attributes('-topmost', True)
+        slot.win.withdraw()
+        slot.win.geometry(f'{size}x{size}')
+        slot.canvas = tk.Canvas(slot.win, width=size, height=size, bg="#1e1e2f", highlightthickness=0)
+        slot.canvas.pack()
+        slot.circle = slot.canvas.create_oval(6, 6, size-6, size-6, outline='#00BCD4', width=4)
+        slot.x = slot.y = 0
+        slot.started = 0.0
+        return slot
+
+    def spawn(self, x, y):
+        if self.free:
+            slot = self.free.pop()
+            self.active.append(slot)
+        elif self.overflow == "merge" and self.active:
+            slot = min(self.active, key=lambda s: abs(s.x - x) + abs(s.y - y))
+        else:
+            self.dropped += 1
+            return
+        size = self.SIZE
+        slot.x, slot.y = x, y
+        slot.started = time.perf_counter()
+        slot.win.geometry(f'+{int(x-size//2)}+{int(y-size//2)}')
+        self._draw(slot, 0.0)
+        slot.win.deiconify()
+        if self._after_id is None:
+            self._after_id = self.root.after(int(1000 / self.fps), self._tick)
+
+    def _draw(self, slot, t):
+        size, shrink = self.SIZE, int(t * 18)
+        slot.canvas.coords(slot.circle, 6 + shrink, 6 + shrink, size-6 - shrink, size-6 - shrink)
+        try:
+            slot.win.attributes('-alpha', 0.7 * (1.0 - t))
+        except Exception:
+            pass
+
+    def _tick(self):
+        now = time.perf_counter()
+        still_active = []
+        for slot in self.active:
+            t = (now - slot.started) / self.duration
+            if t >= 1.0:
+                slot.win.withdraw()
+                self.free.append(slot)
+            else:
+                self._draw(slot, t)
+                still_active.append(slot)
+        self.active = still_active
+        self._after_id = self.root.after(int(1000 / self.fps), self._tick) if still_active else None
+
+    def idle(self):
+        return not self.active
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        for slot in self.free + self.active:
+            try:
+                slot.win.destroy()
+            except Exception:
+                pass
+        self.free, self.active = [], []
+
+
+# --- Position List ---
+MAX_MARKER_WINDOWS = 200  # per-marker window fallback is capped
+MARKER_BAND = 2           # px per rectangle when an X11 shape traces a marker
+MARKER_SHAPE_CHUNK = 4096  # rectangles per SHAPE request
+
+
+class ModeEditorPool:
+    # Mode comboboxes only for the rows currently on screen. Widgets are
+    # created once per visible slot and re-pointed at other rows on scroll,
+    # so a 10k row list costs the same as a 10 row one.
+    def __init__(self, tree, on_change):
+        self.tree = tree
+        self.on_change = on_change
+        self.editors = []  # [combo, var, row_id]
+        self._refresh_id = None
+
+    def schedule_refresh(self, *_):
+        if self._refresh_id is None:
+            self._refresh_id = self.tree.after_idle(self.refresh)
+
+    def _make_editor(self):
+        var = tk.StringVar()
+        combo = ttk.Combobox(self.tree, textvariable=var, values=list(MODE_NAMES), state="readonly", width=7, justify="center")
+        combo.configure(style="Mode.TCombobox")
+        combo.option_add('*TCombobox*Listbox.Justify', 'center')
+        combo.option_add('*TCombobox.Justify', 'center')
+        editor = [combo, var, None]
+        def on_select(event):
+            if editor[2] is not None:
+                self.tree.set(editor[2], "Mode", var.get())
+                self.on_change()
+        combo.bind("<<ComboboxSelected>>", on_select)
+        return editor
+
+    def visible_rows(self):
+        # first row under the header, then walk forward while rows have a bbox
+        row = ""
+        for y in range(0, 64, 4):
+            row = self.tree.identify_row(y)
+            if row:
+                break
+        rows = []
+        while row:
+            bbox = self.tree.bbox(row, column="Mode")
+            if not bbox:
+                break
+            rows.append((row, bbox))
+            row = self.tree.next(row)
+        return rows
+
+    def refresh(self):
+        self._refresh_id = None
+        rows = self.visible_rows()
+        while len(self.editors) < len(rows):
+            self.editors.append(self._make_editor())
+        for editor, (row, (x, y, width, height)) in zip(self.editors, rows):
+            editor[2] = row
+            editor[1].set(self.tree.set(row, "Mode"))
+            editor[0].place(x=x, y=y, width=width, height=height)
+        for editor in self.editors[len(rows):]:
+            editor[2] = None
+            editor[0].place_forget()
+
+
+class RowEffects:
+    # Click highlight for Treeview rows: gold, then a short water fade. One
+    # tag per animation frame, configured once, so rows animate
+    # independently instead of fighting over one shared tag. All active rows
+    # advance in a single tick; a tick touches at most `budget` rows and
+    # stops early when it runs out of time. Rows it doesn't reach hold
+    # their frame, and a row hit again restarts at gold, so when clicks
+    # outrun the frame rate the effect settles into a static highlight.
+    FRAMES = ("#FFD700", "#FFD700", "#B2EBF2", "#4DD0E1", "#00BCD4", "#0097A7")
+    FRAME_MS = 60
+    BUDGET = 32        # rows per tick
+    BUDGET_S = 0.004   # time per tick
+
+    def __init__(self, tree, base_tags=("centered",)):
+        self.tree = tree
+        self.base_tags = base_tags
+        self.active = {}  # row -> frame, oldest hit first
+        self._tick_id = None
+        for i, color in enumerate(self.FRAMES):
+            tree.tag_configure(f"fx{i}", background=color)
+
+    def hit(self, row):
+        frame = self.active.pop(row, None)
+        self.active[row] = 0
+        if frame != 0 and not self._set(row, 0):
+            return
+        if self._tick_id is None:
+            self._tick_id = self.tree.after(self.FRAME_MS, self.tick)
+
+    def _set(self, row, frame):
+        # False when the row is gone (deleted while running)
+        tags = self.base_tags if frame is None else self.base_tags + (f"fx{frame}",)
+        try:
+            self.tree.item(row, tags=tags)
+        except tk.TclError:
+            self.active.pop(row, None)
+            return False
+        return True
+
+    def tick(self):
+        self._tick_id = None
+        deadline = time.perf_counter() + self.BUDGET_S
+        last = len(self.FRAMES) - 1
+        for row in list(itertools.islice(self.active, self.BUDGET)):
+            frame = self.active[row]
+            if frame >= last:
+                del self.active[row]
+                self._set(row, None)
+            else:
+                self.active[row] = frame + 1
+                self._set(row, frame + 1)
+            if time.perf_counter() >= deadline:
+                break
+        if self.active:
+            self._tick_id = self.tree.after(self.FRAME_MS, self.tick)
+
+    def clear(self):
+        if self._tick_id is not None:
+            self.tree.after_cancel(self._tick_id)
+            self._tick_id = None
+        for row in list(self.active):
+            self._set(row, None)
+        self.active.clear()
+
+
+class MarkerSurface:
+    # Persistent numbered markers for all positions drawn on one shared
+    # borderless window, so clicks only land on the markers themselves:
+    # on Windows the background is a transparent color key, on X11 the
+    # window is cut to the marker discs with the SHAPE extension (needs
+    # python-xlib). Otherwise fall back to one small window per marker,
+    # capped at MAX_MARKER_WINDOWS; `log` is told when markers are left out.
+    SIZE = 28
+    KEY = "#010203"
+
+    def __init__(self, root, log=None):
+        self.root = root
+        self.log = log
+        self.points = []
+        self.visible = True
+        self.win = None
+        self.canvas = None
+        self.shared = None  # decided on first draw
+        self.shape = None   # X11: callable taking the marker rectangles
+        self.windows = []
+        self.dropped = 0    # markers past MAX_MARKER_WINDOWS last reported
+        self._redraw_id = None
+
+    def add(self, x, y, num):
+        self.points.append((x, y, num))
+        self.schedule_redraw()
+
+    def set_points(self, points):
+        self.points = list(points)
+        self.schedule_redraw()
+
+    def clear(self):
+        self.points = []
+        self.schedule_redraw()
+
+    def set_visible(self, visible):
+        self.visible = visible
+        targets = [self.win] if self.shared else self.windows
+        for win in targets:
+            if win is None:
+                continue
+            try:
+                win.deiconify() if visible and self.points else win.withdraw()
+            except Exception:
+                pass
+
+    def schedule_redraw(self):
+        # many adds in a row (loading a profile) end up as one redraw
+        if self._redraw_id is None:
+            self._redraw_id = self.root.after_idle(self.redraw)
+
+    def _create_shared(self):
+        win = tk.Toplevel(self.root)
+        win.overrideredirect(True)
+        win.attributes('-topmost', True)
+        try:
+            win.attributes('-transparentcolor', self.KEY)
+        except tk.TclError:
+            self.shape = self._x11_shape(win)
+            if self.shape is None:
+                win.destroy()
+                return False
+        win.configure(bg=self.KEY)
+        self.canvas = tk.Canvas(win, bg=self.KEY, highlightthickness=0, borderwidth=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.win = win
+        return True
+
+    def _x11_shape(self, win):
+        # callable that cuts `win` (output and input) down to a list of
+        # (x, y, w, h) rectangles, or None where that isn't possible
+        if self.root.tk.call("tk", "windowingsystem") != "x11":
+            return None
+        try:
+            from Xlib import X, display
+            from Xlib.ext import shape
+            conn = display.Display()
+            if not conn.has_extension("SHAPE"):
+                raise RuntimeError("X server has no SHAPE extension")
+            win.update_idletasks()
+            # the wrapper Tk puts around a toplevel is the window on screen
+            target = conn.create_resource_object("window", int(win.wm_frame(), 16))
+        except Exception as e:
+            print("Shaped markers disabled:", e)
+            return None
+
+        def apply(rects):
+            for kind in (shape.SK.Bounding, shape.SK.Input):
+                # big lists go out in chunks, the first one replaces the shape
+                target.shape_rectangles(shape.SO.Set, kind, X.Unsorted, 0, 0, rects[:MARKER_SHAPE_CHUNK])
+                for i in range(MARKER_SHAPE_CHUNK, len(rects), MARKER_SHAPE_CHUNK):
+                    target.shape_rectangles(shape.SO.Union, kind, X.Unsorted, 0, 0,
+                                            rects[i:i + MARKER_SHAPE_CHUNK])
+            conn.flush()
+        return apply
+
+    @classmethod
+    def disc_bands(cls):
+        # a marker disc as horizontal (dx, dy, w, h) bands around its center
+        r = cls.SIZE // 2 - 1  # disc radius plus half the outline
+        bands = []
+        for dy in range(-r, r, MARKER_BAND):
+            # the band edge nearer the center is the widest
+            edge = 0 if dy <= 0 < dy + MARKER_BAND else min(abs(dy), abs(dy + MARKER_BAND))
+            half = int(math.ceil(math.sqrt(max(0, r * r - edge * edge))))
+            bands.append((-half, dy, 2 * half, MARKER_BAND))
+        return bands
+
+    def redraw(self):
+        self._redraw_id = None
+        if self.shared is None:
+            self.shared = self._create_shared()
+        if self.shared:
+            self._redraw_shared()
+        else:
+            self._redraw_windows()
+
+    def _draw_marker(self, canvas, cx, cy, num):
+        r = self.SIZE // 2 - 2
+        canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill='#FFD700', outline='#B8860B', width=2)
+        canvas.create_text(cx, cy, text=str(num), font=('Segoe UI', 13, 'bold'), fill='#222')
+
+    def _redraw_shared(self):
+        self.canvas.delete("all")
+        if not self.points:
+            self.win.withdraw()
+            return
+        half = self.SIZE // 2
+        left = min(p[0] for p in self.points) - half
+        top = min(p[1] for p in self.points) - half
+        right = max(p[0] for p in self.points) + half
+        bottom = max(p[1] for p in self.points) + half
+        self.win.geometry(f'{right - left}x{bottom - top}+{left}+{top}')
+        for x, y, num in self.points:
+            self._draw_marker(self.canvas, x - left, y - top, num)
+        if self.shape is not None:
+            bands = self.disc_bands()
+            self.shape([(x - left + dx, y - top + dy, w, h)
+                        for x, y, _ in self.points for dx, dy, w, h in bands])
+        if self.visible:
+            self.win.deiconify()
+
+    def _redraw_windows(self):
+        size = self.SIZE
+        points = self.points[:MAX_MARKER_WINDOWS]
+        dropped = len(self.points) - len(points)
+        if dropped != self.dropped and dropped > 0:
+            msg = f"Markers shown for the first {len(points)} of {len(self.points)} positions"
+            print(msg)
+            if self.log is not None:
+                self.log(msg)
+        self.dropped = dropped
+        while len(self.windows) > len(points):
+            self.windows.pop().destroy()
+        while len(self.windows) < len(points):
+            overlay = tk.Toplevel(self.root)
+            overlay.overrideredirect(True)
+            overlay.attributes('-topmost', True)
+            try:
+                overlay.attributes('-alpha', 0.85)
+            except Exception:
+                pass
+            canvas = tk.Canvas(overlay, width=size, height=size, bg="#2b2b40", highlightthickness=0, borderwidth=0)
+            canvas.pack()
+            overlay.canvas = canvas
+            self.windows.append(overlay)
+        for overlay, (x, y, num) in zip(self.windows, points):
+            overlay.canvas.delete("all")
+            self._draw_marker(overlay.canvas, size // 2, size // 2, num)
+            overlay.geometry(f'{size}x{size}+{int(x-size//2)}+{int(y-size//2)}')
+            if not self.visible:
+                overlay.withdraw()
+
+
+# --- Profiles ---
+# v1: one JSON array of Treeview value lists [pos, x, y, type, mode]
+# v2: NDJSON, a header object line followed by one [x, y, type, mode] per line
+# v3: like v2, window-bound rows carry a fifth item, the X11 window id
+# v4: a sixth item holds the row's screen condition (window id 0 if unbound)
+# v5: a seventh item holds a step row's argument (condition null if none)
+PROFILE_FORMAT = "multiclicker-profile"
+PROFILE_VERSION = 5
+PROFILE_BATCH = 2000  # rows inserted per idle slice while loading
+
+
+def migrate_v1_row(row):
+    _, x, y, click_type, mode = row[:5]
+    return int(float(x)), int(float(y)), click_type, mode, 0, None, ""
+
+
+def normalize_row(row):
+    # v2-v5 rows -> (x, y, click type, mode, window id, condition spec, step)
+    row = tuple(row)
+    return row + (0, None, "")[len(row) - 4:]
+
+
+def write_profile(path, rows):
+    # rows are (x, y, click type, mode, window id, condition spec or None, step)
+    rows = list(rows)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"format": PROFILE_FORMAT, "version": PROFILE_VERSION, "count": len(rows)}) + "\n")
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        for x, y, click_type, mode, window, condition, step in rows:
+            row = [int(float(x)), int(float(y)), click_type, mode]
+            if window or condition or step:
+                row.append(window)
+            if condition or step:
+                row.append(condition or None)
+            if step:
+                row.append(step)
+            f.write(dumps(row))
+            f.write("\n")
+
+
+def read_profile_header(f):
+    # sniff the format; returns the v2 header, or None for a v1 file
+    while True:
+        ch = f.read(1)
+        if not ch or not ch.isspace():
+            break
+    if ch == "[":
+        f.seek(0)
+        return None
+    header = json.loads(ch + f.readline())
+    if header.get("format") != PROFILE_FORMAT:
+        raise ValueError("Not a MultiClicker profile")
+    if header.get("version", 0) > PROFILE_VERSION:
+        raise ValueError(f"Profile version {header['version']} is newer than this app")
+    return header
+
+
+def iter_profile(path, batch=PROFILE_BATCH):
+    # yields lists of (x, y, click type, mode, window id, condition spec, step), at
+    # most `batch` rows each; a batch of lines is parsed with one json.loads
+    with open(path, "r", encoding="utf-8") as f:
+        header = read_profile_header(f)
+        if header is None:
+            rows = [migrate_v1_row(row) for row in json.load(f)]
+            for i in range(0, len(rows), batch):
+                yield rows[i:i + batch]
+            return
+        while True:
+            lines = [line for line in itertools.islice(f, batch) if line.strip()]
+            if not lines:
+                return
+            yield [normalize_row(row) for row in json.loads("[" + ",".join(lines) + "]")]
+
+
+# --- Profile Library ---
+# Named profiles in one SQLite file: the rows plus the run settings the
+# window keeps in Tk variables, indexed by name and by tag. The database
+# runs with a write-ahead journal, so an autosave is one short transaction
+# and a crash loses at most the last AUTOSAVE_MS of edits; a save writes
+# only the rows that changed. The last LIBRARY_CACHE profiles opened stay
+# compiled (Treeview values, marker points, ClickPlan) in an LRU, so
+# switching back to one refills the tree without parsing anything.
+LIBRARY_PATH = os.path.join(os.path.expanduser("~"), ".multiclicker", "library.db")
+LIBRARY_CACHE = 8
+AUTOSAVE_MS = 500  # quiet time after an edit before it is written
+DEFAULT_PROFILE = "Default"
+ALL_TAGS = "All tags"
+# Tk variables stored with each profile
+PROFILE_SETTINGS = ("delay", "repeats", "cycles", "cycle_delay", "click_type",
+                    "double_mode", "double_freq", "double_position")
+LIBRARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    settings TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    profile INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, profile)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_by_profile ON tags(profile);
+CREATE TABLE IF NOT EXISTS positions (
+    profile INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    pos INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    click_type TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    window_id INTEGER NOT NULL,
+    condition TEXT,
+    step TEXT NOT NULL,
+    PRIMARY KEY (profile, pos)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+# One profile as the window uses it; rows as in iter_profile, values and
+# points ready for the Treeview and markers, plan None if it didn't compile.
+# Entries read from the database keep values None until they are opened;
+# a save patches a compiled entry instead of dropping it.
+LibraryProfile = namedtuple("LibraryProfile", ["name", "tags", "settings", "rows", "values", "points", "plan"])
+
+
+def parse_tags(text):
+    # "Work, daily ,work" -> ["daily", "work"]
+    return sorted({tag.strip().lower() for tag in text.split(",") if tag.strip()})
+
+
+def row_values(pos, row):
+    # one profile row -> its Treeview value tuple
+    x, y, click_type, mode, window, condition, step = row
+    return (pos, x, y, click_type, mode, window_label(window),
+            condition_label(condition), json.dumps(condition) if condition else "", step)
+
+
+def marker_points(rows, first=1):
+    # window-bound rows are window-relative and get no marker
+    return [(row[0], row[1], pos) for pos, row in enumerate(rows, first) if not row[4]]
+
+
+def profile_values(rows, first=1):
+    # profile rows -> (Treeview value tuples, marker points) numbered from `first`
+    return [row_values(pos, row) for pos, row in enumerate(rows, first)], marker_points(rows, first)
+
+
+def compile_profile(name, tags, settings, rows):
+    values, points = profile_values(rows)
+    try:
+        plan = ClickPlan.compile(values, button=settings.get("click_type"))
+    except (ValueError, KeyError, RuntimeError):
+        plan = None  # compiled again at start, which reports the problem
+    return LibraryProfile(name, tags, settings, rows, values, points, plan)
+
+
+def patch_profile(entry, settings, rows, changed):
+    # compiled `entry` brought up to `rows`; only the (pos, row) pairs in
+    # `changed` are compiled, the rest is copied
+    values = entry.values[:len(rows)]
+    for pos, row in changed:
+        if pos < len(values):
+            values[pos] = row_values(pos + 1, row)
+        else:
+            values.append(row_values(pos + 1, row))
+    button = settings.get("click_type")
+    plan = entry.plan
+    if plan is None or button != entry.settings.get("click_type"):
+        return compile_profile(entry.name, entry.tags, settings, rows)
+    try:
+        plan = plan.patched({pos: values[pos] for pos, _ in changed}, len(rows), button)
+    except (ValueError, KeyError, RuntimeError):
+        plan = None
+    return LibraryProfile(entry.name, entry.tags, settings, rows, values, marker_points(rows), plan)
+
+
+class ProfileLibrary:
+    # One connection, used from the Tk thread only. open() raises KeyError
+    # for an unknown name; save() creates the profile if needed.
+    def __init__(self, path=LIBRARY_PATH, cache=LIBRARY_CACHE):
+        import sqlite3
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(LIBRARY_SCHEMA)
+        self.cache = OrderedDict()
+        self.capacity = cache
+        self.hits = 0
+        self.misses = 0
+        self.rows_written = 0
+
+    def close(self):
+        self.db.close()
+
+    def names(self, tag=None):
+        # most recently saved first
+        if tag:
+            cursor = self.db.execute("SELECT name FROM profiles JOIN tags ON tags.profile = profiles.id"
+                                     " WHERE tag = ? ORDER BY updated DESC", (tag,))
+        else:
+            cursor = self.db.execute("SELECT name FROM profiles ORDER BY updated DESC")
+        return [name for name, in cursor]
+
+    def tags(self):
+        return [tag for tag, in self.db.execute("SELECT DISTINCT tag FROM tags ORDER BY tag")]
+
+    def _id(self, name):
+        row = self.db.execute("SELECT id FROM profiles WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def open(self, name):
+        entry = self._load(name)
+        if entry.values is None:
+            entry = self.cache[name] = compile_profile(*entry[:4])
+        return entry
+
+    def _load(self, name):
+        # the cached entry, compiled or not; read from the database on a miss
+        entry = self.cache.get(name)
+        if entry is not None:
+            self.cache.move_to_end(name)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        row = self.db.execute("SELECT id, settings FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        profile, settings = row
+        rows = [(x, y, click_type, mode, window, json.loads(condition) if condition else None, step)
+                for x, y, click_type, mode, window, condition, step in self.db.execute(
+                    "SELECT x, y, click_type, mode, window_id, condition, step FROM positions"
+                    " WHERE profile = ? ORDER BY pos", (profile,))]
+        tags = [tag for tag, in self.db.execute("SELECT tag FROM tags WHERE profile = ? ORDER BY tag", (profile,))]
+        return self._remember(LibraryProfile(name, tags, json.loads(settings), rows, None, None, None))
+
+    def _remember(self, entry):
+        self.cache[entry.name] = entry
+        self.cache.move_to_end(entry.name)
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return entry
+
+    def save(self, name, rows, settings=None):
+        # rows as in iter_profile (ints for x/y/window id); settings None
+        # keeps the stored ones. Writes only the rows that differ from the
+        # stored profile and returns how many it wrote.
+        rows = list(rows)
+        profile = self._id(name)
+        if profile is None:
+            old = LibraryProfile(name, [], None, [], None, None, None)
+        else:
+            old = self._load(name)
+        if settings is None:
+            settings = old.settings or {}
+        old_rows = old.rows
+        changed = [(pos, row) for pos, row in enumerate(rows) if pos >= len(old_rows) or old_rows[pos] != row]
+        if profile is not None and not changed and len(rows) == len(old_rows) and settings == old.settings:
+            return 0
+        with self.db:
+            if profile is None:
+                profile = self.db.execute("INSERT INTO profiles (name, settings, updated) VALUES (?, ?, ?)",
+                                          (name, json.dumps(settings), time.time())).lastrowid
+            else:
+                self.db.execute("UPDATE profiles SET settings = ?, updated = ? WHERE id = ?",
+                                (json.dumps(settings), time.time(), profile))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(profile, pos, x, y, click_type, mode, window, json.dumps(condition) if condition else None, step)
+                 for pos, (x, y, click_type, mode, window, condition, step) in changed])
+            if len(rows) < len(old_rows):
+                self.db.execute("DELETE FROM positions WHERE profile = ? AND pos >= ?", (profile, len(rows)))
+        self.rows_written += len(changed)
+        if old.values is not None:
+            self._remember(patch_profile(old, settings, rows, changed))
+        else:
+            self._remember(LibraryProfile(name, old.tags, settings, rows, None, None, None))
+        return len(changed)
+
+    def unused_name(self, name):
+        # `name`, or "name 2", "name 3"... if taken
+        taken = set(self.names())
+        candidate, n = name, 1
+        while candidate in taken:
+            n += 1
+            candidate = f"{name} {n}"
+        return candidate
+
+    def set_tags(self, name, tags):
+        profile = self._id(name)
+        if profile is None:
+            raise KeyError(name)
+        with self.db:
+            self.db.execute("DELETE FROM tags WHERE profile = ?", (profile,))
+            self.db.executemany("INSERT INTO tags VALUES (?, ?)", [(tag, profile) for tag in tags])
+        entry = self.cache.get(name)
+        if entry is not None:
+            self.cache[name] = entry._replace(tags=list(tags))
+
+    def delete(self, name):
+        with self.db:
+            self.db.execute("DELETE FROM profiles WHERE name = ?", (name,))
+        self.cache.pop(name, None)
+
+    def last(self):
+        # the profile switched to last, if it still exists
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last'").fetchone()
+        return row[0] if row is not None and self._id(row[0]) is not None else None
+
+    def set_last(self, name):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('last', ?)", (name,))
+
+
+def format_duration(seconds):
+    seconds = int(math.ceil(seconds))
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
 
 
 class MultiClickerApp:
     def load_positions(self):
-        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        file_path = filedialog.askopenfilename(filetypes=[("MultiClicker profiles", "*.mcp *.json"), ("All files", "*.*")])
         if not file_path:
             return
-        with open(file_path, "r") as f:
-            data = json.load(f)
         self.clear_positions()
-        for pos in data:
-            self.tree.insert("", "end", values=pos)
-        # update overlays for loaded positions (basic)
-        for i, item in enumerate(self.tree.get_children(), start=1):
-            vals = self.tree.item(item, "values")
-            try:
-                _, x, y, _, _ = vals
-                self.show_position_number_persistent(int(x), int(y), i)
-            except Exception:
-                pass
+        batches = iter_profile(file_path)
+        self._loading = [batches, self.root.after_idle(self._load_next_batch, batches, [])]
+
+    def _load_next_batch(self, batches, points, loaded=0):
+        # insert one batch per idle slice so the window keeps responding;
+        # markers and dependent widgets are built once at the end
+        try:
+            rows = next(batches, None)
+        except (OSError, ValueError, TypeError) as e:
+            self._loading = None
+            messagebox.showerror("Load", f"Could not read profile: {e}")
+            return
+        if rows is not None:
+            values, batch_points = profile_values(rows, loaded + 1)
+            self.insert_rows(values)
+            points.extend(batch_points)
+            loaded += len(values)
+            self.log_message(f"Loading... {loaded} positions")
+            self._loading[1] = self.root.after_idle(self._load_next_batch, batches, points, loaded)
+            return
+        self._loading = None
+        self.markers.set_points(points)
+        self.mode_editors.schedule_refresh()
         self.update_double_positions()
-        self.log_message("Positions loaded")
+        self.positions_changed()
+        self.log_message(f"Positions loaded ({len(points)})")
+
+    def insert_rows(self, values):
+        # straight Tcl call, skips ttk's per-call option formatting
+        call, tree = self.tree.tk.call, str(self.tree)
+        for row in values:
+            call(tree, "insert", "", "end", "-values", row, "-tags", "centered")
+
+    def tree_rows(self):
+        # the position list as profile rows, see iter_profile
+        return [(int(float(values[1])), int(float(values[2])), values[3], values[4], window_code(values[5]),
+                 json.loads(values[7]) if values[7] else None, str(values[8]))
+                for values in (self.tree.item(item, "values") for item in self.tree.get_children())]
+
     def save_positions(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".json")
+        file_path = filedialog.asksaveasfilename(defaultextension=".mcp",
+                                                 filetypes=[("MultiClicker profiles", "*.mcp")])
         if not file_path:
             return
-        data = [self.tree.item(item, "values") for item in self.tree.get_children()]
-        with open(file_path, "w") as f:
-            json.dump(data, f)
+        write_profile(file_path, self.tree_rows())
         self.log_message("Positions saved")
+
+    # --- Profile library ---
+    def open_library(self):
+        try:
+            self.library = ProfileLibrary()
+        except Exception as e:
+            print("Profile library disabled:", e)
+            return
+        name = self.library.last() or next(iter(self.library.names()), None)
+        if name is not None and not self.tree.get_children():
+            self.switch_profile(name)
+            return
+        # first start, or positions were added before the library was up:
+        # keep what is in the window as a new profile instead of replacing it
+        name = self.library.unused_name(DEFAULT_PROFILE)
+        self.library.save(name, self.tree_rows(), self.profile_settings())
+        self.current_profile = name
+        self.profile_name.set(name)
+        self.library.set_last(name)
+        self.refresh_profiles()
+
+    def profile_settings(self):
+        # None while a field holds something that doesn't parse yet
+        try:
+            return {name: getattr(self, name).get() for name in PROFILE_SETTINGS}
+        except (tk.TclError, ValueError):
+            return None
+
+    def switch_profile(self, name):
+        # an unknown name starts a new, empty profile with the current settings
+        name = name.strip()
+        if self.library is None or not name or name == self.current_profile:
+            return
+        self.autosave()  # the profile we leave keeps its last edits
+        started = time.perf_counter()
+        try:
+            entry = self.library.open(name)
+        except KeyError:
+            self.library.save(name, (), self.profile_settings())
+            entry = self.library.open(name)
+        # the refill below is not an edit
+        self.current_profile = None
+        self.clear_positions()
+        self.insert_rows(entry.values)
+        self.markers.set_points(entry.points)
+        self.update_double_positions()
+        for setting, value in entry.settings.items():
+            if setting in PROFILE_SETTINGS:
+                getattr(self, setting).set(value)
+        self.positions_changed()
+        if entry.plan is not None:
+            self._compiled = (entry.plan, self.tree.get_children(), entry.settings.get("click_type"))
+        self.current_profile = name
+        self.profile_name.set(name)
+        self.library.set_last(name)
+        self.refresh_profiles()
+        self.log_message(f"Profile {name}: {len(entry.values)} positions"
+                         f" in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def refresh_profiles(self, *_):
+        if self.library is None:
+            return
+        tag = self.tag_filter.get()
+        self.profile_box["values"] = self.library.names(None if tag == ALL_TAGS else tag)
+        self.tag_box["values"] = [ALL_TAGS] + self.library.tags()
+
+    def schedule_autosave(self, *_):
+        if self.current_profile is None or self._autosave_id is not None:
+            return
+        self._autosave_id = self.root.after(AUTOSAVE_MS, self.autosave)
+
+    def autosave(self):
+        # write the edits since the last save; skipped while a file streams in,
+        # whose last batch schedules the save again
+        if self._autosave_id is not None:
+            self.root.after_cancel(self._autosave_id)
+            self._autosave_id = None
+        if self.library is None or self.current_profile is None or self._loading is not None:
+            return
+        try:
+            self.library.save(self.current_profile, self.tree_rows(), self.profile_settings())
+        except Exception as e:
+            self.log_message(f"Autosave failed: {e}")
+
+    def edit_tags(self):
+        if self.library is None or self.current_profile is None:
+            return
+        from tkinter import simpledialog
+        text = simpledialog.askstring("Tags", "Comma separated tags:", parent=self.root,
+                                      initialvalue=", ".join(self.library.open(self.current_profile).tags))
+        if text is None:
+            return
+        self.library.set_tags(self.current_profile, parse_tags(text))
+        self.refresh_profiles()
+
+    def delete_profile(self):
+        name = self.current_profile
+        if self.library is None or name is None:
+            return
+        if not messagebox.askyesno("Delete profile", f"Delete profile '{name}' and its positions?"):
+            return
+        if self._autosave_id is not None:
+            self.root.after_cancel(self._autosave_id)
+            self._autosave_id = None
+        self.current_profile = None
+        self.library.delete(name)
+        self.switch_profile(next(iter(self.library.names()), DEFAULT_PROFILE))
+
+    def quit(self):
+        self.autosave()
+        if self.library is not None:
+            self.library.close()
+        self.root.destroy()
     def clear_positions(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        # Remove all persistent overlays
-        for overlay in self.position_overlays:
-            try:
-                overlay.destroy()
-            except Exception:
-                pass
-        self.position_overlays.clear()
+        if self._loading is not None:
+            # abandon a profile that is still streaming in
+            self.root.after_cancel(self._loading[1])
+            self._loading[0].close()
+            self._loading = None
+        self.row_effects.clear()
+        items = self.tree.get_children()
+        if items:
+            self.tree.delete(*items)
+        # Remove all persistent markers
+        self.markers.clear()
+        self.alternate_order = None
         self.log_message("Positions cleared")
         self.update_double_positions()
-    def __init__(self, root):
+        self.positions_changed()
+    def __init__(self, root, profile=None):
         self.root = root
+        self.profile = profile
         self.root.title("🎯 Multi Clicker Pro")
-        self.root.geometry("520x470")
+        self.root.geometry("574x496")
         self.root.configure(bg="#1e1e2f")
         
         # --- Style (Dark Theme) ---
@@ -106,7 +3607,64 @@ class MultiClickerApp:
         self.double_mode = tk.StringVar(value="Random")
         self.double_freq = tk.IntVar(value=5)
         self.double_position = tk.StringVar(value="All Positions")
-        self.position_overlays = []
+        self.schedule_policy = tk.StringVar(value=POLICY_SKIP)
+        self.backend_name = tk.StringVar(value="auto")
+        self.effect_pool_size = tk.IntVar(value=8)
+        self.effect_fps = tk.IntVar(value=60)
+        self.replay_speed = tk.DoubleVar(value=1.0)
+        # humanization: delay jitter in % of the delay, offsets in pixels,
+        # empty seed = a fresh one each run
+        self.delay_jitter = tk.DoubleVar(value=0.0)
+        self.offset_sigma = tk.DoubleVar(value=0.0)
+        self.offset_radius = tk.DoubleVar(value=0.0)
+        self.seed = tk.StringVar(value="")
+        # adaptive pacing: learn the delay from the target's response, in seconds
+        self.adaptive = tk.BooleanVar(value=False)
+        self.adapt_min = tk.DoubleVar(value=0.01)
+        self.adapt_max = tk.DoubleVar(value=1.0)
+        self.bind_window = tk.BooleanVar(value=False)  # capture binds to the window under the cursor
+        self.overlay_pool = None
+        # audio, the input backend and hotkeys are started by warm_up()
+        # once the window is up
+        self.audio = None
+        self.backend = None
+        self._backend_choice = None
+        self._backend_lock = threading.Lock()
+        self.warmed_up = threading.Event()
+        self.markers = MarkerSurface(self.root, log=self.log_message)
+        self._loading = None  # [batch iterator, after id] while a profile streams in
+        # Profile library (opened by warm_up), the profile being edited and
+        # the plan compiled with it, reused by compile_plan until an edit
+        self.library = None
+        self.current_profile = None
+        self.profile_name = tk.StringVar()
+        self.tag_filter = tk.StringVar(value=ALL_TAGS)
+        self._autosave_id = None
+        self._compiled = None
+        for name in PROFILE_SETTINGS:
+            getattr(self, name).trace_add("write", self.schedule_autosave)
+        # Pointer recorder while recording, and the last recorded/loaded path
+        self.recorder = None
+        self.recording = None
+        # Row order before the last "Optimize", swappable with the current one
+        self.alternate_order = None
+        # Start/stop/pause/record from hotkeys and buttons, run on the Tk thread
+        self.commands = CommandBus()
+        for name, handler in (("start", self.start_clicking), ("stop", self.stop_clicking),
+                              ("pause", self.pause_clicking), ("record", self.toggle_recording),
+                              ("replay", self.start_replay)):
+            self.commands.register(name, handler)
+        # Engine of the current run and the channel it reports through
+        self.engine = None
+        self.channel = None
+        self._pump_id = None
+        self._ui_seq = -1
+        # Per-click timings, reused across runs; optionally mirrored to a
+        # Prometheus text file about once a second while running
+        self.telemetry = ClickTelemetry()
+        self.prometheus_path = None
+        self._hist_count = -1
+        self._prometheus_written = 0.0
         
         # --- Main Layout (2 columns: left positions, right status/settings) ---
         self.main_frame = ttk.Frame(root)
@@ -116,19 +3674,29 @@ class MultiClickerApp:
         self.left_frame = ttk.LabelFrame(self.main_frame, text="Click Positions")
         self.left_frame.grid(row=0, column=0, sticky="nsew", padx=2, pady=2)
         
-        self.tree = ttk.Treeview(self.left_frame, columns=("Position", "X", "Y", "Click Type", "Mode"),
+        self.tree = ttk.Treeview(self.left_frame, columns=("Position", "X", "Y", "Click Type", "Mode", "Window", "If", "Condition", "Step"),
                      show="headings", height=9, style="Treeview")
         self.tree.heading("Position", text="Pos")
         self.tree.heading("X", text="X")
         self.tree.heading("Y", text="Y")
         self.tree.heading("Click Type", text="Type")
         self.tree.heading("Mode", text="Mode")
+        self.tree.heading("Window", text="Win")
+        self.tree.heading("If", text="If")
+        self.tree.heading("Step", text="Arg")
         self.tree.column("Position", width=38, anchor="center")
         self.tree.column("X", width=38, anchor="center")
         self.tree.column("Y", width=38, anchor="center")
         self.tree.column("Click Type", width=54, anchor="center")
         self.tree.column("Mode", width=54, anchor="center")
+        self.tree.column("Window", width=62, anchor="center")
+        self.tree.column("If", width=48, anchor="center")
+        self.tree.column("Step", width=54, anchor="center")
+        # the condition itself (JSON) stays in a hidden column
+        self.tree.configure(displaycolumns=("Position", "X", "Y", "Click Type", "Mode", "Window", "If", "Step"))
         self.tree.grid(row=0, column=0, columnspan=4, pady=2, sticky="nsew")
+        self.tree_scroll = ttk.Scrollbar(self.left_frame, orient="vertical", command=self.tree.yview)
+        self.tree_scroll.grid(row=0, column=4, pady=2, sticky="ns")
         
         # Use two labels: one for 'Msg:' (white), one for message (yellow)
         self.msg_label = tk.Label(self.left_frame, text="Msg:", anchor="w",
@@ -145,6 +3713,27 @@ class MultiClickerApp:
         ttk.Button(self.left_frame, text="Save", command=self.save_positions).grid(row=2, column=2, pady=2, sticky="ew")
         ttk.Button(self.left_frame, text="Load", command=self.load_positions).grid(row=2, column=3, pady=2, sticky="ew")
 
+        # Recorded pointer paths (kept apart from the position list)
+        self.record_btn = ttk.Button(self.left_frame, text="● Rec", command=lambda: self.command("record", True))
+        self.record_btn.grid(row=3, column=0, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Replay", command=lambda: self.command("replay")).grid(row=3, column=1, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Save Rec", command=self.save_recording).grid(row=3, column=2, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Load Rec", command=self.load_recording).grid(row=3, column=3, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Optimize Order", command=self.optimize_order).grid(row=4, column=0, columnspan=2, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Swap Order", command=self.swap_order).grid(row=4, column=2, columnspan=2, pady=2, sticky="ew")
+
+        # Profile library: tag filter, profile (type a new name + Enter to create one)
+        self.tag_box = ttk.Combobox(self.left_frame, textvariable=self.tag_filter, values=[ALL_TAGS],
+                                    state="readonly", width=8)
+        self.tag_box.grid(row=5, column=0, pady=2, sticky="ew")
+        self.tag_box.bind("<<ComboboxSelected>>", self.refresh_profiles)
+        self.profile_box = ttk.Combobox(self.left_frame, textvariable=self.profile_name, width=10)
+        self.profile_box.grid(row=5, column=1, pady=2, sticky="ew")
+        self.profile_box.bind("<<ComboboxSelected>>", lambda e: self.switch_profile(self.profile_name.get()))
+        self.profile_box.bind("<Return>", lambda e: self.switch_profile(self.profile_name.get()))
+        ttk.Button(self.left_frame, text="Tags", command=self.edit_tags).grid(row=5, column=2, pady=2, sticky="ew")
+        ttk.Button(self.left_frame, text="Delete", command=self.delete_profile).grid(row=5, column=3, pady=2, sticky="ew")
+
         self.left_frame.columnconfigure((0, 1, 2, 3), weight=1)
         self.left_frame.rowconfigure(0, weight=1)
 
@@ -165,6 +3754,10 @@ class MultiClickerApp:
         self.cycles_left_label = tk.Label(status_frame, text="Cycles Left: 0", anchor="w", bg="#1e1e2f", fg="#32CD32", font=("Segoe UI", 8, "bold"))
         self.cycles_left_label.grid(row=2, column=0, sticky="w", padx=2, pady=1)
 
+        self.latency_hist = LatencyHistogram(status_frame)
+        self.latency_hist.canvas.grid(row=0, column=1, rowspan=3, sticky="e", padx=2, pady=1)
+        status_frame.columnconfigure(0, weight=1)
+
         # Settings Panel
         settings_frame = ttk.LabelFrame(self.right_frame, text="Settings")
         settings_frame.grid(row=1, column=0, sticky="ew", pady=2)
@@ -205,49 +3798,35 @@ class MultiClickerApp:
         self.double_dropdown.grid(row=2, column=1, padx=2, pady=1)
         ttk.Button(double_frame, text="Refresh", command=self.update_double_positions).grid(row=3, column=0, columnspan=2, pady=2)
 
+        ttk.Label(settings_frame, text="Replay Speed:").grid(row=7, column=0, sticky="w", padx=2, pady=1)
+        ttk.Entry(settings_frame, textvariable=self.replay_speed, width=5).grid(row=7, column=1, padx=2, pady=1)
+
         # Start/Stop
         control_frame = ttk.Frame(self.right_frame)
         control_frame.grid(row=2, column=0, pady=2, sticky="ew")
-        control_frame.columnconfigure(0, weight=1)
-        control_frame.columnconfigure(1, weight=1)
+        control_frame.columnconfigure((0, 1, 2), weight=1)
 
         self.start_btn = tk.Button(control_frame, text="▶ Start", bg="#2ECC71", fg="white",
-                                   font=("Segoe UI", 8, "bold"), command=self.start_clicking, height=1)
+                                   font=("Segoe UI", 8, "bold"), command=lambda: self.command("start"), height=1)
         self.start_btn.grid(row=0, column=0, padx=(0,2), pady=2, sticky="ew")
 
+        self.pause_btn = tk.Button(control_frame, text="❚❚ Pause", bg="#7F8C8D", fg="white",
+                                   font=("Segoe UI", 8, "bold"), command=lambda: self.command("pause"), height=1)
+        self.pause_btn.grid(row=0, column=1, padx=2, pady=2, sticky="ew")
+
         self.stop_btn = tk.Button(control_frame, text="■ Stop", bg="#7F8C8D", fg="white",
-                                  font=("Segoe UI", 8, "bold"), command=self.stop_clicking, height=1)
-        self.stop_btn.grid(row=0, column=1, padx=(2,0), pady=2, sticky="ew")
+                                  font=("Segoe UI", 8, "bold"), command=lambda: self.command("stop"), height=1)
+        self.stop_btn.grid(row=0, column=2, padx=(2,0), pady=2, sticky="ew")
 
         # Shortcuts
-        shortcut_label = ttk.Label(self.right_frame, text="Shortcuts: F6 = Start | F7 = Stop", foreground="lightgray", font=("Segoe UI", 7))
+        shortcut_label = ttk.Label(self.right_frame, text="Shortcuts: F6 = Start | F7 = Stop | F8 = Pause | F9 = Record", foreground="lightgray", font=("Segoe UI", 7))
         shortcut_label.grid(row=3, column=0, pady=2)
 
-        # Key bindings
-        keyboard.add_hotkey("F6", self.start_clicking)
-        keyboard.add_hotkey("F7", self.stop_clicking)
-
         # Configure resizing
         self.main_frame.columnconfigure(0, weight=2)
         self.main_frame.columnconfigure(1, weight=1)
 
-        # After self.tree.grid(...)
-        self.tree_modes = {}
-        def add_mode_dropdown(row_id):
-            bbox = self.tree.bbox(row_id, column="Mode")
-            if bbox:
-                x, y, width, height = bbox
-                mode_var = tk.StringVar(value=self.tree.set(row_id, "Mode"))
-                combo = ttk.Combobox(self.tree, textvariable=mode_var, values=["Single", "Double"], state="readonly", width=7, justify="center")
-                combo.place(x=x, y=y, width=width, height=height)
-                combo.configure(style="Mode.TCombobox")
-                combo.option_add('*TCombobox*Listbox.Justify', 'center')
-                combo.option_add('*TCombobox.Justify', 'center')
-                def on_select(event):
-                    self.tree.set(row_id, "Mode", mode_var.get())
-                    combo.configure(justify="center")
-                combo.bind("<<ComboboxSelected>>", on_select)
-                self.tree_modes[row_id] = combo
+        # Mode editors for the visible rows only (recycled while scrolling)
         style = ttk.Style(self.root)
         style.configure("Mode.TCombobox",
                         bordercolor="#000000",
@@ -257,17 +3836,14 @@ class MultiClickerApp:
                         background="#2b2b40",
                         fieldbackground="#2b2b40",
                         justify="center")
-        def refresh_mode_dropdowns():
-            for combo in self.tree_modes.values():
-                combo.destroy()
-            self.tree_modes.clear()
-            for row_id in self.tree.get_children():
-                add_mode_dropdown(row_id)
-        self.tree.bind("<Map>", lambda e: refresh_mode_dropdowns())
-        self.tree.bind("<Configure>", lambda e: refresh_mode_dropdowns())
-        self.tree.bind("<<TreeviewSelect>>", lambda e: refresh_mode_dropdowns())
-        self.tree.bind("<ButtonRelease-1>", lambda e: refresh_mode_dropdowns())
-
+        self.mode_editors = ModeEditorPool(self.tree, self.positions_changed)
+        self.row_effects = RowEffects(self.tree)
+        def on_tree_scroll(first, last):
+            self.tree_scroll.set(first, last)
+            self.mode_editors.schedule_refresh()
+        self.tree.configure(yscrollcommand=on_tree_scroll)
+        for sequence in ("<Map>", "<Configure>", "<<TreeviewSelect>>", "<ButtonRelease-1>"):
+            self.tree.bind(sequence, self.mode_editors.schedule_refresh)
 
         # Tree interactions
         self.tree.bind("<Double-1>", self.on_tree_double_click)  # bind double-click to edit mode
@@ -289,10 +3865,57 @@ class MultiClickerApp:
         # Move shortcut label down by one row (row=4)
         shortcut_label.grid_configure(row=4)
 
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        self.root.after_idle(self.warm_up)
+        self.root.after(COMMAND_POLL_MS, self.poll_commands)
+
+    def warm_up(self):
+        # Slow subsystems start on a background thread after the first idle
+        # pass, so the window is interactive right away. Tk variables are
+        # read here, on the main thread.
+        backend_name = self.backend_name.get()
+        threading.Thread(target=self._warm_up, args=(backend_name,), name="warm-up", daemon=True).start()
+        # the library fills the tree, so it opens here on the Tk thread
+        with startup_phase(self.profile, "profile library"):
+            self.open_library()
+
+    def _warm_up(self, backend_name):
+        with startup_phase(self.profile, "audio"):
+            self.audio = AudioEngine()
+        with startup_phase(self.profile, "input backend"):
+            with self._backend_lock:
+                if self.backend is None:
+                    try:
+                        self.backend = create_backend(backend_name)
+                        self._backend_choice = backend_name
+                    except Exception as e:
+                        print("Input backend not ready:", e)
+        with startup_phase(self.profile, "hotkeys"):
+            self.register_hotkeys()
+        self.warmed_up.set()
+
+    def command(self, name, *args):
+        # buttons: queue behind anything a hotkey posted, then run it now
+        self.commands.post(name, args, source="button")
+        self.commands.dispatch()
+
+    def poll_commands(self):
+        self.commands.dispatch()
+        self.root.after(COMMAND_POLL_MS, self.poll_commands)
+
+    def register_hotkeys(self):
+        try:
+            import keyboard
+            # called on the keyboard library's thread: only queue them
+            for key, name in (("F6", "start"), ("F7", "stop"), ("F8", "pause"), ("F9", "record")):
+                keyboard.add_hotkey(key, self.commands.post, args=(name, (), None, "hotkey"))
+        except Exception as e:
+            print("Hotkeys disabled:", e)
+
     def open_settings(self):
         settings_win = tk.Toplevel(self.root)
         settings_win.title("Settings & Help")
-        settings_win.geometry("420x340")
+        settings_win.geometry("420x560")
         settings_win.configure(bg="#1e1e2f")
         settings_win.resizable(False, False)
         # Tutorial/How to use
@@ -306,21 +3929,90 @@ class MultiClickerApp:
             "   - Repeats: Number of times to click at each position before moving to the next.\n"
             "   - Cycles: Number of times to repeat the entire sequence of clicking all positions.\n"
             "   - Cycle Delay: Time (seconds) to wait between each cycle.\n"
-            "5. Use F6 to start and F7 to stop the clicker.\n"
+            "5. Use F6 to start and F7 to stop the clicker. F8 pauses and resumes.\n"
             "6. Double click a position in the list to change its mode.\n"
             "7. Use the 'Save' and 'Load' buttons to store or restore positions.\n"
             "8. The position overlays show saved positions.\n"
             "9. The click sound and visual effects indicate each click.\n"
             "10. Use the 'Clear' button to remove all positions and overlays.\n"
+            "11. 'Optimize Order' reorders positions (only the selected ones, if 3 or more\n"
+            "   are selected) to shorten cursor travel; 'Swap Order' flips back and forth.\n"
+            "12. 'Rec' (or F9) records the mouse until pressed again; 'Replay' plays it back\n"
+            "   with its original timing, scaled by Replay Speed, for the set number of cycles.\n"
+            "13. Modes beyond Single/Double make a row a step: Move, Drag (Arg: end x,y),\n"
+            "   Scroll (Arg: clicks, negative = down), Key (Arg: e.g. ctrl+c), Wait (Arg: ms,\n"
+            "   or a 'Wait for region' condition) and Loop (Arg: N or NxPASSES, back to position N).\n"
+            "   Repeats then run the whole list again; the double-click rule is not used.\n"
+            "14. Edits save themselves to the profile picked below the list; type a new name and\n"
+            "   press Enter to start one. 'Tags' labels it, the tag box filters the list.\n"
         )
         tutorial_frame = tk.Frame(settings_win, bg="#1e1e2f")
         tutorial_frame.pack(padx=18, pady=18, anchor="nw", fill="both", expand=True)
         tutorial_label = tk.Label(tutorial_frame, text=tutorial, justify="left", bg="#1e1e2f", fg="white", font=("Segoe UI", 9), wraplength=380)
         tutorial_label.pack(anchor="nw")
+        # Pacing
+        pacing_frame = tk.Frame(settings_win, bg="#1e1e2f")
+        pacing_frame.pack(padx=18, anchor="w")
+        tk.Label(pacing_frame, text="When behind schedule:", bg="#1e1e2f", fg="white", font=("Segoe UI", 9)).grid(row=0, column=0, sticky="w")
+        ttk.Combobox(pacing_frame, textvariable=self.schedule_policy,
+                     values=list(SCHEDULE_POLICIES), state="readonly", width=9).grid(row=0, column=1, padx=4)
+        tk.Label(pacing_frame, text="Input backend:", bg="#1e1e2f", fg="white", font=("Segoe UI", 9)).grid(row=1, column=0, sticky="w")
+        ttk.Combobox(pacing_frame, textvariable=self.backend_name,
+                     values=list(BACKEND_CHOICES), state="readonly", width=9).grid(row=1, column=1, padx=4)
+        tk.Label(pacing_frame, text="Click circles (pool / fps):", bg="#1e1e2f", fg="white", font=("Segoe UI", 9)).grid(row=2, column=0, sticky="w")
+        effects_frame = tk.Frame(pacing_frame, bg="#1e1e2f")
+        effects_frame.grid(row=2, column=1, padx=4, sticky="w")
+        ttk.Spinbox(effects_frame, from_=1, to=64, textvariable=self.effect_pool_size, width=3).pack(side="left")
+        ttk.Spinbox(effects_frame, from_=10, to=120, textvariable=self.effect_fps, width=4).pack(side="left", padx=(2, 0))
+        tk.Label(pacing_frame, text="Click telemetry:", bg="#1e1e2f", fg="white", font=("Segoe UI", 9)).grid(row=3, column=0, sticky="w")
+        telemetry_frame = tk.Frame(pacing_frame, bg="#1e1e2f")
+        telemetry_frame.grid(row=3, column=1, padx=4, sticky="w")
+        tk.Checkbutton(pacing_frame, text="Bind new positions to the window under the cursor (X11)",
+                       variable=self.bind_window, bg="#1e1e2f", fg="white", selectcolor="#2b2b40",
+                       activebackground="#1e1e2f", font=("Segoe UI", 9)).grid(row=4, column=0, columnspan=2, sticky="w")
+        tk.Label(pacing_frame, text="Humanize (delay % / px / radius / seed):", bg="#1e1e2f", fg="white", font=("Segoe UI", 9)).grid(row=5, column=0, sticky="w")
+        humanize_frame = tk.Frame(pacing_frame, bg="#1e1e2f")
+        humanize_frame.grid(row=5, column=1, padx=4, sticky="w")
+        ttk.Spinbox(humanize_frame, from_=0, to=100, increment=5, textvariable=self.delay_jitter, width=3).pack(side="left")
+        ttk.Spinbox(humanize_frame, from_=0, to=50, textvariable=self.offset_sigma, width=3).pack(side="left", padx=(2, 0))
+        ttk.Spinbox(humanize_frame, from_=0, to=200, textvariable=self.offset_radius, width=3).pack(side="left", padx=(2, 0))
+        ttk.Entry(humanize_frame, textvariable=self.seed, width=6).pack(side="left", padx=(2, 0))
+        tk.Checkbutton(pacing_frame, text="Adaptive delay (min / max s):", variable=self.adaptive,
+                       bg="#1e1e2f", fg="white", selectcolor="#2b2b40", activebackground="#1e1e2f",
+                       font=("Segoe UI", 9)).grid(row=6, column=0, sticky="w")
+        adaptive_frame = tk.Frame(pacing_frame, bg="#1e1e2f")
+        adaptive_frame.grid(row=6, column=1, padx=4, sticky="w")
+        ttk.Spinbox(adaptive_frame, from_=0, to=10, increment=0.01, textvariable=self.adapt_min, width=5).pack(side="left")
+        ttk.Spinbox(adaptive_frame, from_=0, to=10, increment=0.1, textvariable=self.adapt_max, width=5).pack(side="left", padx=(2, 0))
+        stats = self.commands.stats()
+        tk.Label(pacing_frame, text=f"Commands: {stats['handled']} run, {stats['debounced']} debounced, latency avg"
+                                    f" {stats['latency_avg_ms']:.1f} ms / max {stats['latency_max_ms']:.1f} ms",
+                 bg="#1e1e2f", fg="lightgray", font=("Segoe UI", 8)).grid(row=7, column=0, columnspan=2, sticky="w")
+        ttk.Button(telemetry_frame, text="CSV...", command=self.export_telemetry_csv).pack(side="left")
+        ttk.Button(telemetry_frame, text="Prometheus...", command=self.choose_prometheus_file).pack(side="left", padx=(2, 0))
         # Exit button
-        exit_btn = tk.Button(settings_win, text="Exit App", font=("Segoe UI", 10, "bold"), bg="#E74C3C", fg="white", relief="flat", command=self.root.destroy)
+        exit_btn = tk.Button(settings_win, text="Exit App", font=("Segoe UI", 10, "bold"), bg="#E74C3C", fg="white", relief="flat", command=self.quit)
         exit_btn.pack(side="bottom", pady=14)
 
+    def export_telemetry_csv(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not file_path:
+            return
+        try:
+            self.telemetry.write_csv(file_path)
+        except OSError as e:
+            messagebox.showerror("Telemetry", f"Could not write CSV: {e}")
+            return
+        self.log_message(f"Telemetry exported ({len(self.telemetry)} clicks)")
+
+    def choose_prometheus_file(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".prom", filetypes=[("Prometheus text", "*.prom")])
+        if not file_path:
+            return
+        self.prometheus_path = file_path
+        self.update_telemetry(force=True)
+        self.log_message("Prometheus export on")
+
     # --- Helper Functions ---
     def log_message(self, msg):
         self.message_text_label.config(text=msg, fg="yellow")
@@ -332,48 +4024,102 @@ class MultiClickerApp:
         self.root.after(2000, lambda: self.log_message("Hover mouse in 1..."))
         self.root.after(3000, self.capture_position)
 
-    def show_water_effect(self, item_id):
-        # Simple quick highlight animation for tree item
-        colors = ["#B2EBF2", "#4DD0E1", "#00BCD4", "#0097A7", "#2b2b40"]
-        def animate(idx=0):
-            if idx < len(colors):
-                self.tree.tag_configure("water", background=colors[idx])
-                self.tree.item(item_id, tags=("centered", "water"))
-                self.root.after(60, lambda: animate(idx+1))
-            else:
-                self.tree.tag_configure("water", background="")
-        animate()
+    def get_backend(self):
+        # (re)create the input backend when the selection changed; waits for
+        # the warm-up thread if it is probing right now
+        name = self.backend_name.get()
+        with self._backend_lock:
+            if self.backend is None or self._backend_choice != name:
+                if self.backend is not None:
+                    self.backend.close()
+                    self.backend = None
+                self.backend = create_backend(name)
+                self._backend_choice = name
+            return self.backend
 
     def capture_position(self):
-        x, y = pyautogui.position()
+        window = 0
+        try:
+            backend = self.get_backend()
+            x, y = backend.position()
+            if self.bind_window.get():
+                window, x, y = backend.window_at(x, y)
+        except Exception as e:
+            self.log_message(f"Input error: {e}")
+            return
         pos_num = len(self.tree.get_children()) + 1
         click_type = self.click_type.get()
-        self.tree.insert("", "end", values=(pos_num, x, y, click_type, "Single"), tags=("centered",))
+        self.tree.insert("", "end", values=(pos_num, x, y, click_type, "Single", window_label(window), "", "", ""),
+                         tags=("centered",))
         self.tree.tag_configure("centered", anchor="center")
-        # Show overlay number
-        self.show_position_number_persistent(x, y, pos_num)
+        # Show overlay number (window-bound positions are window-relative)
+        if not window:
+            self.show_position_number_persistent(x, y, pos_num)
         # Keep double options in sync
         self.update_double_positions()
+        self.positions_changed()
 
     def show_position_number_persistent(self, x, y, num):
-        # Overlay with only a yellow circle and number, no white square
-        overlay = tk.Toplevel(self.root)
-        overlay.overrideredirect(True)
-        overlay.attributes('-topmost', True)
+        # yellow numbered circle on the shared marker surface
+        self.markers.add(x, y, num)
+
+    def optimize_order(self):
+        items = self.tree.get_children()
+        if len(items) < 4:
+            self.log_message("Need at least 4 positions to optimize")
+            return
         try:
-            overlay.attributes('-alpha', 0.85)
-        except Exception:
-            pass
-        size = 28
-        # Canvas with same bg as app, but only draw a filled yellow circle
-        canvas = tk.Canvas(overlay, width=size, height=size, bg="#2b2b40", highlightthickness=0, borderwidth=0)
-        canvas.pack()
-        # Draw only a filled yellow circle with a number
-        canvas.create_oval(2, 2, size-2, size-2, fill='#FFD700', outline='#B8860B', width=2)
-        canvas.create_text(size//2, size//2, text=str(num), font=('Segoe UI', 13, 'bold'), fill='#222')
-        overlay.geometry(f'{size}x{size}+{int(x-size//2)}+{int(y-size//2)}')
-        overlay.update()
-        self.position_overlays.append(overlay)
+            plan, _ = self.compile_plan()
+        except ValueError as e:
+            self.log_message(str(e))
+            return
+        if plan.programmed():
+            self.log_message("Step programs keep their order")
+            return
+        selected = set(self.tree.selection())
+        movable = [i for i, item in enumerate(items) if item in selected] if len(selected) >= 3 else None
+        order, before, after = travel_order(plan, movable)
+        if after >= before:
+            self.log_message("Order is already short")
+            return
+        self.alternate_order = items
+        self.apply_order([items[i] for i in order])
+        saved = before - after
+        self.log_message(f"Travel {before:.0f} -> {after:.0f} px/cycle (-{saved / before:.0%},"
+                         f" ~{saved / CURSOR_SPEED:.2f}s at {CURSOR_SPEED:.0f} px/s)")
+
+    def swap_order(self):
+        if self.alternate_order is None:
+            self.log_message("No other order to swap to")
+            return
+        current = self.tree.get_children()
+        existing = set(current)
+        # rows deleted since stay deleted, rows added since go last
+        order = [item for item in self.alternate_order if item in existing]
+        kept = set(order)
+        order += [item for item in current if item not in kept]
+        self.alternate_order = current
+        self.apply_order(order)
+        self.log_message("Order swapped")
+
+    def apply_order(self, items):
+        # move rows, renumber them and the markers; the double-click target
+        # follows its row
+        target = parse_double_target(self.double_position.get())
+        old = self.tree.get_children()
+        target_item = old[target] if 0 <= target < len(old) else None
+        points = []
+        for index, item in enumerate(items):
+            self.tree.move(item, "", index)
+            self.tree.set(item, "Position", index + 1)
+            values = self.tree.item(item, "values")
+            if not window_code(values[5]):
+                points.append((int(float(values[1])), int(float(values[2])), index + 1))
+        self.markers.set_points(points)
+        self.update_double_positions()
+        if target_item is not None:
+            self.double_position.set(f"Position {items.index(target_item) + 1}")
+        self.positions_changed()
 
     def update_double_positions(self):
         positions = ["All Positions"]
@@ -383,208 +4129,344 @@ class MultiClickerApp:
         if self.double_position.get() not in positions:
             self.double_position.set("All Positions")
 
+    def compile_plan(self):
+        # Snapshot the tree once (main thread only); returns (plan, item ids).
+        # ValueError names the first step row with a bad argument.
+        items = self.tree.get_children()
+        if self._compiled is not None:
+            # the plan the library compiled for a profile just switched to
+            plan, compiled_items, button = self._compiled
+            if compiled_items == items and button == self.click_type.get():
+                return plan, items
+        rows = [self.tree.item(item, "values") for item in items]
+        return ClickPlan.compile(rows, button=self.click_type.get()), items
+
+    def positions_changed(self):
+        self._compiled = None
+        self.schedule_autosave()
+        self.mode_editors.schedule_refresh()
+        # Hand the running engine a fresh plan; it swaps it in between cycles
+        if self.engine is not None and self.engine.running:
+            try:
+                plan, items = self.compile_plan()
+            except ValueError as e:
+                self.log_message(str(e))
+                return
+            if self.engine.can_swap(plan):
+                self.engine.swap_plan(plan, items)
+            else:
+                self.log_message("Step rows apply on the next start")
+
+    def read_settings(self):
+        return RunSettings(
+            delay=float(self.delay.get()),
+            repeats=max(1, int(self.repeats.get())),
+            cycles=max(1, int(self.cycles.get())),
+            cycle_delay=float(self.cycle_delay.get()),
+            double_mode=self.double_mode.get(),
+            double_freq=max(1, int(self.double_freq.get())),
+            double_target=parse_double_target(self.double_position.get()),
+            schedule_policy=self.schedule_policy.get(),
+            delay_jitter=max(0.0, float(self.delay_jitter.get())) / 100,
+            offset_sigma=max(0.0, float(self.offset_sigma.get())),
+            offset_radius=max(0.0, float(self.offset_radius.get())),
+            seed=int(self.seed.get()) if self.seed.get().strip().isdigit() else -1,
+            adaptive=self.adaptive.get(),
+            adapt_min=max(0.0, float(self.adapt_min.get())),
+            adapt_max=max(0.0, float(self.adapt_max.get())),
+        )
+
     def start_clicking(self):
         if self.is_running:
             return
         if not self.tree.get_children():
             messagebox.showwarning("No positions", "Please add at least one position.")
             return
+        try:
+            plan, items = self.compile_plan()
+        except ValueError as e:
+            messagebox.showerror("Steps", str(e))
+            return
+        settings = self.read_settings()
+        self.launch(lambda backend, channel: create_engine(
+            plan, settings, backend, keys=items, channel=channel, audio=self.audio, telemetry=self.telemetry),
+            "Start")
 
+    def start_replay(self):
+        if self.is_running or self.recorder is not None:
+            return
+        if not self.recording:
+            messagebox.showwarning("No recording", "Record or load a mouse path first.")
+            return
+        trajectory = self.recording
+        settings = self.read_settings()
+        speed = float(self.replay_speed.get())
+        self.launch(lambda backend, channel: ReplayEngine(
+            trajectory, settings, backend, speed=speed, channel=channel, audio=self.audio), "Replay")
+
+    def launch(self, build, error_title):
+        # build(backend, channel) -> engine; runs it on a worker thread
+        try:
+            backend = self.get_backend()
+        except Exception as e:
+            messagebox.showerror("Input backend", str(e))
+            return
         self.is_running = True
         self.start_btn.config(bg="#7F8C8D")
         self.stop_btn.config(bg="#E74C3C")
 
-        self.thread = threading.Thread(target=self.run_clicker, daemon=True)
+        # fresh channel per run so a stopping engine can't talk to the next one
+        self.channel = ProgressChannel()
+        self.channel.attached = True
+        self._ui_seq = -1
+        self.telemetry.reset()
+        try:
+            self.engine = build(backend, self.channel)
+        except Exception as e:
+            self.stop_clicking()
+            messagebox.showerror(error_title, str(e))
+            return
+        self.thread = threading.Thread(target=self.engine.run, daemon=True)
         self.thread.start()
         self.log_message("Running")
+        if self._pump_id is None:
+            self._pump_id = self.root.after(UI_FRAME_MS, self.pump_ui)
 
     def stop_clicking(self):
+        if not self.is_running and self.engine is None:
+            return
         self.is_running = False
+        if self.engine is not None:
+            self.engine.stop()
         self.start_btn.config(bg="#2ECC71")
         self.stop_btn.config(bg="#7F8C8D")
+        self.pause_btn.config(text="❚❚ Pause", bg="#7F8C8D")
         self.log_message("Stopped")
 
-    def play_click_sound(self, double=False):
-        if not SOUND_AVAILABLE:
+    def pause_clicking(self):
+        # toggles; the worker keeps its place and remaining delay
+        engine = self.engine
+        if engine is None or not engine.running:
             return
-        try:
-            if double and DOUBLE_CLICK_SOUND:
-                DOUBLE_CLICK_SOUND.play()
-            elif CLICK_SOUND:
-                CLICK_SOUND.play()
-        except Exception as e:
-            print("Sound play error:", e)
+        if engine.paused:
+            engine.resume()
+            self.pause_btn.config(text="❚❚ Pause", bg="#7F8C8D")
+            self.log_message("Running")
+        else:
+            engine.pause()
+            self.pause_btn.config(text="▶ Resume", bg="#F39C12")
+            self.log_message("Paused")
 
-    def run_clicker(self):
-        cycles = max(1, int(self.cycles.get()))
-        delay = float(self.delay.get())
-        repeats = max(1, int(self.repeats.get()))
-        cycle_delay = float(self.cycle_delay.get())
-
-        total_clicks = len(self.tree.get_children()) * repeats * cycles
-        clicks_done = 0
-        start_time = time.time()
+    def toggle_recording(self, from_button=False):
+        if self.recorder is None:
+            if self.is_running:
+                return
+            try:
+                self.recorder = PointerRecorder(self.get_backend())
+            except Exception as e:
+                self.log_message(f"Input error: {e}")
+                return
+            self.recorder.start()
+            self.record_btn.config(text="■ Rec")
+            self.log_message("Recording... (F9 or Rec to stop)")
+            return
+        recorder, self.recorder = self.recorder, None
+        self.record_btn.config(text="● Rec")
+        try:
+            raw = recorder.stop()
+        except RuntimeError as e:
+            self.log_message(str(e))
+            return
+        if from_button:
+            # the click on Rec itself is not part of the path
+            raw = raw.head(raw.last_press())
+        self.recording = raw.simplify()
+        self.log_message(f"Recorded {self.recording.duration():.1f}s, {recorder.sampled} samples -> "
+                         f"{len(self.recording)} ({self.recording.nbytes()} B)")
 
+    def save_recording(self):
+        if not self.recording:
+            messagebox.showwarning("No recording", "Record a mouse path first.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".mcr",
+                                                 filetypes=[("MultiClicker recordings", "*.mcr")])
+        if not file_path:
+            return
+        try:
+            self.recording.save(file_path)
+        except OSError as e:
+            messagebox.showerror("Save", f"Could not write recording: {e}")
+            return
+        self.log_message("Recording saved")
 
-        for cycle in range(1, cycles + 1):
-            if not self.is_running:
-                break
+    def load_recording(self):
+        file_path = filedialog.askopenfilename(filetypes=[("MultiClicker recordings", "*.mcr"), ("All files", "*.*")])
+        if not file_path:
+            return
+        try:
+            self.recording = Trajectory.load(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Load", f"Could not read recording: {e}")
+            return
+        self.log_message(f"Recording loaded ({self.recording.duration():.1f}s, {len(self.recording)} samples)")
 
-            # Hide overlays before clicking
-            for overlay in self.position_overlays:
-                try:
-                    overlay.withdraw()
-                except Exception:
-                    pass
+    def pump_ui(self):
+        # Main-thread tick while a run is active. Only the newest engine state
+        # is applied, so the UI costs the same per frame however fast we click.
+        self._pump_id = None
+        channel = self.channel
+        recent_clicks = deque(maxlen=MAX_CIRCLES_PER_FRAME)
+        for kind, args, done in channel.drain():
+            if kind == "click":
+                recent_clicks.append(args)
+            elif kind == "markers":
+                self.set_markers_visible(args[0])
+            elif kind == "done":
+                self.run_finished(*args)
+            elif kind == "log":
+                self.log_message(args[0])
+            if done is not None:
+                done.set()
+        if channel.seq != self._ui_seq:
+            self._ui_seq = channel.seq
+            eta = self.engine.eta(channel.state.status) if self.engine is not None else 0.0
+            self.apply_progress(channel.state, touched=bool(recent_clicks), eta=eta)
+        for x, y, pos_mode in recent_clicks:
+            self.show_click_circle(x, y)
+            if pos_mode == MODE_DOUBLE:
+                self.root.after(130, self.show_click_circle, x, y)
+        self.update_telemetry()
+        if self.engine is not None:
+            self._pump_id = self.root.after(UI_FRAME_MS, self.pump_ui)
 
-            # Double-click rule (applies before normal sequence)
-            freq = max(1, int(self.double_freq.get()))
-            if freq > 0 and cycle % freq == 0:
-                mode = self.double_mode.get()
-                target = self.double_position.get()
-
-                if mode == "Random":
-                    for item in self.tree.get_children():
-                        _, x, y, _, pos_mode = self.tree.item(item, "values")
-                        x, y = int(x), int(y)
-                        btn = self.click_type.get().lower()
-                        pyautogui.moveTo(x, y)
-                        if pos_mode == "Double":
-                            time.sleep(0.05)
-                            pyautogui.doubleClick(button=btn, interval=0.1)
-                            clicks_done += 2
-                        else:
-                            time.sleep(0.05)
-                            pyautogui.click(button=btn)
-                            clicks_done += 1
-                        self.clicks_left_label.config(text=f"Clicks Left: {max(total_clicks - clicks_done, 0)}")
-                elif mode == "Customize":
-                    if target == "All Positions":
-                        for item in self.tree.get_children():
-                            _, x, y, _, pos_mode = self.tree.item(item, "values")
-                            x, y = int(x), int(y)
-                            btn = self.click_type.get().lower()
-                            pyautogui.moveTo(x, y)
-                            if pos_mode == "Double":
-                                time.sleep(0.05)
-                                pyautogui.doubleClick(button=btn, interval=0.1)
-                                clicks_done += 2
-                            else:
-                                time.sleep(0.05)
-                                pyautogui.click(button=btn)
-                                clicks_done += 1
-                            self.clicks_left_label.config(text=f"Clicks Left: {max(total_clicks - clicks_done, 0)}")
-                    else:
-                        try:
-                            idx = int(target.split()[1]) - 1
-                            items = self.tree.get_children()
-                            if 0 <= idx < len(items):
-                                item = items[idx]
-                                _, x, y, _, pos_mode = self.tree.item(item, "values")
-                                x, y = int(x), int(y)
-                                btn = self.click_type.get().lower()
-                                pyautogui.moveTo(x, y)
-                                if pos_mode == "Double":
-                                    time.sleep(0.05)
-                                    pyautogui.doubleClick(button=btn, interval=0.1)
-                                    clicks_done += 2
-                                else:
-                                    time.sleep(0.05)
-                                    pyautogui.click(button=btn)
-                                    clicks_done += 1
-                                self.clicks_left_label.config(text=f"Clicks Left: {max(total_clicks - clicks_done, 0)}")
-                        except Exception:
-                            pass
-
-            # Normal clicking sequence
-            for item in self.tree.get_children():
-                if not self.is_running:
-                    break
-                _, x, y, _, pos_mode = self.tree.item(item, "values")
-                x, y = int(x), int(y)
-                for _ in range(repeats):
-                    if not self.is_running:
-                        break
-                    btn = self.click_type.get().lower()
-                    pyautogui.moveTo(x, y)
-                    if pos_mode == "Double":
-                        time.sleep(0.05)
-                        pyautogui.doubleClick(button=btn, interval=0.1)
-                        clicks_done += 2
-                    else:
-                        time.sleep(0.05)
-                        pyautogui.click(button=btn)
-                        clicks_done += 1
-                    self.clicks_left_label.config(text=f"Clicks Left: {max(total_clicks - clicks_done, 0)}")
-                    elapsed = time.time() - start_time
-                    self.timer_label.config(text=f"Timer: {int(elapsed)}s")
-                    self.root.update_idletasks()
-                    # Visual touch reaction
-                    self.tree.selection_set(item)
-                    self.tree.see(item)
-                    self.tree.item(item, tags=("centered", "touched"))
-                    self.tree.tag_configure("touched", background="#FFD700")
-                    self.root.after(300, lambda i=item: self.tree.tag_configure("touched", background=""))
-                    # Water effect
-                    self.show_water_effect(item)
-                    # Show click circle at screen position
-                    try:
-                        _, x, y, _, pos_mode = self.tree.item(item, "values")
-                        x, y = int(x), int(y)
-                        if pos_mode == 'Double':
-                            self.show_click_circle(x, y)
-                            threading.Timer(0.13, lambda: self.show_click_circle(x, y)).start()
-                        else:
-                            self.show_click_circle(x, y)
-                    except Exception as e:
-                        print(f"Circle effect error: {e}")
-                    # Play custom click sound using pygame
-                    try:
-                        if pos_mode == 'Double':
-                            pygame.mixer.music.load('click2.wav')
-                            pygame.mixer.music.play()
-                            threading.Timer(0.2, lambda: (pygame.mixer.music.load('click2.wav'), pygame.mixer.music.play())).start()
-                        else:
-                            pygame.mixer.music.load('click2.wav')
-                            pygame.mixer.music.play()
-                    except Exception as e:
-                        print(f"Sound error: {e}")
-                    time.sleep(delay)
+    def update_telemetry(self, force=False):
+        telemetry = self.telemetry
+        if telemetry.count != self._hist_count:
+            self._hist_count = telemetry.count
+            self.latency_hist.update(telemetry.bins, telemetry.count)
+        now = time.perf_counter()
+        if self.prometheus_path and (force or now - self._prometheus_written >= 1.0):
+            self._prometheus_written = now
+            try:
+                telemetry.write_prometheus(self.prometheus_path)
+            except OSError as e:
+                self.prometheus_path = None
+                self.log_message(f"Prometheus export off: {e}")
 
-            # Restore overlays after clicking
-            for overlay in self.position_overlays:
-                try:
-                    overlay.deiconify()
-                except Exception:
-                    pass
+    def apply_progress(self, state, touched=False, eta=0.0):
+        if state.status == "paused":
+            self.timer_label.config(text=f"Timer: {int(state.elapsed)}s | paused")
+        elif state.status == "cycle_delay":
+            self.timer_label.config(text=f"Cycle Delay: {math.ceil(state.delay_left)}s left")
+        else:
+            self.timer_label.config(text=f"Timer: {int(state.elapsed)}s | {state.rate:.0f}/s")
+        self.clicks_left_label.config(text=f"Clicks Left: {max(state.total_clicks - state.clicks_done, 0)}"
+                                           f" | ETA {format_duration(eta)}")
+        self.cycles_left_label.config(text=f"Cycles Left: {state.cycles - state.cycle}")
+        if touched and state.key is not None:
+            self.touch_row(state.key)
 
+    def touch_row(self, item):
+        # Visual touch reaction
+        try:
+            self.tree.selection_set(item)
+            self.tree.see(item)
+        except tk.TclError:
+            return  # row was deleted while running
+        self.row_effects.hit(item)
 
-            # Update cycles left & cycle delay countdown
-            self.cycles_left_label.config(text=f"Cycles Left: {cycles - cycle}")
-            self.root.update_idletasks()
-            for sec in range(int(cycle_delay), 0, -1):
-                if not self.is_running:
-                    break
-                self.timer_label.config(text=f"Cycle Delay: {sec}s left")
-                self.root.update_idletasks()
-                time.sleep(1)
+    def set_markers_visible(self, visible):
+        self.markers.set_visible(visible)
 
+    def run_finished(self, status, summary):
+        self.engine = None
+        self.set_markers_visible(True)
+        self.pause_btn.config(text="❚❚ Pause", bg="#7F8C8D")
+        self.update_telemetry(force=True)
+        # finished or failed on its own; a stop already reset the buttons
         self.is_running = False
         self.start_btn.config(bg="#2ECC71")
         self.stop_btn.config(bg="#7F8C8D")
-        self.log_message("Finished")
+        self.log_message(f"{status.capitalize()} ({summary})")
 
     def edit_position_mode(self, item_id):
         top = tk.Toplevel(self.root)
         top.title("Select Click Mode")
-        top.geometry("220x120")
+        top.geometry("260x370")
         tk.Label(top, text="Select Click Mode:", font=("Segoe UI", 11)).pack(pady=10)
         mode_var = tk.StringVar(value=self.tree.set(item_id, "Mode"))
-        mode_menu = ttk.Combobox(top, textvariable=mode_var, values=["Single", "Double"], state="readonly")
+        mode_menu = ttk.Combobox(top, textvariable=mode_var, values=list(MODE_NAMES), state="readonly")
         mode_menu.pack(pady=5)
+
+        # Step rows take one argument, e.g. the keys of a Key step
+        step_var = tk.StringVar(value=self.tree.set(item_id, "Step"))
+        step_hint = tk.Label(top, fg="gray")
+        step_hint.pack()
+        ttk.Entry(top, textvariable=step_var, width=22).pack(pady=2)
+
+        def show_hint(*_):
+            step_hint.config(text=STEP_HINTS.get(mode_code(mode_var.get()), "no argument"))
+        mode_menu.bind("<<ComboboxSelected>>", show_hint)
+        show_hint()
+
+        # Screen condition: captured from what is under the mouse after a
+        # short hover, like adding a position
+        spec = self.tree.set(item_id, "Condition")
+        condition = {"spec": json.loads(spec) if spec else None}
+        kinds = {"None": None, "Pixel matches": COND_PIXEL, "Wait for region": COND_WAIT}
+        current = condition["spec"]["kind"] if condition["spec"] else None
+        kind_var = tk.StringVar(value=next(k for k, v in kinds.items() if v == current))
+        tolerance_var = tk.IntVar(value=condition["spec"]["tol"] if condition["spec"] else 16)
+        timeout_var = tk.DoubleVar(value=condition["spec"]["timeout"] if condition["spec"] else 5.0)
+        tk.Label(top, text="Condition:", font=("Segoe UI", 10)).pack(pady=(10, 0))
+        ttk.Combobox(top, textvariable=kind_var, values=list(kinds), state="readonly").pack(pady=2)
+        options = tk.Frame(top)
+        options.pack(pady=2)
+        tk.Label(options, text="Tolerance").grid(row=0, column=0, sticky="w")
+        ttk.Spinbox(options, from_=0, to=255, textvariable=tolerance_var, width=5).grid(row=0, column=1, padx=4)
+        tk.Label(options, text="Timeout (s)").grid(row=1, column=0, sticky="w")
+        ttk.Spinbox(options, from_=0.1, to=600, increment=0.5, textvariable=timeout_var, width=5).grid(row=1, column=1, padx=4)
+        status = tk.Label(top, text=condition_label(condition["spec"]) or "no condition", fg="gray", wraplength=240)
+        status.pack()
+
+        def capture_condition():
+            kind = kinds[kind_var.get()]
+            if kind is None:
+                return
+            status.config(text="Hover over what to watch, capturing in 3 s...")
+            def grab():
+                try:
+                    x, y = self.get_backend().position()
+                    captured = ScreenCondition.capture(ScreenCapture(), kind, x, y,
+                                                       tolerance_var.get(), timeout_var.get())
+                except Exception as e:
+                    status.config(text=f"Capture failed: {e}")
+                    return
+                condition["spec"] = captured.to_spec()
+                status.config(text=f"Captured {captured.width}x{captured.height} at {captured.left},{captured.top}")
+            top.after(3000, grab)
+        ttk.Button(top, text="Capture", command=capture_condition).pack(pady=2)
+
         def save_mode():
+            mode = mode_code(mode_var.get())
+            step = step_var.get().strip() if mode >= MODE_MOVE else ""
+            if mode >= MODE_MOVE:
+                try:
+                    parse_step(mode, step, self.tree.index(item_id))
+                except ValueError as e:
+                    status.config(text=str(e))
+                    return
             self.tree.set(item_id, "Mode", mode_var.get())
+            self.tree.set(item_id, "Step", step)
+            spec = condition["spec"]
+            if kinds[kind_var.get()] is None or spec is None:
+                spec = None
+            else:
+                spec.update(kind=kinds[kind_var.get()], tol=tolerance_var.get(), timeout=timeout_var.get())
+            self.tree.set(item_id, "If", condition_label(spec))
+            self.tree.set(item_id, "Condition", json.dumps(spec) if spec else "")
             top.destroy()
+            self.positions_changed()
         ttk.Button(top, text="Save", command=save_mode).pack(pady=5)
 
     def on_tree_double_click(self, event):
@@ -592,41 +4474,1196 @@ class MultiClickerApp:
         if item:
             self.edit_position_mode(item)
 
-    def show_click_circle(self, x, y, duration=350):
-        # run animation on a separate thread so it doesn't block the clicker thread
-        def animate_circle():
-            overlay = tk.Toplevel(self.root)
-            overlay.overrideredirect(True)
-            overlay.attributes('-topmost', True)
+    def get_overlay_pool(self):
+        # built on first use; rebuilt when the pool settings changed and it is idle
+        size, fps = max(1, self.effect_pool_size.get()), max(1, self.effect_fps.get())
+        pool = self.overlay_pool
+        if pool is not None and (pool.pool_size != size or pool.fps != fps) and pool.idle():
+            pool.destroy()
+            pool = None
+        if pool is None:
+            pool = self.overlay_pool = OverlayPool(self.root, pool_size=size, fps=fps)
+        return pool
+
+    def show_click_circle(self, x, y):
+        try:
+            self.get_overlay_pool().spawn(x, y)
+        except (tk.TclError, ValueError) as e:
+            print(f"Circle effect error: {e}")
+
+
+# --- Headless ---
+# Runs saved profiles without building any Tk UI: a one-shot runner and a
+# daemon controlled with line-delimited JSON over a Unix socket.
+def load_plan(path, button=None):
+    # button None keeps each row's own click type
+    rows = []
+    for batch in iter_profile(path):
+        for x, y, click_type, mode, window, condition, step in batch:
+            rows.append((len(rows) + 1, x, y, click_type, mode, window, condition_label(condition), condition, step))
+    return ClickPlan.compile(rows, button=button)
+
+
+def add_run_arguments(parser):
+    # run settings, defaults match the window's
+    group = parser.add_argument_group("run settings (--run / --daemon)")
+    group.add_argument("--delay", type=float, default=0.5, help="seconds between clicks")
+    group.add_argument("--repeats", type=int, default=1)
+    group.add_argument("--cycles", type=int, default=1)
+    group.add_argument("--cycle-delay", type=float, default=1.0)
+    group.add_argument("--click-type", choices=("Left", "Right", "Middle"),
+                       help="override every position's click type")
+    group.add_argument("--double-mode", choices=("Random", "Customize"), default="Random")
+    group.add_argument("--double-freq", type=int, default=5)
+    group.add_argument("--double-target", type=int, default=0, help="position number, 0 = all positions")
+    group.add_argument("--policy", choices=SCHEDULE_POLICIES, default=POLICY_SKIP)
+    group.add_argument("--jitter", type=float, default=0.0,
+                       help="delay jitter, sigma as a fraction of --delay (0.15 = 15%%)")
+    group.add_argument("--offset", type=float, default=0.0, help="position jitter, sigma in pixels")
+    group.add_argument("--offset-radius", type=float, default=0.0,
+                       help="largest position offset in pixels (default 3 sigma)")
+    group.add_argument("--seed", type=int, default=-1, help="jitter seed for reproducible runs")
+    group.add_argument("--adaptive", action="store_true",
+                       help="learn the delay from how fast the screen reacts at each position")
+    group.add_argument("--adapt-min", type=float, default=0.01, help="shortest adaptive delay, seconds")
+    group.add_argument("--adapt-max", type=float, default=1.0, help="longest adaptive delay, seconds")
+    group.add_argument("--backend", choices=BACKEND_CHOICES + ("null",), default="auto")
+    group.add_argument("--window-backend", choices=tuple(WINDOW_BACKENDS), default="xwindow",
+                       help="how window-bound positions are clicked")
+    group.add_argument("--sound", action="store_true", help="play the click sound")
+    group.add_argument("--speed", type=float, default=1.0, help="replay speed, 2 = twice as fast")
+    group.add_argument("--optimize-order", action="store_true",
+                       help="reorder positions to shorten cursor travel (--run only)")
+
+
+def settings_from_args(args):
+    return RunSettings(
+        delay=max(0.0, args.delay),
+        repeats=max(1, args.repeats),
+        cycles=max(1, args.cycles),
+        cycle_delay=max(0.0, args.cycle_delay),
+        double_mode=args.double_mode,
+        double_freq=max(1, args.double_freq),
+        double_target=args.double_target - 1,
+        schedule_policy=args.policy,
+        delay_jitter=max(0.0, args.jitter),
+        offset_sigma=max(0.0, args.offset),
+        offset_radius=max(0.0, args.offset_radius),
+        seed=args.seed,
+        adaptive=args.adaptive,
+        adapt_min=max(0.0, args.adapt_min),
+        adapt_max=max(0.0, args.adapt_max),
+    )
+
+
+def override_settings(settings, overrides):
+    # RunSettings with `overrides` (e.g. from a socket client) coerced to
+    # the current field types, "0.2" -> 0.2; ValueError names a bad field
+    if not isinstance(overrides, dict):
+        raise ValueError("settings must be an object")
+    values = {}
+    for key, value in overrides.items():
+        if key not in RunSettings._fields:
+            raise ValueError(f"unknown setting {key!r}")
+        current = getattr(settings, key)
+        if isinstance(current, bool):
+            # bool("false") is True, so only take what is clearly one or the other
+            if isinstance(value, str):
+                value = value.strip().lower()
+            if value in (True, "true", "1", 1):
+                value = True
+            elif value in (False, "false", "0", 0):
+                value = False
+            else:
+                raise ValueError(f"setting {key!r} must be true or false, not {value!r}")
+        else:
             try:
-                overlay.attributes('-alpha', 0.7)
-            except Exception:
+                value = type(current)(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"setting {key!r} must be {type(current).__name__}, not {value!r}") from None
+        values[key] = value
+    return settings._replace(**values)
+
+
+def progress_record(state, eta, telemetry=None):
+    # one --json-progress line; what the supervisor reads from its workers
+    record = state._asdict()
+    record["eta"] = eta
+    if telemetry is not None:
+        record["telemetry"] = telemetry.snapshot()
+    return record
+
+
+def format_progress(state, eta):
+    left = max(state.total_clicks - state.clicks_done, 0)
+    return (f"[{state.status}] {state.clicks_done}/{state.total_clicks} clicks, {left} left,"
+            f" cycle {state.cycle}/{state.cycles}, {state.rate:.1f}/s, ETA {format_duration(eta)}")
+
+
+def run_headless(args):
+    # --run PROFILE or --replay RECORDING
+    source = args.replay or args.run
+    try:
+        if args.replay:
+            plan = Trajectory.load(args.replay)
+        else:
+            plan = load_plan(args.run, args.click_type)
+        backend = create_backend(args.backend)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Cannot run {source}: {e}", file=sys.stderr)
+        return 2
+    if not len(plan):
+        print(f"{source} has no {'samples' if args.replay else 'positions'}", file=sys.stderr)
+        return 2
+    telemetry = ClickTelemetry()
+    audio = AudioEngine() if args.sound else None
+    settings = settings_from_args(args)
+    if args.optimize_order and not args.replay and plan.programmed():
+        print("Step programs keep their order, --optimize-order ignored")
+    elif args.optimize_order and not args.replay:
+        order, before, after = travel_order(plan)
+        plan = plan.subset(order)
+        if 0 <= settings.double_target < len(order):
+            settings = settings._replace(double_target=order.index(settings.double_target))
+        print(f"Travel {before:.0f} -> {after:.0f} px per cycle")
+    try:
+        if args.replay:
+            engine = ReplayEngine(plan, settings, backend, speed=args.speed, audio=audio)
+        else:
+            engine = create_engine(plan, settings, backend, audio=audio, telemetry=telemetry,
+                                   window_backend=args.window_backend)
+    except Exception as e:
+        print(f"Cannot open window targets: {e}", file=sys.stderr)
+        backend.close()
+        return 2
+    # waited on instead of the thread: a join cut short by Ctrl+C can
+    # report the thread dead while it is still winding down
+    done = threading.Event()
+
+    def work():
+        try:
+            engine.run()
+        finally:
+            done.set()
+    threading.Thread(target=work, daemon=True).start()
+    # SIGTERM stops like Ctrl+C (how the supervisor stops its workers)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while not done.wait(1.0):
+            state = engine.channel.state
+            if state is None or args.quiet:
                 pass
-            size = 48
-            overlay.geometry(f'{size}x{size}+{int(x-size//2)}+{int(y-size//2)}')
-            canvas = tk.Canvas(overlay, width=size, height=size, bg="#1e1e2f", highlightthickness=0)
-            canvas.pack()
-            circle = canvas.create_oval(6, 6, size-6, size-6, outline='#00BCD4', width=4)
-            steps = 10
-            step_sleep = max(0.01, (duration / 1000.0) / steps)
-            for i in range(steps):
-                canvas.coords(circle, 6 + i*2, 6 + i*2, size-6 - i*2, size-6 - i*2)
-                try:
-                    overlay.attributes('-alpha', 0.7 - i*(0.7/steps))
-                except Exception:
-                    pass
-                canvas.update()
-                overlay.update()
-                time.sleep(step_sleep)
+            elif args.json_progress:
+                print(json.dumps(progress_record(state, engine.eta(state.status), telemetry)), flush=True)
+            else:
+                print(format_progress(state, engine.eta(state.status)), flush=True)
+            if args.prometheus:
+                telemetry.write_prometheus(args.prometheus)
+    except KeyboardInterrupt:
+        engine.stop()
+        done.wait()
+    if args.prometheus:
+        telemetry.write_prometheus(args.prometheus)
+    if audio is not None:
+        audio.close()
+    backend.close()
+    state = engine.channel.state
+    status = state.status if state else "stopped"
+    adaptive = getattr(engine, "adaptive", None)
+    if args.json_progress and state is not None:
+        record = progress_record(state._replace(status=status), 0.0, telemetry)
+        record["summary"] = engine.summary()
+        if adaptive is not None:
+            record["latency_ms"] = adaptive.latencies_ms()
+        print(json.dumps(record), flush=True)
+    else:
+        print(f"{status.capitalize()} ({engine.summary()})")
+        if adaptive is not None:
+            latencies = adaptive.latencies_ms()
+            for pos, (x, y, _, _) in enumerate(plan):
+                latency = latencies[pos]
+                learned = f"{latency:.1f} ms" if latency is not None else "no response"
+                print(f"  #{pos + 1} ({x}, {y}): {learned}, {adaptive.hits[pos]} registered,"
+                      f" {adaptive.misses[pos]} missed")
+    return 0 if status == "finished" else 1
+
+
+def record_headless(args):
+    # records until Ctrl+C, then simplifies and saves
+    try:
+        backend = create_backend(args.backend)
+    except RuntimeError as e:
+        print(f"Cannot record: {e}", file=sys.stderr)
+        return 2
+    recorder = PointerRecorder(backend, rate=args.record_rate)
+    recorder.start()
+    print(f"Recording at {args.record_rate} Hz to {args.record}, Ctrl+C to stop", flush=True)
+    try:
+        # sleep rather than join: see run_headless
+        while recorder.thread.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    try:
+        raw = recorder.stop()
+        trajectory = raw.simplify(args.epsilon)
+        trajectory.save(args.record)
+    except (OSError, RuntimeError) as e:
+        print(f"Cannot record: {e}", file=sys.stderr)
+        return 1
+    finally:
+        backend.close()
+    print(f"{trajectory.duration():.1f}s, {recorder.sampled} samples, {len(raw)} changes, "
+          f"{len(trajectory)} kept, {os.path.getsize(args.record)} bytes on disk")
+    return 0
+
+
+def stale_socket(path):
+    # None if `path` is a socket nobody listens on (a daemon that died),
+    # otherwise why it must be left alone
+    try:
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            return f"{path} exists and is not a socket"
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except OSError as e:
+        return str(e)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        return None
+    except OSError as e:
+        return f"{path}: {e}"
+    finally:
+        probe.close()
+    return f"a daemon is already listening on {path}"
+
+
+class ClickDaemon:
+    # One engine at a time, driven by commands from any number of clients.
+    # Every command is a JSON object with a "cmd" key and gets one JSON
+    # object back; "load" while running swaps the plan at the next cycle.
+    # Connections only queue commands on the bus, one thread runs them.
+    COMMANDS = ("load", "start", "stop", "pause", "resume", "status", "shutdown")
+
+    def __init__(self, args):
+        self.settings = settings_from_args(args)
+        self.click_type = args.click_type
+        self.backend_name = args.backend
+        self.window_backend = args.window_backend
+        self.sound = args.sound
+        self.backend = None
+        self.audio = None
+        self.telemetry = ClickTelemetry()
+        self.plan = None
+        self.profile = None
+        self.engine = None
+        self.thread = None
+        self.server = None
+        self.commands = CommandBus()
+        for cmd in self.COMMANDS:
+            self.commands.register(cmd, getattr(self, "cmd_" + cmd))
+        if args.load:
+            self.cmd_load(args.load)
+
+    def handle(self, request):
+        cmd = request.get("cmd")
+        if cmd not in self.COMMANDS:
+            return {"ok": False, "error": f"unknown command {cmd!r}"}
+        args = {k: v for k, v in request.items() if k != "cmd"}
+        try:
+            reply = self.commands.call(cmd, kwargs=args, source="socket")
+        except Exception as e:
+            # whatever a command raises goes back to the client, the
+            # connection stays up
+            return {"ok": False, "error": str(e) or type(e).__name__}
+        reply["ok"] = True
+        return reply
+
+    def running(self):
+        return self.engine is not None and self.engine.running
+
+    def cmd_load(self, profile):
+        plan = load_plan(profile, self.click_type)
+        if not len(plan):
+            raise ValueError(f"{profile} has no positions")
+        self.plan, self.profile = plan, profile
+        if self.running() and self.engine.can_swap(plan):
+            self.engine.swap_plan(plan)
+        return {"profile": profile, "positions": len(plan)}
+
+    def cmd_start(self, profile=None, settings=None):
+        if self.running():
+            return self.cmd_status()  # idempotent, like the window's Start
+        if profile is not None:
+            self.cmd_load(profile)
+        if self.plan is None:
+            raise RuntimeError("no profile loaded")
+        if settings:
+            self.settings = override_settings(self.settings, settings)
+        if self.backend is None:
+            self.backend = create_backend(self.backend_name)
+        if self.sound and self.audio is None:
+            self.audio = AudioEngine()
+        self.telemetry.reset()
+        self.engine = create_engine(self.plan, self.settings, self.backend, audio=self.audio,
+                                    telemetry=self.telemetry, window_backend=self.window_backend)
+        self.thread = threading.Thread(target=self.engine.run, daemon=True)
+        self.thread.start()
+        return self.cmd_status()
+
+    def cmd_stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+            self.thread.join()
+        return self.cmd_status()
+
+    def cmd_pause(self):
+        if self.running():
+            self.engine.pause()
+        return self.cmd_status()
+
+    def cmd_resume(self):
+        if self.running():
+            self.engine.resume()
+        return self.cmd_status()
+
+    def cmd_status(self):
+        reply = {"profile": self.profile, "positions": len(self.plan) if self.plan is not None else 0}
+        engine = self.engine
+        state = engine.channel.state if engine is not None else None
+        if state is None:
+            reply["status"] = "idle"
+            return reply
+        status, eta = state.status, 0.0
+        if engine.running:
+            # the published state lags a pause/resume until the worker moves
+            status = "paused" if engine.paused else ("running" if status == "paused" else status)
+            eta = engine.eta(state.status)
+        reply.update(state._asdict())
+        reply.update(status=status, eta=eta, summary=engine.summary(), commands=self.commands.stats())
+        if getattr(engine, "adaptive", None) is not None:
+            reply.update(delay=engine.adaptive.delay, latency_ms=engine.adaptive.latencies_ms())
+        return reply
+
+    def cmd_shutdown(self):
+        if self.engine is not None:
+            self.engine.stop()
+        # shutdown() waits for serve_forever, which is what called us
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return {"status": "shutdown"}
+
+    def serve(self, path):
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            print("Unix sockets are not available on this platform", file=sys.stderr)
+            return 2
+        if os.path.lexists(path):
+            error = stale_socket(path)
+            if error:
+                print(f"Not starting: {error}", file=sys.stderr)
+                return 2
+            os.unlink(path)
+        with socketserver.ThreadingUnixStreamServer(path, DaemonRequestHandler) as server:
+            server.daemon_threads = True
+            server.app = self
+            self.server = server
+            consumer = threading.Thread(target=self.commands.serve, name="commands", daemon=True)
+            consumer.start()
+            print(f"Listening on {path}", flush=True)
             try:
-                overlay.destroy()
-            except Exception:
+                server.serve_forever()
+            except KeyboardInterrupt:
                 pass
-        threading.Thread(target=animate_circle, daemon=True).start()
+            finally:
+                self.commands.close()
+                if self.engine is not None:
+                    self.engine.stop()
+                os.unlink(path)
+        return 0
 
 
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = MultiClickerApp(root)
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    # one JSON request per line, one JSON reply per line
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                reply = {"ok": False, "error": f"bad request: {e}"}
+            else:
+                reply = self.server.app.handle(request)
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+def send_command(path, words):
+    # client side of the daemon: "status", "load x.mcp", "start [x.mcp]"...
+    request = {"cmd": words[0] if words else "status"}
+    if len(words) > 1:
+        request["profile"] = words[1]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        reply = json.loads(sock.makefile("r", encoding="utf-8").readline())
+    print(json.dumps(reply, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+# --- Supervisor ---
+# Scales one profile across cores: a worker process per X display (existing
+# ones, or Xvfb servers started here), each a headless --run that reports
+# JSON progress and telemetry counters over its stdout pipe.
+XVFB_SCREEN = "1920x1080x24"
+XVFB_TIMEOUT = 5.0
+
+
+def start_xvfb(display):
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':').split('.')[0]}"
+    if os.path.exists(socket_path):
+        raise RuntimeError(f"display {display} is already in use")
+    # own session, so a Ctrl+C in the terminal doesn't kill it under the workers
+    server = subprocess.Popen(["Xvfb", display, "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.perf_counter() + XVFB_TIMEOUT
+    while not os.path.exists(socket_path):
+        if server.poll() is not None or time.perf_counter() > deadline:
+            server.kill()
+            raise RuntimeError(f"Xvfb did not start on {display}")
+        time.sleep(0.05)
+    return server
+
+
+def run_argv(args):
+    # the run settings in `args` as options for a worker's command line
+    argv = ["--delay", str(args.delay), "--repeats", str(args.repeats), "--cycles", str(args.cycles),
+            "--cycle-delay", str(args.cycle_delay), "--double-mode", args.double_mode,
+            "--double-freq", str(args.double_freq), "--double-target", str(args.double_target),
+            "--policy", args.policy, "--backend", args.backend, "--window-backend", args.window_backend,
+            "--jitter", str(args.jitter), "--offset", str(args.offset), "--offset-radius", str(args.offset_radius),
+            "--seed", str(args.seed), "--adapt-min", str(args.adapt_min), "--adapt-max", str(args.adapt_max)]
+    if args.click_type:
+        argv += ["--click-type", args.click_type]
+    if args.sound:
+        argv.append("--sound")
+    if args.optimize_order:
+        argv.append("--optimize-order")
+    if args.adaptive:
+        argv.append("--adaptive")
+    return argv
+
+
+class SupervisedWorker:
+    # One worker process and the newest progress record it sent. Lines that
+    # aren't JSON objects (notes printed before the run) are skipped.
+    def __init__(self, display, argv):
+        self.display = display
+        self.state = None
+        self.proc = subprocess.Popen(argv, env=dict(os.environ, DISPLAY=display), stdout=subprocess.PIPE,
+                                     text=True, bufsize=1, start_new_session=True)
+        self.reader = threading.Thread(target=self._read, name=f"worker {display}", daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                self.state = record
+
+    def running(self):
+        return self.proc.poll() is None
+
+    def stop(self):
+        # the headless runner takes SIGTERM as Ctrl+C and stops cleanly
+        if self.running():
+            self.proc.terminate()
+
+
+def supervisor_totals(workers):
+    # (clicks done, total clicks, summed rate, longest ETA, merged telemetry)
+    telemetry = ClickTelemetry(capacity=1)
+    done = total = 0
+    rate = eta = 0.0
+    for worker in workers:
+        state = worker.state
+        if state is None:
+            continue
+        done += state["clicks_done"]
+        total += state["total_clicks"]
+        rate += state["rate"]
+        eta = max(eta, state["eta"])
+        if "telemetry" in state:
+            telemetry.absorb(state["telemetry"])
+    return done, total, rate, eta, telemetry
+
+
+def run_supervisor(args):
+    if args.xvfb:
+        displays = [f":{args.xvfb_base + i}" for i in range(args.xvfb)]
+    else:
+        displays = [d.strip() for d in (args.displays or "").split(",") if d.strip()]
+    if not displays:
+        print("--supervise needs --displays or --xvfb", file=sys.stderr)
+        return 2
+    argv = [sys.executable, os.path.abspath(__file__), "--run", args.supervise, "--json-progress"] + run_argv(args)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    servers, workers = [], []
+    try:
+        try:
+            if args.xvfb:
+                for display in displays:
+                    servers.append(start_xvfb(display))
+            for index, display in enumerate(displays):
+                # seeded runs stay reproducible, with different jitter per worker
+                seed = ["--seed", str(args.seed + index)] if args.seed >= 0 else []
+                workers.append(SupervisedWorker(display, argv + seed))
+        except (OSError, RuntimeError) as e:
+            print(f"Cannot start workers: {e}", file=sys.stderr)
+            for worker in workers:
+                worker.stop()
+            return 2
+        try:
+            while any(worker.running() for worker in workers):
+                time.sleep(1.0)
+                done, total, rate, eta, telemetry = supervisor_totals(workers)
+                if not args.quiet and any(worker.state for worker in workers):
+                    running = sum(worker.running() for worker in workers)
+                    each = " ".join(f"{w.display} {w.state['rate']:.0f}/s" for w in workers if w.state)
+                    print(f"[{running}/{len(workers)} running] {done}/{total} clicks, {rate:.1f}/s total,"
+                          f" ETA {format_duration(eta)} | {each}", flush=True)
+                if args.prometheus:
+                    telemetry.write_prometheus(args.prometheus, rate)
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.stop()
+        for worker in workers:
+            worker.proc.wait()
+            worker.reader.join()
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+    done, total, rate, eta, telemetry = supervisor_totals(workers)
+    if args.prometheus:
+        telemetry.write_prometheus(args.prometheus, rate)
+    for worker in workers:
+        state = worker.state or {}
+        print(f"{worker.display}: {state.get('status', 'failed')} ({state.get('summary', 'no report')})")
+    print(f"Total: {done}/{total} clicks, {rate:.1f}/s over {len(workers)} displays")
+    return 0 if all(worker.proc.returncode == 0 for worker in workers) else 1
+
+
+# --- Benchmark ---
+# Headless regression suite for the click engine: no display, no real input.
+BENCH_SIZES = (10, 100, 1000, 10000, 100000)
+BENCH_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+BENCH_MIN_CLICKS = 20000   # throughput runs repeat small plans up to this many clicks
+BENCH_JITTER_CLICKS = 2000
+BENCH_JITTER_DELAY = 0.01
+BENCH_STOP_DELAY = 0.002
+BENCH_STOP_EXIT_DELAY = 1.0  # long delay, so stop lands in the middle of a wait
+BENCH_STOP_TRIALS = 5
+BENCH_THROUGHPUT_TRIALS = 5
+BENCH_CONDITION_POLLS = 20000
+BENCH_RECORD_SECONDS = 60  # synthetic recording, at RECORD_RATE
+BENCH_ORDER_POSITIONS = 300
+BENCH_PROGRAM_STEPS = 1000
+BENCH_HUMANIZE_SAMPLES = 200000
+BENCH_LIBRARY_POSITIONS = 1000
+BENCH_LIBRARY_EDITS = 50
+BENCH_REFERENCE_CALLS = 200000
+# metric, higher is better, relative tolerance, absolute slack, and whether
+# it scales with host speed: those are compared after dividing out the
+# in-run reference (bench_reference), so a slower host than the one that
+# recorded the baseline doesn't read as a regression. Shared hosts still
+# swing about 2x from run to run, hence the wide tolerances on those.
+BENCH_CHECKS = (
+    ("clicks_per_s", True, 0.6, 0.0, True),
+    ("jitter_p99_ms", False, 0.25, 0.05, False),
+    ("stop_latency_ms", False, 0.5, 2.0, False),
+    ("stop_exit_ms", False, 0.5, 5.0, False),
+    ("bytes_per_position", False, 0.1, 1.0, False),
+)
+# same, for the size independent "conditions" section
+BENCH_CONDITION_CHECKS = (
+    ("polls_per_s", True, 0.6, 0.0, True),
+)
+BENCH_ORDER_CHECKS = (
+    ("saved_pct", True, 0.05, 1.0, False),
+    ("optimize_ms", False, 1.5, 50.0, True),
+)
+BENCH_PROGRAM_CHECKS = (
+    ("steps_per_s", True, 0.6, 0.0, True),
+    ("click_steps_per_s", True, 0.6, 0.0, True),
+)
+BENCH_HUMANIZE_CHECKS = (
+    ("samples_per_s", True, 0.6, 0.0, True),
+    ("clicks_per_s", True, 0.6, 0.0, True),
+    ("reproducible", True, 0.0, 0.0, False),
+)
+BENCH_LIBRARY_CHECKS = (
+    ("autosave_ms", False, 1.5, 1.0, True),
+    ("cold_open_ms", False, 1.5, 5.0, True),
+    ("switch_ms", False, 1.5, 0.05, True),
+)
+BENCH_RECORDING_CHECKS = (
+    ("kept", False, 0.1, 8, False),
+    ("file_bytes", False, 0.1, 64, False),
+    ("simplify_ms", False, 1.5, 20.0, True),
+)
+
+
+class FakeClock:
+    # Simulated perf_counter/sleep pair. Every read costs `step` and every
+    # sleep overshoots by a seeded random amount, like a busy desktop, so
+    # scheduling results are deterministic for a given seed.
+    def __init__(self, step=1e-5, oversleep=0.001, seed=0):
+        self.now = 0.0
+        self.step = step
+        self.oversleep = oversleep
+        self.rng = random.Random(seed)
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds) + self.rng.uniform(0.0, self.oversleep)
+
+
+class BenchBackend(NullBackend):
+    # NullBackend that stops the engine after `limit` clicks
+    name = "bench"
+
+    def __init__(self, limit=None, record=False, clock=time.perf_counter):
+        super().__init__(record=record, clock=clock)
+        self.limit = limit
+        self.engine = None
+        self.last_click = None
+
+    def click(self, x, y, button=BUTTON_LEFT, count=1, interval=DOUBLE_CLICK_INTERVAL):
+        super().click(x, y, button, count, interval)
+        self.last_click = self.clock()
+        if self.limit is not None and self.clicks >= self.limit:
+            self.engine.stop()
+
+
+class RecordingScheduler(ClickScheduler):
+    # keeps how late every single click fired, for percentiles
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lateness = array("d")
+
+    def wait_next(self):
+        due = super().wait_next()
+        self.lateness.append(self.last_fire - due)
+        return due
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def bench_rows(n):
+    # every tenth position is a double click
+    return [(i + 1, i % 1920, (i * 7) % 1080, "Left", "Double" if i % 10 == 9 else "Single")
+            for i in range(n)]
+
+
+def bench_settings(delay, cycles=1):
+    # double rule pushed out of reach so runs only do the normal sequence
+    return RunSettings(delay=delay, repeats=1, cycles=cycles, cycle_delay=0.0, double_mode="Random",
+                       double_freq=10 ** 9, double_target=-1, schedule_policy=POLICY_SKIP)
+
+
+def bench_engine(plan, settings, backend, scheduler):
+    engine = ClickEngine(plan, settings, backend, scheduler=scheduler)
+    backend.engine = engine
+    return engine
+
+
+def bench_reference(calls=BENCH_REFERENCE_CALLS):
+    # host speed in calls/s: the same kind of work as the click loop
+    # (method calls, array reads, a clock read), none of the app's code.
+    # Best of a few trials, like bench_throughput.
+    xs = array("i", range(1000))
+    clock = time.perf_counter
+
+    class Sink:
+        def click(self, x, y):
+            return x + y
+
+    click = Sink().click
+    best = 0.0
+    for _ in range(BENCH_THROUGHPUT_TRIALS):
+        started = clock()
+        for i in range(calls):
+            click(xs[i % 1000], i)
+            clock()
+        elapsed = clock() - started
+        if elapsed > 0:
+            best = max(best, calls / elapsed)
+    return best
+
+
+def bench_throughput(plan):
+    # real clock, no delay: what the engine itself costs per click; the best
+    # of a few trials is kept to keep scheduler noise out of the baseline
+    cycles = max(1, BENCH_MIN_CLICKS // len(plan))
+    best = 0.0
+    for _ in range(BENCH_THROUGHPUT_TRIALS):
+        backend = BenchBackend()
+        engine = bench_engine(plan, bench_settings(0.0, cycles), backend, ClickScheduler(0.0))
+        started = time.perf_counter()
+        engine.run()
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            best = max(best, engine.clicks_done / elapsed)
+    return best
+
+
+def bench_jitter(plan):
+    # simulated clock: how late the scheduler fires against its deadlines
+    clock = FakeClock()
+    backend = BenchBackend(limit=BENCH_JITTER_CLICKS, clock=clock)
+    scheduler = RecordingScheduler(BENCH_JITTER_DELAY, clock=clock, sleep=clock.sleep)
+    bench_engine(plan, bench_settings(BENCH_JITTER_DELAY), backend, scheduler).run()
+    late = scheduler.lateness
+    return percentile(late, 50) * 1000, percentile(late, 99) * 1000
+
+
+def bench_stop_latency(plan):
+    # real clock and a worker thread, like a run stopped with F7; the worst
+    # of a few trials is kept
+    worst = 0.0
+    for _ in range(BENCH_STOP_TRIALS):
+        backend = BenchBackend()
+        engine = bench_engine(plan, bench_settings(BENCH_STOP_DELAY, cycles=10 ** 6), backend,
+                              ClickScheduler(BENCH_STOP_DELAY))
+        thread = threading.Thread(target=engine.run, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        requested = time.perf_counter()
+        engine.stop()
+        thread.join()
+        if backend.last_click is not None:
+            worst = max(worst, backend.last_click - requested)
+    return worst * 1000
+
+
+def bench_stop_exit(plan):
+    # time from stop() until the worker has returned, stopped mid-delay
+    worst = 0.0
+    for _ in range(BENCH_STOP_TRIALS):
+        engine = bench_engine(plan, bench_settings(BENCH_STOP_EXIT_DELAY, cycles=10 ** 6), BenchBackend(),
+                              ClickScheduler(BENCH_STOP_EXIT_DELAY))
+        thread = threading.Thread(target=engine.run, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        requested = time.perf_counter()
+        engine.stop()
+        thread.join()
+        worst = max(worst, time.perf_counter() - requested)
+    return worst * 1000
+
+
+def bench_memory(rows):
+    # bytes the compiled plan holds per position
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    plan = ClickPlan.compile(rows, button="left")
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(plan)
+
+
+class BenchCapture(ScreenCapture):
+    # Serves two alternating synthetic BGRA frames, so every poll misses the
+    # raw-bytes shortcut and goes through the full NumPy comparison.
+    def __init__(self, numpy, size):
+        self.np = numpy
+        self.layout = "BGRA"
+        self.frames = (bytes(4 * size * size), bytes([1, 2, 3, 255]) * (size * size))
+        self.flip = 0
+
+    def grab(self, left, top, width, height):
+        self.flip ^= 1
+        return self.frames[self.flip]
+
+
+def bench_condition_poll(polls=BENCH_CONDITION_POLLS):
+    # region matches per second; None when numpy isn't installed
+    try:
+        import numpy
+    except ImportError:
+        return None
+    size = CONDITION_REGION
+    capture = BenchCapture(numpy, size)
+    condition = ScreenCondition(COND_WAIT, 0, 0, size, size, bytes(3 * size * size))
+    start = time.perf_counter()
+    for _ in range(polls):
+        condition.matches(capture)
+    return polls / (time.perf_counter() - start)
+
+
+def bench_order(n=BENCH_ORDER_POSITIONS):
+    # travel saved on a seeded random screen layout, and how long it took
+    rng = random.Random(0)
+    rows = [(i + 1, rng.randrange(1920), rng.randrange(1080), "Left", "Single") for i in range(n)]
+    plan = ClickPlan.compile(rows)
+    start = time.perf_counter()
+    _, before, after = travel_order(plan)
+    elapsed = time.perf_counter() - start
+    return {
+        "positions": n,
+        "saved_pct": round((1 - after / before) * 100, 1),
+        "optimize_ms": round(elapsed * 1000, 1),
+    }
+
+
+def bench_program(n=BENCH_PROGRAM_STEPS):
+    # steps/s through the ProgramEngine: a mix of every step kind, and
+    # plain clicks (to hold against the click engine's clicks_per_s)
+    kinds = ("Single", "Double", "Move", "Drag", "Scroll", "Key", "Wait")
+    args = {"Drag": "5,5", "Scroll": "-1", "Key": "ctrl+c", "Wait": "0"}
+    mixed = [(i + 1, i % 1920, (i * 7) % 1080, "Left", kinds[i % 7], "", "", "", args.get(kinds[i % 7], ""))
+             for i in range(n)]
+    # one Move keeps the plain clicks a step program
+    clicks = bench_rows(n - 1) + [(n, 0, 0, "Left", "Move")]
+    result = {"steps": n}
+    for metric, rows in (("steps_per_s", mixed), ("click_steps_per_s", clicks)):
+        plan = ClickPlan.compile(rows)
+        cycles = max(1, BENCH_MIN_CLICKS // n)
+        best = 0.0
+        for _ in range(BENCH_THROUGHPUT_TRIALS):
+            engine = ProgramEngine(plan, bench_settings(0.0, cycles), BenchBackend(), scheduler=ClickScheduler(0.0))
+            started = time.perf_counter()
+            engine.run()
+            elapsed = time.perf_counter() - started
+            if elapsed > 0:
+                best = max(best, engine.slots_done / elapsed)
+        result[metric] = round(best, 1)
+    return result
+
+
+def bench_humanize(samples=BENCH_HUMANIZE_SAMPLES):
+    # jitter samples/s as the clicker sees them (refills included), click
+    # throughput with jitter on, and whether a fixed seed replays a run
+    # exactly on the simulated clock; None when numpy isn't installed
+    settings = bench_settings(BENCH_JITTER_DELAY)._replace(delay_jitter=0.2, offset_sigma=2.0, seed=1)
+    try:
+        humanizer = Humanizer(settings)
+    except RuntimeError:
+        return None
+    gaps, offsets = humanizer.gaps, humanizer.offsets
+    start = time.perf_counter()
+    for _ in range(samples):
+        next(gaps)
+        next(offsets)
+    elapsed = time.perf_counter() - start
+    humanizer.close()
+
+    plan = ClickPlan.compile(bench_rows(1000), button="left")
+    cycles = max(1, BENCH_MIN_CLICKS // len(plan))
+    best = 0.0
+    for _ in range(BENCH_THROUGHPUT_TRIALS):
+        engine = bench_engine(plan, bench_settings(0.0, cycles)._replace(offset_sigma=2.0, seed=1),
+                              BenchBackend(), ClickScheduler(0.0))
+        started = time.perf_counter()
+        engine.run()
+        best = max(best, engine.clicks_done / (time.perf_counter() - started))
+
+    runs = []
+    for _ in range(2):
+        clock = FakeClock()
+        backend = BenchBackend(limit=BENCH_JITTER_CLICKS, record=True, clock=clock)
+        bench_engine(plan, settings, backend, ClickScheduler(BENCH_JITTER_DELAY, clock=clock, sleep=clock.sleep)).run()
+        runs.append(backend.events)
+    return {
+        "samples_per_s": round(2 * samples / elapsed, 1),
+        "stalls": humanizer.stalls(),
+        "clicks_per_s": round(best, 1),
+        "reproducible": runs[0] == runs[1],
+    }
+
+
+def bench_library(n=BENCH_LIBRARY_POSITIONS, edits=BENCH_LIBRARY_EDITS):
+    # one-row autosaves of the open profile, opening a profile from disk,
+    # and switching back to one the LRU still holds (the tree refill is not
+    # included)
+    path = os.path.join(tempfile.gettempdir(), f"multiclicker-bench-{os.getpid()}.db")
+    rows = [(x, y, "Left", "Single", 0, None, "") for _, x, y, _, _ in bench_rows(n)]
+    settings = {"delay": 0.1, "click_type": "Left"}
+    library = ProfileLibrary(path)
+    try:
+        library.save("bench", rows, settings)
+        library.save("other", rows[:10], settings)
+        library.open("bench")  # open in the window, so saves patch it
+        start = time.perf_counter()
+        for i in range(edits):
+            rows[i] = (rows[i][0] + 1, *rows[i][1:])
+            library.save("bench", rows, settings)
+        autosave = (time.perf_counter() - start) / edits
+        library.cache.clear()
+        start = time.perf_counter()
+        library.open("bench")
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(edits):
+            library.open("other")
+            library.open("bench")
+        switch = (time.perf_counter() - start) / (2 * edits)
+    finally:
+        library.close()
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(OSError):
+                os.remove(path + suffix)
+    return {
+        "positions": n,
+        "autosave_ms": round(autosave * 1000, 3),
+        "cold_open_ms": round(cold * 1000, 2),
+        "switch_ms": round(switch * 1000, 4),
+    }
+
+
+def bench_path(seconds=BENCH_RECORD_SECONDS, rate=RECORD_RATE):
+    # a hand-like path: wandering curves with sensor noise, rests and a
+    # click every few seconds, seeded so every run gets the same samples
+    rng = random.Random(0)
+    trajectory = Trajectory()
+    x, y, heading = 800.0, 500.0, 0.0
+    step_ms = 1000 // rate
+    for i in range(seconds * rate):
+        t = i * step_ms
+        phase = t % 4000
+        if phase < 600:
+            continue  # resting, the recorder stores nothing
+        heading += rng.gauss(0, 0.05)
+        x = min(max(x + 3 * math.cos(heading), 0), 1919)
+        y = min(max(y + 3 * math.sin(heading), 0), 1079)
+        buttons = 1 if 600 <= phase < 700 else 0
+        trajectory.append(t, int(x + rng.random()), int(y + rng.random()), buttons)
+    return trajectory
+
+
+def bench_recording():
+    # raw vs simplified size, and what the simplification costs
+    raw = bench_path()
+    start = time.perf_counter()
+    simplified = raw.simplify()
+    elapsed = time.perf_counter() - start
+    path = os.path.join(tempfile.gettempdir(), f"multiclicker-bench-{os.getpid()}.mcr")
+    try:
+        simplified.save(path)
+        size = os.path.getsize(path)
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+    return {
+        "samples": len(raw),
+        "raw_bytes": raw.nbytes(),
+        "kept": len(simplified),
+        "file_bytes": size,
+        "simplify_ms": round(elapsed * 1000, 1),
+    }
+
+
+def run_benchmarks(sizes=BENCH_SIZES, log=print):
+    reference = bench_reference()
+    log(f"reference: {reference:.0f} calls/s")
+    results = {}
+    for n in sizes:
+        rows = bench_rows(n)
+        plan = ClickPlan.compile(rows, button="left")
+        p50, p99 = bench_jitter(plan)
+        result = {
+            "positions": n,
+            "clicks_per_s": round(bench_throughput(plan), 1),
+            "jitter_p50_ms": round(p50, 4),
+            "jitter_p99_ms": round(p99, 4),
+            "stop_latency_ms": round(bench_stop_latency(plan), 3),
+            "stop_exit_ms": round(bench_stop_exit(plan), 3),
+            "bytes_per_position": round(bench_memory(rows), 2),
+        }
+        log(f"{n:>7} positions: {result['clicks_per_s']:>10.0f} clicks/s, "
+            f"jitter p50 {p50:.3f} ms / p99 {p99:.3f} ms, "
+            f"stop {result['stop_latency_ms']:.2f} ms (exit {result['stop_exit_ms']:.2f} ms), "
+            f"{result['bytes_per_position']:.1f} B/position")
+        results[str(n)] = result
+    report = {
+        "format": "multiclicker-bench",
+        "version": 2,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "reference_per_s": round(reference, 1),
+        "results": results,
+    }
+    polls = bench_condition_poll()
+    if polls is not None:
+        report["conditions"] = {"region": CONDITION_REGION, "polls_per_s": round(polls, 1)}
+        log(f"conditions: {polls:.0f} region matches/s ({CONDITION_REGION}x{CONDITION_REGION})")
+    order = bench_order()
+    report["ordering"] = order
+    log(f"ordering: {order['positions']} positions, travel -{order['saved_pct']:.0f}%"
+        f" in {order['optimize_ms']:.0f} ms")
+    program = bench_program()
+    report["program"] = program
+    log(f"program: {program['steps_per_s']:.0f} mixed steps/s, {program['click_steps_per_s']:.0f} click steps/s"
+        f" ({program['steps']} steps)")
+    humanize = bench_humanize()
+    if humanize is not None:
+        report["humanize"] = humanize
+        log(f"humanize: {humanize['samples_per_s']:.0f} samples/s ({humanize['stalls']} stalls),"
+            f" {humanize['clicks_per_s']:.0f} clicks/s with offsets,"
+            f" seeded runs {'identical' if humanize['reproducible'] else 'DIFFER'}")
+    library = bench_library()
+    report["library"] = library
+    log(f"library: {library['positions']} positions, autosave {library['autosave_ms']:.2f} ms,"
+        f" cold open {library['cold_open_ms']:.1f} ms, cached switch {library['switch_ms']:.3f} ms")
+    recording = bench_recording()
+    report["recording"] = recording
+    log(f"recording: {recording['samples']} samples ({recording['raw_bytes']} B) -> {recording['kept']} kept,"
+        f" {recording['file_bytes']} B on disk, simplified in {recording['simplify_ms']:.0f} ms")
+    return report
+
+
+def compare_benchmarks(report, baseline):
+    # returns a list of human readable regressions against the baseline;
+    # speed-bound metrics are compared relative to each run's reference
+    # (a v1 baseline has none, so they compare as recorded)
+    regressions = []
+    speed = 1.0
+    if report.get("reference_per_s") and baseline.get("reference_per_s"):
+        speed = report["reference_per_s"] / baseline["reference_per_s"]
+    sections = [(f"{size} positions", report["results"].get(size), base, BENCH_CHECKS)
+                for size, base in baseline.get("results", {}).items()]
+    sections.append(("conditions", report.get("conditions"), baseline.get("conditions"),
+                     BENCH_CONDITION_CHECKS))
+    sections.append(("ordering", report.get("ordering"), baseline.get("ordering"), BENCH_ORDER_CHECKS))
+    sections.append(("program", report.get("program"), baseline.get("program"), BENCH_PROGRAM_CHECKS))
+    sections.append(("humanize", report.get("humanize"), baseline.get("humanize"), BENCH_HUMANIZE_CHECKS))
+    sections.append(("library", report.get("library"), baseline.get("library"), BENCH_LIBRARY_CHECKS))
+    sections.append(("recording", report.get("recording"), baseline.get("recording"),
+                     BENCH_RECORDING_CHECKS))
+    for label, current, base, checks in sections:
+        if current is None or base is None:
+            continue
+        for metric, higher_better, tolerance, slack, scaled in checks:
+            if metric not in base or metric not in current:
+                continue
+            value, ref = current[metric], base[metric]
+            if scaled and speed != 1.0:
+                # what the baseline host would have measured on this one
+                ref = round(ref * speed if higher_better else ref / speed, 3)
+            if higher_better:
+                bad = value < ref * (1 - tolerance) - slack
+            else:
+                bad = value > ref * (1 + tolerance) + slack
+            if bad:
+                scale = " at this host's speed" if scaled and speed != 1.0 else ""
+                regressions.append(f"{label}: {metric} {value} (baseline {ref}{scale})")
+    return regressions
+
+
+def run_bench_command(args):
+    sizes = tuple(int(n) for n in args.bench_sizes.split(",")) if args.bench_sizes else BENCH_SIZES
+    report = run_benchmarks(sizes)
+    text = json.dumps(report, indent=2)
+    if args.bench_out:
+        with open(args.bench_out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, nothing to compare")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        regressions = compare_benchmarks(report, json.load(f))
+    for line in regressions:
+        print("REGRESSION" if args.bench_gate else "slower than baseline:", line)
+    return 1 if regressions and args.bench_gate else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi Clicker Pro")
+    parser.add_argument("--bench", action="store_true", help="run the headless engine benchmark and exit")
+    parser.add_argument("--bench-sizes", help="comma separated profile sizes (default: 10 to 100000)")
+    parser.add_argument("--bench-out", help="write the benchmark JSON here instead of stdout")
+    parser.add_argument("--baseline", default=BENCH_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--bench-gate", action="store_true", help="exit with 1 when the run regresses against the baseline")
+    parser.add_argument("--run", metavar="PROFILE", help="run a saved profile without the GUI and exit")
+    parser.add_argument("--replay", metavar="RECORDING", help="replay a recorded mouse path without the GUI and exit")
+    parser.add_argument("--record", metavar="RECORDING", help="record the mouse until Ctrl+C and save it")
+    parser.add_argument("--record-rate", type=int, default=RECORD_RATE, help="pointer samples per second")
+    parser.add_argument("--epsilon", type=float, default=RECORD_EPSILON,
+                        help="path simplification tolerance in pixels")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines while running")
+    parser.add_argument("--json-progress", action="store_true", help="progress lines as JSON objects")
+    parser.add_argument("--supervise", metavar="PROFILE",
+                        help="run a profile in one worker process per X display and report the totals")
+    parser.add_argument("--displays", help="comma separated X displays for --supervise, e.g. :1,:2")
+    parser.add_argument("--xvfb", type=int, metavar="N", help="start N Xvfb displays for --supervise")
+    parser.add_argument("--xvfb-base", type=int, default=90, help="first display number --xvfb uses")
+    parser.add_argument("--prometheus", metavar="FILE", help="keep click telemetry in this Prometheus text file")
+    parser.add_argument("--daemon", metavar="SOCKET", help="serve start/stop/pause/status/load on a Unix socket")
+    parser.add_argument("--load", metavar="PROFILE", help="profile the daemon starts with")
+    parser.add_argument("--ctl", metavar="SOCKET", help="send a command to a running daemon")
+    parser.add_argument("command", nargs="*", help="daemon command for --ctl, e.g. 'status' or 'start x.mcp'")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a startup time breakdown once the app is warmed up, then exit")
+    add_run_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.bench:
+        return run_bench_command(args)
+    if args.run or args.replay:
+        return run_headless(args)
+    if args.record:
+        return record_headless(args)
+    if args.supervise:
+        return run_supervisor(args)
+    if args.daemon:
+        return ClickDaemon(args).serve(args.daemon)
+    if args.ctl:
+        return send_command(args.ctl, args.command)
+    profile = StartupProfile() if args.profile_startup else None
+    if profile is not None:
+        # everything imported before main() ran
+        profile.phases.append(("imports", 0.0, time.perf_counter() - STARTUP_T0, "MainThread"))
+    with startup_phase(profile, "tk root"):
+        root = tk.Tk()
+    with startup_phase(profile, "build window"):
+        app = MultiClickerApp(root, profile=profile)
+    if profile is not None:
+        with profile.phase("first draw"):
+            root.update()
+        interactive = time.perf_counter() - STARTUP_T0
+
+        def report_when_warm():
+            if not app.warmed_up.is_set():
+                root.after(20, report_when_warm)
+                return
+            print(profile.report())
+            print(f"window interactive after {interactive * 1000:.1f} ms, "
+                  f"warmed up after {(time.perf_counter() - STARTUP_T0) * 1000:.1f} ms")
+            root.destroy()
+        root.after(20, report_when_warm)
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
 
@@ -0,0 +1,21 @@
+import importlib.util
+import pathlib
+
+import pytest
+
+APP = pathlib.Path(__file__).resolve().parent.parent / "MultiClickerPro_v1.0.py"
+
+
+@pytest.fixture(scope="session")
+def mc():
+    # the app is a single script whose name isn't importable, load it by path
+    spec = importlib.util.spec_from_file_location("multiclicker", APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def clock(mc):
+    # simulated clock that never oversleeps, so deadlines are exact
+    return mc.FakeClock(step=1e-6, oversleep=0.0)
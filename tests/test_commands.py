@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+
+def bus(mc, clock, log):
+    commands = mc.CommandBus(clock=clock)
+    commands.register("start", lambda: log.append("start") or "started")
+    commands.register("load", lambda profile: log.append(profile))
+    return commands
+
+
+def test_repeats_inside_the_window_are_dropped(mc, clock):
+    log = []
+    commands = bus(mc, clock, log)
+    start = clock.now
+    assert commands.post("start", source="hotkey") is not None
+    clock.now = start + 0.1
+    assert commands.post("start", source="hotkey") is None
+    # other sources and other commands have their own windows
+    assert commands.post("start", source="button") is not None
+    assert commands.post("load", ("a",), source="hotkey") is not None
+    clock.now = start + 0.3
+    assert commands.post("start", source="hotkey") is not None
+    commands.dispatch()
+    assert log == ["start", "start", "a", "start"]
+    assert commands.stats()["handled"] == 4 and commands.stats()["debounced"] == 1
+
+
+def test_api_and_socket_are_never_debounced(mc, clock):
+    log = []
+    commands = bus(mc, clock, log)
+    for source in ("api", "socket", "api", "socket"):
+        assert commands.post("start", source=source) is not None
+    commands.dispatch()
+    assert len(log) == 4
+
+
+def test_call_returns_the_result_and_reraises(mc, clock):
+    commands = bus(mc, clock, [])
+    consumer = threading.Thread(target=commands.serve, daemon=True)
+    consumer.start()
+    assert commands.call("start", timeout=5.0) == "started"
+    with pytest.raises(ValueError, match="unknown command 'fly'"):
+        commands.call("fly", timeout=5.0)
+    with pytest.raises(TypeError):
+        commands.call("load", source="socket", timeout=5.0)
+    commands.close()
+    consumer.join(5.0)
+    assert not consumer.is_alive()
+    assert commands.handled == 3
+
+
+def test_commands_run_in_order(mc, clock):
+    log = []
+    commands = bus(mc, clock, log)
+    for name in "abcdef":
+        commands.post("load", (name,))
+    commands.dispatch()
+    assert log == list("abcdef")
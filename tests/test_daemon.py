@@ -0,0 +1,102 @@
+import argparse
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+CONDITION = {"kind": "pixel", "x": 1}  # no y/w/h/rgb
+
+
+def daemon_args(mc, *argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--load")
+    mc.add_run_arguments(parser)
+    return parser.parse_args(["--backend", "null", "--delay", "0.01", *argv])
+
+
+@pytest.fixture
+def daemon(mc, tmp_path):
+    # a daemon serving on a socket in tmp_path; yields (daemon, connection)
+    path = str(tmp_path / "d.sock")
+    app = mc.ClickDaemon(daemon_args(mc))
+    result = []
+    server = threading.Thread(target=lambda: result.append(app.serve(path)), daemon=True)
+    server.start()
+    deadline = time.perf_counter() + 5.0
+    while app.server is None and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    lines = sock.makefile("r", encoding="utf-8")
+
+    def send(request):
+        text = request if isinstance(request, str) else json.dumps(request)
+        sock.sendall((text + "\n").encode("utf-8"))
+        return json.loads(lines.readline())
+
+    yield app, send
+    send({"cmd": "shutdown"})
+    server.join(5.0)
+    sock.close()
+    assert result == [0]
+
+
+def profile(mc, tmp_path, rows, name="p.mcp"):
+    path = str(tmp_path / name)
+    mc.write_profile(path, rows)
+    return path
+
+
+def test_status_and_bad_requests(daemon):
+    _, send = daemon
+    assert send({"cmd": "status"}) == {"profile": None, "positions": 0, "status": "idle", "ok": True}
+    assert send({"cmd": "dance"}) == {"ok": False, "error": "unknown command 'dance'"}
+    assert not send("not json")["ok"]
+    assert send("[1]")["error"] == "bad request: request must be a JSON object"
+    assert send({"cmd": "start"}) == {"ok": False, "error": "no profile loaded"}
+    assert not send({"cmd": "load", "profile": "/nonexistent.mcp"})["ok"]
+
+
+def test_load_run_and_stop(mc, tmp_path, daemon):
+    app, send = daemon
+    path = profile(mc, tmp_path, [(10, 20, "Left", "Single", 0, None, ""), (30, 40, "Left", "Single", 0, None, "")])
+    assert send({"cmd": "load", "profile": path}) == {"profile": path, "positions": 2, "ok": True}
+    reply = send({"cmd": "start", "settings": {"cycles": 1000, "cycle_delay": 0}})
+    assert reply["ok"] and reply["status"] in ("running", "idle")
+    assert send({"cmd": "pause"})["status"] == "paused"
+    assert send({"cmd": "resume"})["status"] == "running"
+    reply = send({"cmd": "stop"})
+    assert reply["status"] == "stopped" and reply["cycles"] == 1000
+    assert app.backend.events == []  # the CLI null backend keeps no log
+
+
+def test_bad_settings_and_profiles_get_a_reply(mc, tmp_path, daemon):
+    _, send = daemon
+    path = profile(mc, tmp_path, [(10, 20, "Left", "Single", 0, None, "")])
+    reply = send({"cmd": "start", "profile": path, "settings": {"speed": 2}})
+    assert not reply["ok"] and "speed" in reply["error"]
+    # a malformed condition used to drop the connection
+    broken = profile(mc, tmp_path, [(10, 20, "Left", "Single", 0, CONDITION, "")], "broken.mcp")
+    assert send({"cmd": "load", "profile": broken}) == {"ok": False, "error": "condition has no 'y'"}
+    assert send({"cmd": "status"})["ok"]
+
+
+def test_serve_leaves_other_files_alone(mc, tmp_path, capsys):
+    app = mc.ClickDaemon(daemon_args(mc))
+    path = tmp_path / "taken"
+    path.write_text("keep me")
+    assert app.serve(str(path)) == 2
+    assert path.read_text() == "keep me"
+    assert "not a socket" in capsys.readouterr().err
+
+
+def test_stale_socket(mc, tmp_path):
+    path = str(tmp_path / "s.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    assert "already listening" in mc.stale_socket(path)
+    listener.close()
+    assert mc.stale_socket(path) is None
@@ -0,0 +1,64 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("numpy")
+
+
+def settings(mc, seed=42, jitter=0.2, offset=2.0, radius=0.0, delay=0.1):
+    return mc.RunSettings(delay, 1, 3, 0.0, "Random", 10 ** 9, -1, mc.POLICY_SKIP,
+                          delay_jitter=jitter, offset_sigma=offset, offset_radius=radius, seed=seed)
+
+
+def draw(humanizer, n=50, interleave=False):
+    # n gaps and n offsets, taken across several small batches
+    try:
+        if interleave:
+            pairs = [(next(humanizer.gaps), next(humanizer.offsets)) for _ in range(n)]
+            return [g for g, _ in pairs], [o for _, o in pairs]
+        return list(itertools.islice(humanizer.gaps, n)), list(itertools.islice(humanizer.offsets, n))
+    finally:
+        humanizer.close()
+
+
+def test_seed_reproduces_both_streams_however_they_interleave(mc):
+    first = draw(mc.Humanizer(settings(mc), batch=16))
+    assert draw(mc.Humanizer(settings(mc), batch=16), interleave=True) == first
+    assert draw(mc.Humanizer(settings(mc, seed=43), batch=16)) != first
+
+
+def test_fresh_seed_is_reported(mc):
+    humanizer = mc.Humanizer(settings(mc, seed=-1), batch=16)
+    seed = humanizer.seed
+    drawn = draw(humanizer)
+    assert draw(mc.Humanizer(settings(mc, seed=seed), batch=16)) == drawn
+
+
+def test_draws_stay_in_bounds(mc):
+    gaps, offsets = draw(mc.Humanizer(settings(mc, jitter=0.5, offset=4.0, radius=5.0), batch=64), n=1000)
+    assert all(0.0 <= gap <= 0.1 + 2 * 0.05 for gap in gaps)
+    assert all(dx * dx + dy * dy <= 25 for dx, dy in offsets)
+    assert len(set(gaps)) > 900
+
+
+def test_streams_are_off_unless_asked_for(mc):
+    humanizer = mc.Humanizer(settings(mc, jitter=0.0, offset=0.0))
+    assert humanizer.gaps is None and humanizer.offsets is None
+    assert not mc.humanized(settings(mc, jitter=0.0, offset=0.0))
+    humanizer = mc.Humanizer(settings(mc, jitter=0.2, offset=0.0))
+    assert humanizer.gaps is not None and humanizer.offsets is None
+    humanizer.close()
+
+
+def test_seeded_runs_click_the_same_points(mc):
+    plan = mc.ClickPlan.compile([(1, 100, 100, "Left", "Single"), (2, 200, 200, "Left", "Single")])
+    runs = []
+    for _ in range(2):
+        clock = mc.FakeClock(step=1e-6, oversleep=0.0)
+        backend = mc.NullBackend(clock=clock)
+        scheduler = mc.ClickScheduler(0.1, policy=mc.POLICY_SKIP, clock=clock, sleep=clock.sleep)
+        mc.ClickEngine(plan, settings(mc), backend, scheduler=scheduler).run()
+        runs.append([event[1:3] + (round(event[-1], 6),) for event in backend.events])
+    assert runs[0] == runs[1]
+    assert len(runs[0]) == 6
+    assert {(x, y) for x, y, _ in runs[0]} != {(100, 100), (200, 200)}
@@ -0,0 +1,72 @@
+import pytest
+
+
+SETTINGS = {"delay": 0.2, "click_type": "Left", "double_position": "All Positions"}
+
+
+@pytest.fixture
+def library(mc, tmp_path):
+    library = mc.ProfileLibrary(str(tmp_path / "library.db"), cache=2)
+    yield library
+    library.close()
+
+
+def rows(n):
+    return [(i, 2 * i, "Left", "Single", 0, None, "") for i in range(n)]
+
+
+def same_plan(a, b):
+    return (list(a) == list(b) and a.window(0) == b.window(0) and a.steps == b.steps
+            and [a.window(i) for i in range(len(a))] == [b.window(i) for i in range(len(b))])
+
+
+def test_save_writes_only_changed_rows(library):
+    profile = rows(100)
+    assert library.save("a", profile, SETTINGS) == 100
+    assert library.save("a", profile, SETTINGS) == 0
+    profile[7] = (1, 1, "Right", "Double", 0, None, "")
+    assert library.save("a", profile, SETTINGS) == 1
+    assert library.save("a", profile[:50], SETTINGS) == 0
+    library.cache.clear()
+    assert library.open("a").rows == profile[:50]
+
+
+def test_saving_an_open_profile_keeps_it_compiled(mc, library):
+    profile = rows(20)
+    library.save("a", profile, SETTINGS)
+    library.open("a")
+    profile[3] = (5, 5, "Left", "Loop", 0, None, "2x3")
+    profile[4] = (6, 6, "Left", "Drag", 0, None, "9,9")
+    profile.append((7, 7, "Left", "Single", 42, None, ""))
+    del profile[10:15]
+    library.save("a", profile, SETTINGS)
+    entry = library.cache["a"]
+    assert entry.values is not None and entry.plan is not None
+    full = mc.compile_profile("a", [], SETTINGS, profile)
+    assert entry.values == full.values
+    assert entry.points == full.points
+    assert same_plan(entry.plan, full.plan)
+    assert library.open("a") is entry
+
+
+def test_bad_step_in_an_edit_drops_only_the_plan(library):
+    profile = rows(5)
+    library.save("a", profile, SETTINGS)
+    library.open("a")
+    profile[2] = (0, 0, "Left", "Loop", 0, None, "9")
+    library.save("a", profile, SETTINGS)
+    entry = library.open("a")
+    assert entry.plan is None and len(entry.values) == 5
+
+
+def test_names_tags_and_lru(library):
+    for name in ("a", "b", "c"):
+        library.save(name, rows(3), SETTINGS)
+    library.set_tags("a", ["work"])
+    assert library.names("work") == ["a"]
+    assert library.unused_name("a") == "a 2"
+    for name in ("a", "b", "c"):
+        library.open(name)
+    assert list(library.cache) == ["b", "c"]
+    library.delete("c")
+    assert "c" not in library.names() and "c" not in library.cache
@@ -0,0 +1,8 @@
+def test_disc_bands_cover_marker(mc):
+    bands = mc.MarkerSurface.disc_bands()
+    r = mc.MarkerSurface.SIZE // 2 - 1
+    assert bands[0][1] == -r and bands[-1][1] + bands[-1][3] == r
+    # bands are centered and the widest one spans the whole disc
+    assert all(dx == -w // 2 for dx, _, w, _ in bands)
+    assert max(w for _, _, w, _ in bands) == 2 * r
+    assert bands == [(dx, -dy - h, w, h) for dx, dy, w, h in reversed(bands)]
@@ -0,0 +1,62 @@
+import pytest
+
+
+ROWS = [
+    (1, "10", "20", "Left", "Single"),
+    (2, 30.0, 40, "Right", "Double"),
+    (3, 50, 60, "Middle", "Single"),
+]
+
+
+def test_compile_packs_rows_into_arrays(mc):
+    plan = mc.ClickPlan.compile(ROWS)
+    assert len(plan) == 3
+    assert list(plan) == [
+        (10, 20, mc.MODE_SINGLE, mc.BUTTON_LEFT),
+        (30, 40, mc.MODE_DOUBLE, mc.BUTTON_RIGHT),
+        (50, 60, mc.MODE_SINGLE, mc.BUTTON_MIDDLE),
+    ]
+    assert not plan.bound() and not plan.programmed()
+    assert plan.conditions is None
+
+
+def test_plan_is_read_only(mc):
+    plan = mc.ClickPlan.compile(ROWS)
+    with pytest.raises(TypeError):
+        plan.xs[0] = 99
+
+
+def test_button_override(mc):
+    plan = mc.ClickPlan.compile(ROWS, button="Right")
+    assert [button for _, _, _, button in plan] == [mc.BUTTON_RIGHT] * 3
+
+
+def test_subset_keeps_order_and_steps(mc):
+    rows = ROWS + [(4, 0, 0, "Left", "Drag", "", "", "", "5,6")]
+    plan = mc.ClickPlan.compile(rows).subset([3, 0])
+    assert [(x, y) for x, y, _, _ in plan] == [(0, 0), (10, 20)]
+    assert plan.steps == ((5, 6), None)
+
+
+def test_step_rows_parse_at_compile(mc):
+    rows = [(1, 0, 0, "Left", "Key", "", "", "", "ctrl+c"),
+            (2, 0, 0, "Left", "Wait", "", "", "", "250"),
+            (3, 0, 0, "Left", "Loop", "", "", "", "1x4")]
+    plan = mc.ClickPlan.compile(rows)
+    assert plan.programmed()
+    assert plan.steps == (("ctrl", "c"), (250,), (0, 4))
+
+
+def test_bad_step_names_the_row(mc):
+    rows = ROWS + [(4, 0, 0, "Left", "Scroll", "", "", "", "lots")]
+    with pytest.raises(ValueError, match="Position 4"):
+        mc.ClickPlan.compile(rows)
+
+
+def test_override_settings_checks_keys_and_bools(mc):
+    settings = mc.RunSettings(0.5, 1, 1, 0.0, "Random", 5, -1, mc.POLICY_SKIP)
+    changed = mc.override_settings(settings, {"delay": "0.2", "cycles": 3, "adaptive": "false"})
+    assert (changed.delay, changed.cycles, changed.adaptive) == (0.2, 3, False)
+    for bad in ({"nope": 1}, {"adaptive": "maybe"}, {"delay": "fast"}, ["delay"]):
+        with pytest.raises(ValueError):
+            mc.override_settings(settings, bad)
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+CONDITION = {"kind": "pixel", "x": 5, "y": 6, "w": 1, "h": 1, "rgb": "AAAA", "tol": 16, "timeout": 5.0}
+ROWS = [
+    (10, 20, "Left", "Single", 0, None, ""),
+    (30, 40, "Right", "Double", 0x2a00003, None, ""),
+    (50, 60, "Left", "Single", 0, CONDITION, ""),
+    (0, 0, "Left", "Key", 0, None, "ctrl+c"),
+]
+
+
+def write_lines(path, header, rows):
+    lines = [json.dumps(header)] + [json.dumps(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def header(mc, version):
+    return {"format": mc.PROFILE_FORMAT, "version": version, "count": 1}
+
+
+def test_v5_round_trip(mc, tmp_path):
+    path = tmp_path / "p.mcp"
+    mc.write_profile(path, ROWS)
+    assert [row for batch in mc.iter_profile(path) for row in batch] == ROWS
+    # rows only carry the trailing items they need
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["version"] == mc.PROFILE_VERSION
+    assert [len(json.loads(line)) for line in lines[1:]] == [4, 5, 6, 7]
+
+
+def test_batches(mc, tmp_path):
+    path = tmp_path / "p.mcp"
+    rows = [(i, i, "Left", "Single", 0, None, "") for i in range(7)]
+    mc.write_profile(path, rows)
+    batches = list(mc.iter_profile(path, batch=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert sum(batches, []) == rows
+
+
+def test_v1_array_is_migrated(mc, tmp_path):
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps([[1, "10", "20.0", "Left", "Single"], [2, 30, 40, "Middle", "Double"]]))
+    assert list(mc.iter_profile(path)) == [[
+        (10, 20, "Left", "Single", 0, None, ""),
+        (30, 40, "Middle", "Double", 0, None, ""),
+    ]]
+
+
+@pytest.mark.parametrize("version, row", [
+    (2, [1, 2, "Left", "Single"]),
+    (3, [1, 2, "Left", "Single", 77]),
+    (4, [1, 2, "Left", "Single", 0, CONDITION]),
+    (5, [1, 2, "Left", "Wait", 0, None, "250"]),
+])
+def test_older_rows_are_normalized(mc, tmp_path, version, row):
+    path = tmp_path / "p.mcp"
+    write_lines(path, header(mc, version), [row])
+    (rows,) = mc.iter_profile(path)
+    assert rows == [tuple(row) + (0, None, "")[len(row) - 4:]]
+    assert len(rows[0]) == 7
+
+
+def test_rejects_foreign_and_newer_files(mc, tmp_path):
+    path = tmp_path / "p.mcp"
+    write_lines(path, {"format": "something-else", "version": 1}, [])
+    with pytest.raises(ValueError, match="Not a MultiClicker profile"):
+        list(mc.iter_profile(path))
+    write_lines(path, header(mc, mc.PROFILE_VERSION + 1), [])
+    with pytest.raises(ValueError, match="newer"):
+        list(mc.iter_profile(path))
+
+
+def test_load_plan_compiles_a_profile(mc, tmp_path):
+    path = tmp_path / "p.mcp"
+    mc.write_profile(path, ROWS[:2])
+    plan = mc.load_plan(path)
+    assert list(plan) == [(10, 20, mc.MODE_SINGLE, mc.BUTTON_LEFT), (30, 40, mc.MODE_DOUBLE, mc.BUTTON_RIGHT)]
+    assert plan.bound()
+    assert list(mc.load_plan(path, "Middle"))[0][3] == mc.BUTTON_MIDDLE
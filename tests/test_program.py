@@ -0,0 +1,74 @@
+from array import array
+
+import pytest
+
+
+def attached_channel(mc):
+    channel = mc.ProgressChannel()
+    channel.attached = True
+    channel.request = channel.post  # nobody answers marker requests here
+    return channel
+
+
+def test_failed_swap_is_reported_on_the_channel(mc):
+    class Backend(mc.NullBackend):
+        def key_codes(self, keys):
+            if "nope" in keys:
+                raise ValueError("Unknown key: nope")
+            return tuple(keys)
+
+    plan = mc.ClickPlan.compile([(1, 0, 0, "Left", "Key", "", "", "", "ctrl+c")])
+    settings = mc.RunSettings(0.0, 1, 1, 0.0, "Random", 5, -1, mc.POLICY_SKIP)
+    engine = mc.ProgramEngine(plan, settings, Backend(), channel=attached_channel(mc))
+    engine.set_plan(mc.ClickPlan.compile([(1, 0, 0, "Left", "Key", "", "", "", "nope")]), None)
+    assert engine.plan is plan
+    assert list(engine.channel.drain()) == [("log", ("Step program not swapped: Unknown key: nope",), None)]
+
+
+# click, then (double, move, drag) three times, scroll, key, 250 ms wait
+STEPS = [
+    (1, 10, 10, "Left", "Single"),
+    (2, 20, 20, "Right", "Double"),
+    (3, 30, 30, "Left", "Move", "", "", "", ""),
+    (4, 40, 40, "Left", "Drag", "", "", "", "50,60"),
+    (5, 0, 0, "Left", "Loop", "", "", "", "2x3"),
+    (6, 70, 70, "Left", "Scroll", "", "", "", "-2"),
+    (7, 0, 0, "Left", "Key", "", "", "", "ctrl+s"),
+    (8, 0, 0, "Left", "Wait", "", "", "", "250"),
+]
+
+
+def run_program(mc, clock, rows, repeats=1, cycles=1):
+    settings = mc.RunSettings(0.1, repeats, cycles, 0.0, "Random", 10 ** 9, -1, mc.POLICY_SKIP)
+    backend = mc.NullBackend(clock=clock)
+    scheduler = mc.ClickScheduler(0.1, policy=mc.POLICY_SKIP, clock=clock, sleep=clock.sleep)
+    engine = mc.ProgramEngine(mc.ClickPlan.compile(rows), settings, backend, scheduler=scheduler)
+    engine.run()
+    return engine, backend.events
+
+
+def test_program_totals_multiply_loop_bodies(mc):
+    program = mc.StepProgram.compile(mc.ClickPlan.compile(STEPS))
+    assert len(program) == len(STEPS)
+    assert (program.slots, program.clicks, program.wait) == (12, 10, 0.25)
+    assert program.instruction(4)[:4] == array("i", [mc.OP_LOOP, 4, 1, 3])
+
+
+def test_program_runs_steps_in_order(mc, clock):
+    engine, events = run_program(mc, clock, STEPS)
+    body = [("click", 20, 20, mc.BUTTON_RIGHT, 2), ("move", 30, 30),
+            ("press", 40, 40, mc.BUTTON_LEFT), ("move", 50, 60), ("release", 50, 60, mc.BUTTON_LEFT)]
+    assert [event[:-1] for event in events] == [
+        ("click", 10, 10, mc.BUTTON_LEFT, 1), *body * 3, ("scroll", 70, 70, -2), ("key", ("ctrl", "s")),
+    ]
+    assert engine.clicks_done == engine.total_clicks == 10
+    assert engine.slots_done == engine.total_slots == 12
+    assert engine.channel.state.status == "finished"
+
+
+def test_wait_pushes_the_next_pass_back(mc, clock):
+    engine, events = run_program(mc, clock, STEPS, repeats=2)
+    starts = [event[-1] for event in events if event[:3] == ("click", 10, 10)]
+    # one slot per action, then the wait, before the second pass begins
+    assert starts[1] - starts[0] == pytest.approx(12 * 0.1 + 0.25, abs=1e-3)
+    assert engine.clicks_done == engine.total_clicks == 20
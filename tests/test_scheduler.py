@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+
+def scheduler(mc, clock, interval=0.1, policy=None):
+    return mc.ClickScheduler(interval, policy=policy or mc.POLICY_SKIP, clock=clock, sleep=clock.sleep)
+
+
+def test_deadlines_do_not_drift(mc, clock):
+    s = scheduler(mc, clock)
+    start = s.start()
+    dues = [s.wait_next() for _ in range(100)]
+    assert dues == pytest.approx([start + i * 0.1 for i in range(100)])
+    assert s.late_max < 1e-4
+    assert s.skipped == 0
+
+
+def test_skip_drops_missed_slots(mc, clock):
+    s = scheduler(mc, clock)
+    start = s.start()
+    clock.now += 0.35
+    assert s.wait_next() == start
+    assert s.skipped == 3
+    assert s.next_due == pytest.approx(start + 0.4)
+
+
+def test_catch_up_keeps_every_slot(mc, clock):
+    s = scheduler(mc, clock, policy=mc.POLICY_CATCH_UP)
+    start = s.start()
+    clock.now += 0.35
+    s.wait_next()
+    assert s.skipped == 0
+    assert s.next_due == pytest.approx(start + 0.1)
+
+
+def test_reset_restarts_the_grid(mc, clock):
+    s = scheduler(mc, clock, policy=mc.POLICY_RESET)
+    s.start()
+    clock.now += 0.35
+    s.wait_next()
+    assert s.next_due == pytest.approx(clock.now + 0.1, abs=1e-5)
+
+
+def test_interrupt_leaves_the_slot_pending(mc, clock):
+    s = scheduler(mc, clock)
+    s.start()
+    s.wait_next()
+    pending = s.next_due
+    s.interrupt()
+    assert s.wait_next() is None
+    assert s.next_due == pending
+    assert s.ticks == 1
+
+
+def test_gaps_replace_the_interval(mc, clock):
+    s = scheduler(mc, clock)
+    start = s.start()
+    s.gaps = iter([0.2, 0.3, 0.4])
+    dues = [s.wait_next() for _ in range(3)]
+    assert dues == pytest.approx([start, start + 0.2, start + 0.5])
+
+
+def test_engine_runs_every_slot_on_the_simulated_clock(mc, clock):
+    plan = mc.ClickPlan.compile([(1, 10, 20, "Left", "Single"), (2, 30, 40, "Right", "Double")])
+    settings = mc.RunSettings(0.05, 1, 3, 0.0, "Random", 10 ** 9, -1, mc.POLICY_SKIP)
+    backend = mc.NullBackend(clock=clock)
+    engine = mc.ClickEngine(plan, settings, backend, scheduler=scheduler(mc, clock, 0.05))
+    engine.run()
+    clicks = [event[1:5] for event in backend.events if event[0] == "click"]
+    assert clicks == [(10, 20, mc.BUTTON_LEFT, 1), (30, 40, mc.BUTTON_RIGHT, 2)] * 3
+    assert backend.clicks == 9
+
+
+def test_fake_clock_runs_are_reproducible(mc):
+    lateness = []
+    for _ in range(2):
+        clock = mc.FakeClock(seed=3)
+        s = mc.RecordingScheduler(0.01, clock=clock, sleep=clock.sleep)
+        s.start()
+        for _ in range(200):
+            s.wait_next()
+        lateness.append(list(s.lateness))
+    assert lateness[0] == lateness[1]
+
+
+def test_replay_keeps_recorded_timing_and_ignores_jitter(mc, clock):
+    trajectory = mc.Trajectory()
+    for t, x, y, buttons in ((0, 1, 1, 0), (100, 2, 2, 1), (150, 2, 2, 0), (400, 5, 5, 0)):
+        trajectory.append(t, x, y, buttons)
+    settings = mc.RunSettings(0.5, 1, 2, 0.0, "Random", 5, -1, mc.POLICY_SKIP,
+                              delay_jitter=0.3, offset_sigma=2.0, adaptive=True)
+    backend = mc.NullBackend(clock=clock)
+    scheduler = mc.ClickScheduler(0.0, policy=mc.POLICY_CATCH_UP, clock=clock, sleep=clock.sleep)
+    engine = mc.ReplayEngine(trajectory, settings, backend, speed=2.0, scheduler=scheduler)
+    assert engine.humanizer is None and engine.adaptive is None
+    started = clock()
+    engine.run()
+    presses = [event[-1] - started for event in backend.events if event[0] == "press"]
+    assert presses == pytest.approx([0.05, 0.2 + 0.05], abs=1e-3)
+    assert engine.clicks_done == engine.total_clicks == 2
+
+
+def test_set_interval_keeps_jitter_and_policy(mc, clock):
+    s = scheduler(mc, clock)
+    start = s.start()
+    s.gaps = iter([0.2, 0.2])
+    s.wait_next()
+    # the drawn gap is twice the pace, it stays twice the new pace
+    s.set_interval(0.05)
+    assert s.next_due == pytest.approx(start + 0.1)
+    assert s.interval == 0.05
+    # running late past the new deadline goes through the Skip policy
+    clock.now = start + 0.23
+    s.set_interval(0.05)
+    assert s.skipped == 4
+    assert s.next_due == pytest.approx(start + 0.25)
+
+
+def test_pause_does_not_eat_the_condition_timeout(mc):
+    # region condition that matches 50 ms after the run resumes
+    class Condition:
+        kind = mc.COND_WAIT
+        timeout = 0.2
+        ready_at = None
+
+        def matches(self, capture):
+            return self.ready_at is not None and time.perf_counter() >= self.ready_at
+
+    plan = mc.ClickPlan.compile([(1, 0, 0, "Left", "Single")])
+    settings = mc.RunSettings(0.0, 1, 1, 0.0, "Random", 5, -1, mc.POLICY_SKIP)
+    engine = mc.ClickEngine(plan, settings, mc.NullBackend())
+    engine.capture = object()
+    engine.running = True
+    engine.start_time = engine.scheduler.start()
+    condition = Condition()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(engine.check(condition)))
+    worker.start()
+    time.sleep(0.05)
+    engine.pause()
+    time.sleep(0.4)  # well past the timeout
+    condition.ready_at = time.perf_counter() + 0.05
+    engine.resume()
+    worker.join(2)
+    assert result == [True]
+
+
+def test_backend_failure_still_ends_the_run(mc, clock):
+    class BrokenBackend(mc.NullBackend):
+        def click(self, *args, **kwargs):
+            raise RuntimeError("X server went away")
+
+    plan = mc.ClickPlan.compile([(1, 10, 20, "Left", "Single")])
+    settings = mc.RunSettings(0.05, 1, 3, 0.0, "Random", 10 ** 9, -1, mc.POLICY_SKIP)
+    channel = mc.ProgressChannel()
+    channel.attached = True
+    channel.request = channel.post  # nobody answers the marker request here
+    engine = mc.ClickEngine(plan, settings, BrokenBackend(clock=clock), channel=channel,
+                            scheduler=scheduler(mc, clock, 0.05))
+    engine.run()
+    events = [(kind, args) for kind, args, _ in engine.channel.drain()]
+    assert events[-2:] == [("markers", (True,)), ("done", ("error: X server went away", engine.summary()))]
+    assert engine.channel.state.status == "error: X server went away"
+    assert not engine.running
@@ -0,0 +1,74 @@
+import csv
+
+import pytest
+
+
+def filled(mc, lates, capacity=8, buckets=(0.001, 0.01)):
+    # one click per 10 ms, `lates` seconds after its planned time
+    telemetry = mc.ClickTelemetry(capacity, buckets)
+    for n, late in enumerate(lates):
+        planned = n * 0.01
+        telemetry.record(planned, planned + late, 0.0001, 0.0002)
+    return telemetry
+
+
+def test_buckets_are_upper_bounds(mc):
+    telemetry = mc.ClickTelemetry(8, (0.001, 0.01))
+    for late in (0.0005, 0.001, 0.002, 0.01, 0.5):
+        telemetry.record(0.0, late, 0.0001, 0.0002)
+    # a latency on a bound counts in that bucket, like Prometheus' le
+    assert list(telemetry.bins) == [2, 2, 1]
+    assert telemetry.latency_sum == pytest.approx(0.5135)
+    assert telemetry.backend_sum == pytest.approx(0.0005)
+
+
+def test_ring_keeps_the_newest_clicks(mc):
+    telemetry = filled(mc, [0.0] * 11, capacity=4)
+    assert telemetry.count == 11 and len(telemetry) == 4
+    assert [row[0] for row in telemetry.rows()] == [7, 8, 9, 10]
+    assert telemetry.rate() == pytest.approx(100.0)
+    # the histogram still counts every click
+    assert sum(telemetry.bins) == 11
+
+
+def test_reset_and_empty_rate(mc):
+    telemetry = filled(mc, [0.002, 0.003])
+    telemetry.reset()
+    assert telemetry.count == 0 and list(telemetry.bins) == [0, 0, 0]
+    assert telemetry.rate() == 0.0
+
+
+def test_absorb_adds_snapshots(mc):
+    total = mc.ClickTelemetry(4, (0.001, 0.01))
+    for lates in ([0.0005], [0.002, 0.05]):
+        total.absorb(filled(mc, lates).snapshot())
+    assert total.count == 3
+    assert list(total.bins) == [1, 1, 1]
+    assert total.effects_sum == pytest.approx(0.0006)
+
+
+def test_prometheus_export(mc, tmp_path):
+    telemetry = filled(mc, [0.0005, 0.002, 0.5])
+    lines = telemetry.prometheus_text(rate=12.5).splitlines()
+    name = "multiclicker_click_latency_seconds"
+    # buckets are cumulative and end in +Inf == count
+    assert f'{name}_bucket{{le="0.001"}} 1' in lines
+    assert f'{name}_bucket{{le="0.01"}} 2' in lines
+    assert f'{name}_bucket{{le="+Inf"}} 3' in lines
+    assert f"{name}_count 3" in lines
+    assert "multiclicker_click_rate 12.500" in lines
+    path = str(tmp_path / "clicks.prom")
+    telemetry.write_prometheus(path)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == telemetry.prometheus_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["clicks.prom"]
+
+
+def test_csv_export(mc, tmp_path):
+    telemetry = filled(mc, [0.001, 0.002])
+    path = tmp_path / "clicks.csv"
+    telemetry.write_csv(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["click", "planned", "injected", "backend", "effects", "latency"]
+    assert [row[-1] for row in rows[1:]] == ["0.001000", "0.002000"]
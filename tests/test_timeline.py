@@ -0,0 +1,55 @@
+import pytest
+
+ROWS = [
+    (1, 0, 0, "Left", "Single"),
+    (2, 0, 0, "Left", "Double"),
+    (3, 0, 0, "Left", "Single"),
+]
+
+
+def timeline(mc, repeats=1, cycles=5, mode="Random", freq=2, target=-1):
+    settings = mc.RunSettings(0.1, repeats, cycles, 1.0, mode, freq, target, mc.POLICY_SKIP)
+    return mc.RunTimeline(mc.ClickPlan.compile(ROWS), settings)
+
+
+def walk(mc, timeline, first):
+    # (slots, clicks) by actually iterating the cycles from `first`
+    modes = timeline.plan.modes
+    slots = [i for cycle in range(first, timeline.settings.cycles + 1) for i in timeline.cycle_slots(cycle)]
+    return len(slots), sum(2 if modes[i] == mc.MODE_DOUBLE else 1 for i in slots)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"repeats": 3},
+    {"freq": 0},
+    {"freq": 1, "cycles": 4},
+    {"mode": "Customize", "target": 1},
+    {"mode": "Customize", "target": 0, "repeats": 2},
+    {"mode": "Customize", "target": 9},
+])
+def test_remaining_matches_the_slots(mc, kwargs):
+    t = timeline(mc, **kwargs)
+    for cycle in range(1, t.settings.cycles + 2):
+        assert t.remaining(cycle) == walk(mc, t, cycle)
+
+
+def test_rule_pass_runs_first_on_due_cycles(mc):
+    t = timeline(mc, repeats=2, freq=2)
+    assert list(t.cycle_slots(1)) == [0, 0, 1, 1, 2, 2]
+    assert list(t.cycle_slots(2)) == [0, 1, 2, 0, 0, 1, 1, 2, 2]
+    assert t.rule_cycles(1, 10) == 5 and t.rule_cycles(3, 3) == 0
+
+
+def test_plan_swap_recounts(mc):
+    t = timeline(mc)
+    t.set_plan(mc.ClickPlan.compile(ROWS[:1]))
+    assert t.remaining(1) == (5 + 2, 5 + 2)
+
+
+def test_eta(mc):
+    t = timeline(mc)
+    assert t.eta(0, 5.0, 3) == 0.0
+    # next slot in 0.05 s, 9 more at 0.1 s, two cycle delays of 1 s
+    assert t.eta(10, 0.05, 2) == pytest.approx(0.05 + 0.9 + 2.0)
+    assert t.eta(10, -1.0, 0, delay=0.5) == pytest.approx(4.5)
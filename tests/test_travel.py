@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+
+def plan_of(mc, points, windows=None):
+    windows = windows or {}
+    return mc.ClickPlan.compile([(i + 1, x, y, "Left", "Single", windows.get(i, ""))
+                                 for i, (x, y) in enumerate(points)])
+
+
+def test_loop_length_closes_the_loop(mc):
+    assert mc.loop_length([0, 3, 3], [0, 0, 4], [0, 1, 2]) == pytest.approx(12.0)
+    assert mc.loop_length([5], [5], [0]) == 0.0
+
+
+def test_shuffled_line_becomes_a_straight_sweep(mc):
+    xs = list(range(0, 1000, 50))
+    random.Random(1).shuffle(xs)
+    plan = plan_of(mc, [(x, 100) for x in xs])
+    order, before, after = mc.travel_order(plan)
+    assert sorted(order) == list(range(len(xs))) and order[0] == 0
+    assert after == pytest.approx(2 * 950)
+    assert after < before
+    assert mc.loop_length(plan.xs, plan.ys, order) == pytest.approx(after)
+
+
+def test_short_order_is_kept(mc):
+    plan = plan_of(mc, [(0, 0), (100, 0), (100, 100), (0, 100), (0, 50)])
+    order, before, after = mc.travel_order(plan)
+    assert order == list(range(5)) and after == before
+
+
+def test_window_bound_and_unselected_positions_keep_their_slot(mc):
+    points = [(0, 0), (900, 0), (5, 5), (100, 0), (800, 0), (200, 0), (700, 0)]
+    plan = plan_of(mc, points, windows={2: "0x400001"})
+    order, _, _ = mc.travel_order(plan)
+    assert order[2] == 2
+    order, _, _ = mc.travel_order(plan, movable=[1, 3, 4, 5, 6])
+    assert order[:3] == [0, 1, 2]
+    assert sorted(order) == list(range(7))
+
+
+def test_two_opt_improves_on_the_greedy_tour(mc):
+    rng = random.Random(7)
+    xs = [rng.randrange(1920) for _ in range(300)]
+    ys = [rng.randrange(1080) for _ in range(300)]
+    greedy = mc.nearest_neighbour_tour(xs, ys)
+    assert sorted(greedy) == list(range(300)) and greedy[0] == 0
+    tour = mc.two_opt(xs, ys, list(greedy), budget=5.0)
+    assert sorted(tour) == list(range(300)) and tour[0] == 0
+    assert mc.loop_length(xs, ys, tour) < mc.loop_length(xs, ys, greedy)